@@ -0,0 +1,325 @@
+"""API HTTP de leitura: entidades completas (município, escola) e as consultas analíticas parametrizadas.
+
+Rotas (GET, respostas JSON):
+    /saude                                   conexão e geração dos dados
+    /municipios?uf=&regiao=&apos=&limite=    lista paginada de municípios (cursor pelo co_municipio)
+    /municipios/<co_municipio>               município com indicadores e a primeira página das escolas
+    /municipios/<co_municipio>/escolas       próximas páginas das escolas (?apos=<co_entidade>&limite=)
+    /escolas/<co_entidade>                   escola pelo código do censo
+    /consultas                               consultas disponíveis
+    /consultas/<nome>?regiao=&uf=&limite=    uma consulta do registro, restrita e com outro top-N
+
+`?campos=a,b.c` projeta só os campos pedidos (nas escolas, `?campos_escolas=`). As respostas levam
+um ETag derivado da geração dos dados carimbada pela migração: `If-None-Match` devolve 304 sem ir
+ao banco, e uma nova migração invalida tudo sozinha.
+
+Uso:
+    python api.py --uri mongodb://mongo:27017/ --porta 8080 --pool 100
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bson import ObjectId
+from pymongo import ASCENDING, MongoClient
+
+from cache_consultas import CacheLRU, criar_cache, geracao_atual, TTL_CACHE_PADRAO
+from consultas import REGISTRO, parametrizar
+from entidades import INTERVALO_GERACAO_PADRAO, LeitorEntidades
+from executor_consultas import abrir_cursor
+
+PORTA_PADRAO = 8080
+POOL_PADRAO = 50
+POOL_MINIMO_PADRAO = 5
+ESPERA_POOL_MS = 2000
+TAMANHO_PAGINA_PADRAO = 20
+TAMANHO_PAGINA_MAXIMO = 200
+MAX_RESPOSTAS_EM_CACHE = 4096
+MAX_TIME_MS_CONSULTAS = 30_000
+
+CAMPO_VALIDO = re.compile(r'^[A-Za-z_][\w.]*$')
+SEM_HASH = {'hash_conteudo': 0}
+
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def conectar(uri, tamanho_pool=POOL_PADRAO, pool_minimo=POOL_MINIMO_PADRAO):
+    """MongoClient compartilhado por todas as threads do servidor, com o pool dimensionado para a concorrência."""
+    return MongoClient(uri, maxPoolSize=tamanho_pool, minPoolSize=min(pool_minimo, tamanho_pool),
+                       maxIdleTimeMS=60_000, waitQueueTimeoutMS=ESPERA_POOL_MS,
+                       serverSelectionTimeoutMS=5000, appname='api-educacao-indigena')
+
+
+def _para_json(valor):
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} não é serializável")
+
+
+def _projecao(campos, obrigatorios=()):
+    """`?campos=a,b` -> projeção de inclusão (mais os campos de que a rota precisa); sem campos, tudo menos o hash."""
+    if not campos:
+        return dict(SEM_HASH)
+    nomes = [c.strip() for c in campos.split(',') if c.strip()]
+    invalidos = [c for c in nomes if not CAMPO_VALIDO.match(c)]
+    if invalidos:
+        raise ErroRequisicao(400, f"campos inválidos: {', '.join(invalidos)}")
+    return {**{c: 1 for c in nomes}, **{c: 1 for c in obrigatorios}}
+
+
+def _inteiro(parametros, nome, padrao=None, minimo=None, maximo=None):
+    valor = parametros.get(nome, padrao)
+    if valor is None or valor == padrao:
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ErroRequisicao(400, f"{nome} deve ser um número inteiro")
+    if minimo is not None and valor < minimo:
+        raise ErroRequisicao(400, f"{nome} deve ser no mínimo {minimo}")
+    return min(valor, maximo) if maximo is not None else valor
+
+
+class ServicoLeitura:
+    """Leituras da API sobre um banco populado pela migração. Seguro para uso por várias threads."""
+
+    def __init__(self, db, cache_consultas=None, intervalo_geracao=INTERVALO_GERACAO_PADRAO,
+                 max_respostas=MAX_RESPOSTAS_EM_CACHE):
+        self.db = db
+        # O leitor usa a geração já controlada pelo serviço: uma página de municípios não relê o carimbo por linha
+        self.entidades = LeitorEntidades(db, geracao=self.geracao)
+        self.cache_consultas = cache_consultas
+        self.respostas = CacheLRU(max_respostas) if max_respostas else None
+        self.intervalo_geracao = intervalo_geracao
+        self._geracao, self._lida_em = None, 0.0
+        self._trava = threading.Lock()
+
+    def geracao(self):
+        """Geração dos dados, relida do banco no máximo a cada `intervalo_geracao` segundos."""
+        agora = time.monotonic()
+        with self._trava:
+            if agora - self._lida_em >= self.intervalo_geracao:
+                self._geracao, self._lida_em = geracao_atual(self.db), agora
+            return self._geracao
+
+    # --- Entidades ---
+
+    def municipios(self, uf=None, regiao=None, apos=None, limite=TAMANHO_PAGINA_PADRAO, campos=None):
+        filtro = {campo: valor for campo, valor in (('uf_sigla', uf), ('regiao_nome', regiao)) if valor}
+        if apos is not None:
+            filtro['co_municipio'] = {'$gt': apos}
+        projecao = _projecao(campos, ('co_municipio',))
+        docs = list(self.db.Municipios.find(filtro, projecao).sort('co_municipio', ASCENDING).limit(limite + 1))
+        return _pagina([self.entidades.montar(d) for d in docs], limite, 'co_municipio')
+
+    def municipio(self, co_municipio, campos=None, limite_escolas=TAMANHO_PAGINA_PADRAO, campos_escolas=None):
+        projecao = _projecao(campos, ('co_municipio', 'uf_sigla'))
+        doc = self.db.Municipios.find_one({'co_municipio': co_municipio}, projecao)
+        if doc is None:
+            return None
+        if not campos or 'indicadores_educacionais' in projecao:
+            self.entidades.montar(doc)
+        if limite_escolas:
+            doc['escolas'] = self._escolas(doc, None, limite_escolas, campos_escolas)
+        return doc
+
+    def escolas_do_municipio(self, co_municipio, apos=None, limite=TAMANHO_PAGINA_PADRAO, campos=None):
+        doc = self.db.Municipios.find_one({'co_municipio': co_municipio}, {'uf_sigla': 1})
+        return None if doc is None else self._escolas(doc, apos, limite, campos)
+
+    def _escolas(self, municipio, apos, limite, campos):
+        # Igualdade em uf_sigla e municipio_id + ordem por co_entidade: percorre o índice único
+        # particao_co_entidade_unico sem ordenar em memória
+        filtro = {'uf_sigla': municipio['uf_sigla'], 'municipio_id': municipio['_id']}
+        if apos is not None:
+            filtro['co_entidade'] = {'$gt': apos}
+        projecao = _projecao(campos, ('co_entidade',))
+        docs = list(self.db.Escolas.find(filtro, projecao).sort('co_entidade', ASCENDING).limit(limite + 1))
+        return _pagina(docs, limite, 'co_entidade')
+
+    def escola(self, co_entidade, campos=None):
+        return self.db.Escolas.find_one({'co_entidade': co_entidade}, _projecao(campos))
+
+    # --- Consultas ---
+
+    def consulta(self, nome, regiao=None, uf=None, limite=None):
+        if nome not in REGISTRO:
+            return None
+        consulta = parametrizar(REGISTRO[nome], regiao, uf, limite)
+
+        def calcular():
+            return abrir_cursor(self.db, consulta, max_time_ms=MAX_TIME_MS_CONSULTAS)
+
+        parametros = {'regiao': regiao, 'uf': uf, 'limite': limite}
+        resultado = self.cache_consultas.executar(consulta, calcular, parametros) if self.cache_consultas \
+            else list(calcular())
+        return {'consulta': consulta.nome, 'titulo': consulta.titulo, 'resultado': resultado}
+
+
+def _pagina(docs, limite, campo_cursor):
+    """Página de até `limite` documentos; `proximo` é o cursor (`?apos=`) da página seguinte, se houver."""
+    mais = len(docs) > limite
+    docs = docs[:limite]
+    return {'itens': docs, 'proximo': docs[-1][campo_cursor] if mais and docs else None}
+
+
+# --- HTTP ---
+
+ROTAS = [
+    (re.compile(r'^/saude$'), 'saude'),
+    (re.compile(r'^/municipios$'), 'municipios'),
+    (re.compile(r'^/municipios/(\d+)$'), 'municipio'),
+    (re.compile(r'^/municipios/(\d+)/escolas$'), 'escolas_municipio'),
+    (re.compile(r'^/escolas/(\d+)$'), 'escola'),
+    (re.compile(r'^/consultas$'), 'lista_consultas'),
+    (re.compile(r'^/consultas/(\w+)$'), 'consulta'),
+]
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: o cliente reaproveita a conexão entre requisições
+    server_version = 'api-educacao-indigena'
+
+    @property
+    def servico(self):
+        return self.server.servico
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            for padrao, rota in ROTAS:
+                encontrado = padrao.match(url.path)
+                if encontrado:
+                    break
+            else:
+                raise ErroRequisicao(404, f"rota desconhecida: {url.path}")
+
+            if rota == 'saude':
+                self.servico.db.command('ping')
+                return self._responder(200, {'status': 'ok', 'geracao': self.servico.geracao()})
+
+            geracao = self.servico.geracao()
+            etag = None
+            if geracao:
+                etag = f'W/"{geracao}-{hashlib.blake2b(self.path.encode(), digest_size=8).hexdigest()}"'
+                if etag in (t.strip() for t in self.headers.get('If-None-Match', '').split(',')):
+                    return self._responder(304, None, etag)
+                if self.servico.respostas is not None:
+                    corpo = self.servico.respostas.obter(etag)
+                    if corpo is not None:
+                        return self._responder(200, corpo, etag)
+
+            resultado = self._resolver(rota, encontrado.groups(), parametros)
+            if resultado is None:
+                raise ErroRequisicao(404, "não encontrado")
+            corpo = json.dumps(resultado, ensure_ascii=False, default=_para_json).encode('utf-8')
+            if etag and self.servico.respostas is not None:
+                self.servico.respostas.guardar(etag, rota, geracao, corpo)
+            self._responder(200, corpo, etag)
+        except ErroRequisicao as e:
+            self._responder(e.status, {'erro': str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self._responder(500, {'erro': f"{type(e).__name__}: {e}"})
+
+    def _resolver(self, rota, grupos, p):
+        servico = self.servico
+        limite = _inteiro(p, 'limite', TAMANHO_PAGINA_PADRAO, 1, TAMANHO_PAGINA_MAXIMO)
+        if rota == 'municipios':
+            return servico.municipios(p.get('uf'), p.get('regiao'), _inteiro(p, 'apos'), limite, p.get('campos'))
+        if rota == 'municipio':
+            escolas = _inteiro(p, 'escolas', TAMANHO_PAGINA_PADRAO, 0, TAMANHO_PAGINA_MAXIMO)
+            return servico.municipio(int(grupos[0]), p.get('campos'), escolas, p.get('campos_escolas'))
+        if rota == 'escolas_municipio':
+            return servico.escolas_do_municipio(int(grupos[0]), _inteiro(p, 'apos'), limite, p.get('campos'))
+        if rota == 'escola':
+            return servico.escola(int(grupos[0]), p.get('campos'))
+        if rota == 'lista_consultas':
+            return [{'nome': c.nome, 'titulo': c.titulo, 'colecao': c.colecao} for c in REGISTRO.values()]
+        if rota == 'consulta':
+            return servico.consulta(grupos[0], p.get('regiao'), p.get('uf'), _inteiro(p, 'limite', None, 1))
+
+    def _responder(self, status, conteudo, etag=None):
+        corpo = b'' if conteudo is None else conteudo if isinstance(conteudo, bytes) else \
+            json.dumps(conteudo, ensure_ascii=False, default=_para_json).encode('utf-8')
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            # O cliente pode guardar, mas revalida (barato: 304 sem ir ao banco) a cada uso
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if corpo:
+            self.wfile.write(corpo)
+
+
+def criar_servidor(servico, host='0.0.0.0', porta=PORTA_PADRAO, verboso=False):
+    """Servidor HTTP com uma thread por conexão, todas compartilhando `servico` (e o pool do MongoClient)."""
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorAPI)
+    servidor.daemon_threads = True
+    servidor.servico = servico
+    servidor.verboso = verboso
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--banco', default='educacao_indigena')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--pool', type=int, default=POOL_PADRAO,
+                        help="Máximo de conexões do pool compartilhado (≈ requisições simultâneas no banco).")
+    parser.add_argument('--cache', choices=['mongo', 'memoria', 'nenhum'], default='mongo',
+                        help="Cache dos resultados das consultas (ver cache_consultas).")
+    parser.add_argument('--cache-ttl', type=int, default=TTL_CACHE_PADRAO)
+    parser.add_argument('--max-respostas', type=int, default=MAX_RESPOSTAS_EM_CACHE,
+                        help="Respostas prontas guardadas em memória por ETag (0 desliga).")
+    parser.add_argument('--intervalo-geracao', type=float, default=INTERVALO_GERACAO_PADRAO,
+                        help="Segundos entre releituras da geração dos dados.")
+    parser.add_argument('--verboso', action='store_true', help="Registra cada requisição no terminal.")
+    args = parser.parse_args()
+
+    client = conectar(args.uri, args.pool)
+    try:
+        client.admin.command('ping')
+    except Exception as e:
+        raise SystemExit(f"❌ Falha na conexão com MongoDB. Erro: {e}")
+    db = client[args.banco]
+    servico = ServicoLeitura(db, criar_cache(db, args.cache, ttl_segundos=args.cache_ttl),
+                             args.intervalo_geracao, args.max_respostas)
+    servidor = criar_servidor(servico, args.host, args.porta, args.verboso)
+    print(f"🌐 API de leitura em http://{args.host}:{args.porta} (pool de até {args.pool} conexões, "
+          f"geração {servico.geracao() or 'não carimbada: sem ETag'})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        client.close()
+        print("\n🔌 API encerrada.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark das consultas analíticas registradas em consultas.REGISTRO.
+
+Para cada consulta: aquecimento, N repetições cronometradas (p50/p95/p99), documentos
+examinados x retornados e tempo no servidor (via explain) e tamanho do resultado.
+A saída JSON pode ser comparada entre execuções para achar regressões.
+
+Uso:
+    python benchmark_consultas.py --saida bench.json                  # banco local já populado
+    python benchmark_consultas.py --iniciar-mongod --escolas 50000    # mongod temporário com dados sintéticos
+    python benchmark_consultas.py --mongomock --escolas 5000          # sem servidor (mongomock)
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+from bson import BSON
+
+from benchmark_util import cronometrar, percentil, servidor_benchmark
+from consultas import REGISTRO, executar
+from indices import analisar_explain, criar_indices, explicar
+
+FAIXAS_ANOS_ESTUDO = ['15 a 17 anos', '18 a 24 anos', '25 anos ou mais']
+# Dados sintéticos nunca vão para o banco da migração
+BANCO_SINTETICO = 'benchmark_consultas'
+
+
+def popular_base_sintetica(db, n_escolas):
+    """Popula Municipios, UFs, Escolas e ResumoMunicipios com dados sintéticos no formato da migração."""
+    import numpy as np
+    from bson import ObjectId
+    from benchmark_escolas import escolas_sinteticas
+    from censo import AgregadorCenso, gerar_documentos_escolas, gerar_documentos_resumo, resumir_escolas_gravadas
+
+    agregador = AgregadorCenso()
+    agregador.adicionar(escolas_sinteticas(n_escolas))
+    municipios, escolas = agregador.municipios(), agregador.escolas()
+    rng = np.random.default_rng(7)
+    # Anos de estudo são indicadores estaduais: iguais para todos os municípios da UF
+    anos_por_uf = {
+        uf: [{"faixa_etaria": f, "media_anos": round(float(rng.uniform(3, 12)), 2)} for f in FAIXAS_ANOS_ESTUDO]
+        for uf in municipios['uf_sigla'].astype(str).unique()
+    }
+
+    municipio_map = {}
+    municipios_docs = []
+    for row in municipios.to_dict('records'):
+        municipio_map[int(row['CO_MUNICIPIO'])] = ObjectId()
+        municipios_docs.append({
+            "_id": municipio_map[int(row['CO_MUNICIPIO'])],
+            "co_municipio": int(row['CO_MUNICIPIO']),
+            "nome_municipio": row['nome_municipio'],
+            "uf_sigla": row['uf_sigla'],
+            "regiao_nome": row['regiao_nome'],
+            "populacao_total": int(row['populacao_total']),
+            "populacao_indigena": int(row['populacao_indigena']) * 20,
+            "indicadores_educacionais": {
+                "frequencia_escolar": [],
+                "anos_estudo": anos_por_uf[row['uf_sigla']],
+                "nivel_instrucao": []
+            }
+        })
+
+    for colecao in ('Municipios', 'UFs', 'Escolas', 'ResumoMunicipios'):
+        db[colecao].drop()
+    db.Municipios.insert_many(municipios_docs)
+    db.UFs.insert_many([{"uf_sigla": uf, "indicadores_educacionais": {"frequencia_escolar": [], "anos_estudo": anos}}
+                        for uf, anos in anos_por_uf.items()])
+    db.Escolas.insert_many(list(gerar_documentos_escolas(escolas, municipio_map)))
+    db.ResumoMunicipios.insert_many(list(gerar_documentos_resumo(
+        municipios, resumir_escolas_gravadas(db.Escolas, municipio_map), municipio_map)))
+    print(f"🧪 Base sintética: {len(municipios_docs)} municípios, {len(escolas)} escolas")
+
+
+def medir_consulta(db, consulta, aquecimento, repeticoes):
+    """Cronometra uma consulta e coleta as estatísticas do explain."""
+    for _ in range(aquecimento):
+        executar(db, consulta)
+
+    resultado, tempos = cronometrar(lambda: executar(db, consulta), repeticoes)
+    tempos = [t * 1000 for t in tempos]
+
+    medicao = {
+        "colecao": consulta.colecao,
+        "latencia_ms": {
+            "p50": round(percentil(tempos, 50), 3),
+            "p95": round(percentil(tempos, 95), 3),
+            "p99": round(percentil(tempos, 99), 3),
+            "min": round(min(tempos), 3),
+            "max": round(max(tempos), 3),
+        },
+        "resultado_docs": len(resultado),
+        "resultado_bytes": sum(len(BSON.encode(doc)) for doc in resultado),
+    }
+    try:
+        resumo = analisar_explain(explicar(db, consulta.colecao, consulta.pipeline))
+        medicao.update({
+            "docs_examinados": resumo["docs_examinados"],
+            "docs_retornados_cursor": resumo["docs_retornados"],
+            "tempo_servidor_ms": resumo["tempo_servidor_ms"],
+            "collscan": resumo["collscan"],
+        })
+    except Exception as e:  # o mongomock, por exemplo, não implementa explain
+        medicao["explain_indisponivel"] = str(e)
+    return medicao
+
+
+def executar_benchmark(db, nomes, aquecimento, repeticoes):
+    resultados = {}
+    for nome in nomes:
+        consulta = REGISTRO[nome]
+        try:
+            resultados[nome] = medir_consulta(db, consulta, aquecimento, repeticoes)
+        except Exception as e:
+            resultados[nome] = {"colecao": consulta.colecao, "erro": str(e)}
+            print(f"❌ {nome}: {e}")
+            continue
+        m = resultados[nome]
+        print(f"⏱️  {nome:<18} p50={m['latencia_ms']['p50']:>9.2f} ms  p95={m['latencia_ms']['p95']:>9.2f} ms  "
+              f"p99={m['latencia_ms']['p99']:>9.2f} ms  docs={m['resultado_docs']:>5}  "
+              f"examinados={m.get('docs_examinados', '-')}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--banco', default='educacao_indigena')
+    parser.add_argument('--consultas', nargs='+', choices=list(REGISTRO), default=list(REGISTRO))
+    parser.add_argument('--aquecimento', type=int, default=2)
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados (padrão: stdout).")
+    parser.add_argument('--iniciar-mongod', action='store_true',
+                        help="Sobe um mongod temporário (binário no PATH) e o popula com dados sintéticos.")
+    parser.add_argument('--mongomock', action='store_true',
+                        help="Usa o mongomock em processo (sem explain; algumas etapas não são suportadas).")
+    parser.add_argument('--escolas', type=int, default=None,
+                        help=f"Popula o banco '{BANCO_SINTETICO}' com N escolas sintéticas antes de medir.")
+    args = parser.parse_args()
+
+    with servidor_benchmark(args.uri, args.iniciar_mongod, args.mongomock) as (client, uri):
+        sintetico = bool(args.escolas or args.iniciar_mongod or args.mongomock)
+        db = client[BANCO_SINTETICO if sintetico else args.banco]
+        if sintetico:
+            popular_base_sintetica(db, args.escolas or 20_000)
+            if not args.mongomock:
+                criar_indices(db)
+        relatorio = {
+            "gerado_em": datetime.now(timezone.utc).isoformat(),
+            "uri": uri if not args.iniciar_mongod else 'mongod temporário',
+            "banco": db.name,
+            "aquecimento": args.aquecimento,
+            "repeticoes": args.repeticoes,
+            "consultas": executar_benchmark(db, args.consultas, args.aquecimento, args.repeticoes),
+        }
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(saida + os.linesep)
+        print(f"💾 Resultados gravados em {args.saida}")
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Teste de escala da migração e das consultas com dados sintéticos de 1x, 10x e 100x o tamanho nacional.
+
+Para cada escala: gera (ou reaproveita) censo e planilhas com gerador_sintetico, roda a migração
+completa em um processo novo (o RSS de pico não se mistura entre escalas) com a instrumentação
+por etapa e, havendo banco, mede as consultas registradas em consultas.REGISTRO. No fim, cada
+medida é comparada com a da escala anterior pelo expoente de crescimento em relação às linhas do
+censo: 1,0 é linear, ~0 é constante; acima de LIMIAR_EXPOENTE a medida cresce mais rápido que os dados.
+
+Uso:
+    python benchmark_escala.py --sem-banco                                  # 1x e 10x, migração exportando para arquivos
+    python benchmark_escala.py --iniciar-mongod --escalas 1 10 100 --saida escala.json
+    python benchmark_escala.py --uri mongodb://localhost:27017/ --escalas 1 10
+    python benchmark_escala.py --mongomock --escalas 0.05 0.1 0.2           # amostra rápida, sem servidor
+"""
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from benchmark_consultas import executar_benchmark
+from benchmark_util import iniciar_mongod, parar_mongod
+from consultas import REGISTRO
+from gerador_sintetico import DIRETORIO_PADRAO, SEMENTE_PADRAO, diretorio_escala, gerar_conjunto
+
+ESCALAS_PADRAO = [1, 10]
+LIMIAR_EXPOENTE = 1.2
+VALOR_MINIMO_ANALISE = 0.05  # abaixo disso (s ou ms) a medida é ruído de relógio e fica fora da análise
+PREFIXO_BANCO = 'escala_'
+
+
+def medir_escala(conjunto, diretorio, modo, uri, banco, consultas, aquecimento, repeticoes, opcoes):
+    """Migra um conjunto sintético e mede as consultas. Roda em um processo próprio (spawn).
+
+    O processo trabalha dentro de `diretorio`: o cache de indicadores e o staging da migração usam
+    caminhos relativos e assim ficam separados por escala, sem tocar nos arquivos dos dados reais.
+    O staging é apagado antes, para que todas as escalas partam do mesmo estado; com
+    `opcoes['aquecer']` uma primeira migração (não medida) o prepara. A saída vai para migracao.log.
+    """
+    from carregador import CarregadorEmLotes
+    from exportacao import DestinoArquivos
+    from instrumentacao import Instrumentacao
+    from migracao import DestinoMongo, arquivos_indicadores, conectar, run_migration
+
+    os.chdir(diretorio)
+    shutil.rmtree('datasets', ignore_errors=True)
+    caminho_censo = os.path.join(conjunto['diretorio_censo'],
+                                 f"microdados_ed_basica_{max(conjunto['parametros']['anos'])}.csv")
+    client = None
+    resultado = {}
+    with open('migracao.log', 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            if modo == 'mongomock':
+                import mongomock
+                client = mongomock.MongoClient()
+            elif modo == 'mongo':
+                client = conectar(uri)
+            for _ in range(2 if opcoes['aquecer'] else 1):
+                if client is None:
+                    shutil.rmtree('exportacao', ignore_errors=True)
+                    destino = DestinoArquivos('exportacao')
+                else:
+                    client.drop_database(banco)
+                    carregador = CarregadorEmLotes(tamanho_lote=opcoes['tamanho_lote'], workers=opcoes['workers'])
+                    destino = DestinoMongo(client, banco, uri, carregador)
+                instrumentos = Instrumentacao()
+                instrumentos.parametros = {"modo": modo, "banco": banco, **opcoes}
+                run_migration(destino, tamanho_bloco=opcoes['tamanho_bloco'], usar_cache=False,
+                              caminho_censo=caminho_censo, usar_staging=opcoes['usar_staging'],
+                              instrumentos=instrumentos,
+                              arquivos_indicadores=arquivos_indicadores(conjunto['diretorio_indicadores']))
+            resultado['migracao'] = instrumentos.relatorio()
+            if not any(e['nome'] == 'escrita: Escolas' for e in resultado['migracao']['etapas']):
+                raise RuntimeError(f"migração interrompida; ver {os.path.join(diretorio, 'migracao.log')}")
+            if client is not None:
+                resultado['consultas'] = executar_benchmark(client[banco], consultas, aquecimento, repeticoes)
+        finally:
+            if client is not None:
+                if not opcoes['manter_bancos']:
+                    client.drop_database(banco)
+                client.close()
+    return resultado
+
+
+def medidas_da_escala(resultado):
+    """Medidas comparáveis entre escalas: {nome: valor}."""
+    migracao = resultado['migracao']
+    medidas = {
+        "migração: total (s)": migracao['segundos_total'],
+        "migração: CPU (s)": migracao['cpu_segundos_total'],
+        "migração: RSS de pico do processo (MB)": migracao['rss_pico_processo_mb'],
+    }
+    for etapa in migracao['etapas']:
+        medidas[f"etapa: {etapa['nome']} (s)"] = etapa['segundos']
+        medidas[f"etapa: {etapa['nome']} RSS de pico (MB)"] = etapa['rss_pico_mb']
+    for nome, consulta in resultado.get('consultas', {}).items():
+        if 'latencia_ms' in consulta:
+            medidas[f"consulta: {nome} p50 (ms)"] = consulta['latencia_ms']['p50']
+            medidas[f"consulta: {nome} p95 (ms)"] = consulta['latencia_ms']['p95']
+    return medidas
+
+
+def expoente(x0, y0, x1, y1):
+    """b em y ~ x^b entre dois pontos (None se algum valor for nulo ou pequeno demais para medir, ou se x0 == x1)."""
+    if not (x0 and y0 and x1 and y1) or x0 == x1 or max(y0, y1) < VALOR_MINIMO_ANALISE:
+        return None
+    return round(math.log(y1 / y0) / math.log(x1 / x0), 2)
+
+
+def analisar(escalas):
+    """Expoente de cada medida entre escalas consecutivas; sinaliza as que crescem mais que linearmente."""
+    analise = {}
+    nomes = list(dict.fromkeys(nome for e in escalas for nome in e['medidas']))
+    for nome in nomes:
+        valores = [e['medidas'].get(nome) for e in escalas]
+        expoentes = [expoente(a['linhas'], va, b['linhas'], vb)
+                     for a, b, va, vb in zip(escalas, escalas[1:], valores, valores[1:])]
+        validos = [x for x in expoentes if x is not None]
+        analise[nome] = {
+            "valores": valores,
+            "expoentes": expoentes,
+            "nao_linear": bool(validos) and max(validos) > LIMIAR_EXPOENTE,
+        }
+    return analise
+
+
+def imprimir_analise(escalas, analise):
+    rotulos = [f"{e['escala']:g}x" for e in escalas]
+    tamanhos = " / ".join(f"{rotulo} = {e['linhas']} linhas" for rotulo, e in zip(rotulos, escalas))
+    print(f"\n📈 Escalabilidade ({tamanhos})")
+    print(f"   {'medida':<46}" + "".join(f"{r:>12}" for r in rotulos) + "   expoentes")
+    for nome, a in analise.items():
+        valores = "".join(f"{'-' if v is None else v:>12}" for v in a['valores'])
+        expoentes = ", ".join('-' if x is None else f"{x:.2f}" for x in a['expoentes'])
+        alerta = "  ⚠️  não linear" if a['nao_linear'] else ""
+        print(f"   {nome[:46]:<46}{valores}   {expoentes}{alerta}")
+    nao_lineares = [nome for nome, a in analise.items() if a['nao_linear']]
+    if nao_lineares:
+        print(f"\n⚠️  {len(nao_lineares)} medida(s) crescendo mais rápido que os dados (expoente > {LIMIAR_EXPOENTE}): "
+              f"{', '.join(nao_lineares)}")
+    else:
+        print(f"\n✅ Nenhuma medida com expoente acima de {LIMIAR_EXPOENTE}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escalas', type=float, nargs='+', default=ESCALAS_PADRAO,
+                        help="Múltiplos do tamanho nacional, em ordem crescente.")
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument('--uri', default='mongodb://localhost:27017/', help="MongoDB para a migração e as consultas.")
+    destino.add_argument('--iniciar-mongod', action='store_true', help="Sobe um mongod temporário (binário no PATH).")
+    destino.add_argument('--mongomock', action='store_true',
+                         help="mongomock no processo de cada escala (sem explain nem $round; só para escalas pequenas).")
+    destino.add_argument('--sem-banco', action='store_true',
+                         help="Exporta para arquivos (exportacao.DestinoArquivos): mede só a migração, sem consultas.")
+    parser.add_argument('--diretorio', default=DIRETORIO_PADRAO, help="Onde ficam os dados sintéticos de cada escala.")
+    parser.add_argument('--escalar-municipios', action='store_true',
+                        help="Multiplica também os municípios (e as linhas das planilhas) pela escala.")
+    parser.add_argument('--colunas-extras', type=int, default=0, help="Colunas ignoradas no CSV (o real tem ~370).")
+    parser.add_argument('--semente', type=int, default=SEMENTE_PADRAO)
+    parser.add_argument('--regerar', action='store_true', help="Gera os dados de novo mesmo que já existam.")
+    parser.add_argument('--sem-staging', action='store_true', help="Lê CSV e .xlsx direto, sem Arrow/Parquet.")
+    parser.add_argument('--aquecer', action='store_true',
+                        help="Migra uma vez antes de medir: mede a leitura do staging já pronto, e não a sua preparação.")
+    parser.add_argument('--tamanho-bloco', type=int, default=None, help="Linhas do censo por bloco (padrão da migração).")
+    parser.add_argument('--tamanho-lote', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--consultas', nargs='+', choices=list(REGISTRO), default=list(REGISTRO))
+    parser.add_argument('--aquecimento', type=int, default=1)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--manter-bancos', action='store_true', help=f"Não apaga os bancos {PREFIXO_BANCO}<N>x no fim.")
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados.")
+    args = parser.parse_args()
+
+    from carregador import TAMANHO_LOTE_PADRAO, WORKERS_PADRAO
+    from censo import TAMANHO_BLOCO_PADRAO
+    opcoes = {
+        "usar_staging": not args.sem_staging,
+        "aquecer": args.aquecer,
+        "tamanho_bloco": args.tamanho_bloco or TAMANHO_BLOCO_PADRAO,
+        "tamanho_lote": args.tamanho_lote or TAMANHO_LOTE_PADRAO,
+        "workers": args.workers or WORKERS_PADRAO,
+        "manter_bancos": args.manter_bancos,
+    }
+    modo = 'arquivos' if args.sem_banco else 'mongomock' if args.mongomock else 'mongo'
+    processo = diretorio_mongod = None
+    uri = args.uri
+    escalas = []
+    ignoradas = []
+    try:
+        if args.iniciar_mongod:
+            processo, uri, diretorio_mongod = iniciar_mongod()
+        for escala in sorted(args.escalas):
+            diretorio = os.path.abspath(diretorio_escala(escala, args.diretorio))
+            conjunto = gerar_conjunto(diretorio, escala, escalar_municipios=args.escalar_municipios,
+                                      colunas_extras=args.colunas_extras, semente=args.semente,
+                                      reaproveitar=not args.regerar)
+            linhas = conjunto['censo'][str(max(conjunto['parametros']['anos']))]['linhas']
+            if escalas and linhas == escalas[-1]['linhas']:
+                # O gerador põe ao menos uma escola por município: abaixo de ~1/N escolas nacionais
+                # por município, escalas diferentes dão o mesmo censo e não há expoente a calcular.
+                print(f"⚠️  {escala:g}x gera as mesmas {linhas} linhas que {escalas[-1]['escala']:g}x "
+                      f"(mínimo de uma escola por município); escala ignorada. "
+                      f"Use uma escala maior ou --escalar-municipios.")
+                ignoradas.append({"escala": escala, "linhas": linhas, "igual_a": escalas[-1]['escala']})
+                continue
+            banco = f"{PREFIXO_BANCO}{escala:g}x".replace('.', '_')
+            print(f"🚀 Migrando {escala:g}x ({conjunto['escolas']} escolas, modo {modo}); log em "
+                  f"{os.path.join(diretorio, 'migracao.log')}")
+            inicio = time.perf_counter()
+            # Um processo novo por escala: ru_maxrss é o pico do processo inteiro e nunca diminui
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                resultado = executor.submit(medir_escala, conjunto, diretorio, modo, uri, banco, args.consultas,
+                                            args.aquecimento, args.repeticoes, opcoes).result()
+            escalas.append({
+                "escala": escala,
+                "linhas": linhas,
+                "municipios": conjunto['municipios'],
+                "diretorio": diretorio,
+                "segundos_geracao": conjunto['segundos'],
+                "segundos_medicao": round(time.perf_counter() - inicio, 2),
+                **resultado,
+                "medidas": medidas_da_escala(resultado),
+            })
+            medidas = escalas[-1]['medidas']
+            print(f"✅ {escala:g}x: migração em {medidas['migração: total (s)']} s, "
+                  f"RSS de pico {medidas['migração: RSS de pico do processo (MB)']} MB")
+    finally:
+        if processo:
+            parar_mongod(processo, diretorio_mongod)
+
+    if len(escalas) < 2:
+        print("⚠️  Menos de duas escalas com tamanhos distintos: nenhum expoente a calcular.")
+    analise = analisar(escalas)
+    imprimir_analise(escalas, analise)
+    if args.saida:
+        relatorio = {
+            "gerado_em": datetime.now(timezone.utc).isoformat(),
+            "modo": modo,
+            "limiar_expoente": LIMIAR_EXPOENTE,
+            "opcoes": opcoes,
+            "escalas": escalas,
+            "escalas_ignoradas": ignoradas,
+            "analise": analise,
+        }
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Compara a montagem colunar dos documentos de Escolas com o antigo laço iterrows.
+
+Uso:
+    python benchmark_escolas.py                      # usa o CSV do censo, se existir
+    python benchmark_escolas.py --escolas 180000     # gera um dataframe sintético
+"""
+import argparse
+import os
+import statistics
+
+import numpy as np
+import pandas as pd
+from bson import BSON, ObjectId
+
+from benchmark_util import cronometrar
+from censo import (agregar_censo, gerar_documentos_escolas, UFS, REGIOES, DTYPES_LEITURA,
+                   MAPA_DEPENDENCIA, MAPA_LOCALIZACAO, MAPA_SITUACAO)
+
+CAMINHO_CENSO = './datasets/microdados_ed_basica_2023.csv'
+
+
+def documentos_escolas_iterrows(escolas_df, municipio_map):
+    """Implementação original, linha a linha (com a chave co_entidade), mantida apenas como referência de comparação."""
+    escolas_docs = []
+    for _, row in escolas_df.iterrows():
+        id_municipio_mongo = municipio_map.get(int(row['CO_MUNICIPIO']))
+        if not id_municipio_mongo:
+            continue
+
+        turmas = [
+            {"nivel_ensino": "Infantil", "qt_turmas": int(row['QT_TUR_INF'])},
+            {"nivel_ensino": "Fundamental", "qt_turmas": int(row['QT_TUR_FUND'])},
+            {"nivel_ensino": "Médio", "qt_turmas": int(row['QT_TUR_MED'])}
+        ]
+        turmas = [t for t in turmas if t['qt_turmas'] > 0]
+
+        niveis_ofertados = [n for f, n in [(row['IN_INF'], "Infantil"), (row['IN_FUND_AI'] or row['IN_FUND_AF'], "Fundamental"), (row['IN_MED'], "Médio")] if f]
+
+        matriculas = [{
+            "ano_referencia": int(row['NU_ANO_CENSO']),
+            "niveis_ofertados": niveis_ofertados,
+            "qt_matriculas_total": int(row['QT_MAT_BAS']),
+            "qt_matriculas_indigenas": int(row['QT_MAT_BAS_INDIGENA'])
+        }] if niveis_ofertados else []
+
+        escolas_docs.append({
+            "co_entidade": int(row['CO_ENTIDADE']),
+            "nome_escola": row['NO_ENTIDADE'],
+            "municipio_id": id_municipio_mongo,
+            "uf_sigla": row['SG_UF'],
+            "regiao_nome": row['NO_REGIAO'],
+            "tipo_dependencia": MAPA_DEPENDENCIA.get(row['TP_DEPENDENCIA'], 'NI'),
+            "tipo_localizacao": MAPA_LOCALIZACAO.get(row['TP_LOCALIZACAO'], 'NI'),
+            "situacao_funcionamento": MAPA_SITUACAO.get(row['TP_SITUACAO_FUNCIONAMENTO'], 'NI'),
+            "indigena": bool(row['IN_EDUCACAO_INDIGENA']),
+            "turmas": turmas,
+            "matriculas": matriculas
+        })
+    return escolas_docs
+
+
+def escolas_sinteticas(n, n_municipios=5570, semente=42):
+    """Dataframe de escolas com os mesmos tipos compactos produzidos por censo.ler_censo_em_blocos."""
+    rng = np.random.default_rng(semente)
+
+    def codigos(maximo, prob_ausente):
+        valores = rng.integers(1, maximo + 1, n).astype('float32')
+        valores[rng.random(n) < prob_ausente] = np.nan
+        return valores
+
+    def quantidades(maximo, dtype='int32'):
+        valores = rng.integers(0, maximo + 1, n)
+        valores[rng.random(n) < 0.4] = 0
+        return valores.astype(dtype)
+
+    co_municipio = rng.integers(1100000, 1100000 + n_municipios, n).astype('int32')
+    return pd.DataFrame({
+        'NU_ANO_CENSO': np.full(n, 2023, dtype='int16'),
+        'NO_REGIAO': pd.Categorical(rng.choice(REGIOES, n), dtype=DTYPES_LEITURA['NO_REGIAO']),
+        'SG_UF': pd.Categorical(rng.choice(UFS, n), dtype=DTYPES_LEITURA['SG_UF']),
+        'CO_MUNICIPIO': co_municipio,
+        'NO_MUNICIPIO': [f"MUNICIPIO {co}" for co in co_municipio.tolist()],
+        'NO_ENTIDADE': [f"ESCOLA {i}" for i in range(n)],
+        'CO_ENTIDADE': np.arange(11000000, 11000000 + n, dtype='int32'),
+        'TP_DEPENDENCIA': codigos(4, 0.01),
+        'TP_LOCALIZACAO': codigos(2, 0.01),
+        'TP_SITUACAO_FUNCIONAMENTO': codigos(4, 0.01),
+        'TP_LOCALIZACAO_DIFERENCIADA': codigos(3, 0.3),
+        'IN_EDUCACAO_INDIGENA': (rng.random(n) < 0.02).astype('float32'),
+        'IN_INF': quantidades(1, 'int8'), 'IN_FUND_AI': quantidades(1, 'int8'),
+        'IN_FUND_AF': quantidades(1, 'int8'), 'IN_MED': quantidades(1, 'int8'), 'IN_EJA': quantidades(1, 'int8'),
+        'QT_MAT_BAS': quantidades(1500), 'QT_MAT_BAS_INDIGENA': quantidades(30),
+        'QT_TUR_INF': quantidades(10), 'QT_TUR_FUND': quantidades(30), 'QT_TUR_MED': quantidades(15),
+        'QT_TUR_EJA': quantidades(5),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escolas', type=int, default=None,
+                        help="Gera N escolas sintéticas em vez de ler o CSV do censo.")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.escolas is None and os.path.exists(CAMINHO_CENSO):
+        print(f"... Lendo {CAMINHO_CENSO}")
+        escolas_df = agregar_censo(CAMINHO_CENSO).escolas()
+    else:
+        escolas_df = escolas_sinteticas(args.escolas or 180_000)
+    municipio_map = {int(co): ObjectId() for co in escolas_df['CO_MUNICIPIO'].unique()}
+    print(f"📦 {len(escolas_df)} escolas, {len(municipio_map)} municípios, {args.repeticoes} repetições")
+
+    docs_antigos, tempos_antigos = cronometrar(
+        lambda: documentos_escolas_iterrows(escolas_df, municipio_map), args.repeticoes)
+    docs_novos, tempos_novos = cronometrar(
+        lambda: list(gerar_documentos_escolas(escolas_df, municipio_map)), args.repeticoes)
+
+    identicos = (len(docs_antigos) == len(docs_novos)
+                 and all(BSON.encode(a) == BSON.encode(b) for a, b in zip(docs_antigos, docs_novos)))
+
+    mediana_antiga, mediana_nova = statistics.median(tempos_antigos), statistics.median(tempos_novos)
+    print(f"⏱️  iterrows : {mediana_antiga:8.3f} s (mediana) | {len(docs_antigos) / mediana_antiga:10.0f} docs/s")
+    print(f"⏱️  colunar  : {mediana_nova:8.3f} s (mediana) | {len(docs_novos) / mediana_nova:10.0f} docs/s")
+    print(f"🚀 Aceleração: {mediana_antiga / mediana_nova:.1f}x")
+    print(f"{'✅' if identicos else '❌'} Documentos BSON idênticos: {'SIM' if identicos else 'NÃO'}")
+    if not identicos:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Compara o formato detalhado e a matriz compacta de nivel_instrucao: tamanho da coleção e tempo de varredura.
+
+Uso:
+    python benchmark_instrucao.py --mongomock                       # sem servidor (sem estatísticas de armazenamento)
+    python benchmark_instrucao.py --iniciar-mongod --municipios 5570
+    python benchmark_instrucao.py --uri mongodb://localhost:27017/ --saida instrucao.json
+"""
+import argparse
+import json
+import statistics
+
+import numpy as np
+from bson import BSON
+
+from benchmark_util import cronometrar, servidor_benchmark
+from nivel_instrucao import (NIVEIS, FAIXAS_ETARIAS, CAMPO_MATRIZ, codificar, decodificar, caminho_celula,
+                             expr_qt_pessoas)
+
+BANCO_BENCHMARK = 'benchmark_instrucao'
+# Consulta típica: população com superior completo entre 25 anos ou mais
+NIVEL, FAIXA, MINIMO = 'Superior completo', '25 anos ou mais', 1000
+
+
+def municipios_sinteticos(n, semente=42, densidade=0.4):
+    """Documentos de Municipios no formato detalhado, com ~40% das 76 células preenchidas (como na planilha)."""
+    rng = np.random.default_rng(semente)
+    docs = []
+    for i in range(n):
+        presentes = rng.random((len(NIVEIS), len(FAIXAS_ETARIAS))) < densidade
+        valores = rng.integers(0, 20_000, presentes.shape)
+        docs.append({
+            "co_municipio": 1100000 + i,
+            "nome_municipio": f"MUNICIPIO {i}",
+            "uf_sigla": "RO",
+            "indicadores_educacionais": {
+                "nivel_instrucao": [
+                    {"faixa_etaria": faixa, "nivel": nivel, "qt_pessoas": int(valores[a, b])}
+                    for a, nivel in enumerate(NIVEIS) for b, faixa in enumerate(FAIXAS_ETARIAS) if presentes[a, b]
+                ]
+            }
+        })
+    return docs
+
+
+def compactar(doc):
+    compacto = {k: v for k, v in doc.items() if k != 'indicadores_educacionais'}
+    compacto['indicadores_educacionais'] = {CAMPO_MATRIZ: codificar(doc['indicadores_educacionais']['nivel_instrucao'])}
+    return compacto
+
+
+def mediana_ms(funcao, repeticoes):
+    """(resultado, mediana em ms) de `repeticoes` execuções de `funcao`."""
+    resultado, tempos = cronometrar(funcao, repeticoes)
+    return resultado, round(statistics.median(tempos) * 1000, 2)
+
+
+def consultas_layout(colecao, compacto):
+    """(varredura completa, filtro por célula, soma da célula em todos os municípios)."""
+    if compacto:
+        filtro = {caminho_celula(NIVEL, FAIXA): {"$gte": MINIMO}}
+        soma = [{"$group": {"_id": None, "total": {"$sum": expr_qt_pessoas(NIVEL, FAIXA)}}}]
+    else:
+        filtro = {"indicadores_educacionais.nivel_instrucao": {
+            "$elemMatch": {"nivel": NIVEL, "faixa_etaria": FAIXA, "qt_pessoas": {"$gte": MINIMO}}}}
+        soma = [
+            {"$unwind": "$indicadores_educacionais.nivel_instrucao"},
+            {"$match": {"indicadores_educacionais.nivel_instrucao.nivel": NIVEL,
+                        "indicadores_educacionais.nivel_instrucao.faixa_etaria": FAIXA}},
+            {"$group": {"_id": None, "total": {"$sum": "$indicadores_educacionais.nivel_instrucao.qt_pessoas"}}},
+        ]
+    return (
+        lambda: sum(1 for _ in colecao.find({}, {"indicadores_educacionais": 1})),
+        lambda: colecao.count_documents(filtro),
+        lambda: next(iter(colecao.aggregate(soma)), {}).get("total", 0),
+    )
+
+
+def medir_layout(db, nome, docs, compacto, repeticoes):
+    colecao = db[nome]
+    colecao.drop()
+    colecao.insert_many(docs)
+    varredura, filtro, soma = consultas_layout(colecao, compacto)
+    n_varridos, ms_varredura = mediana_ms(varredura, repeticoes)
+    n_filtrados, ms_filtro = mediana_ms(filtro, repeticoes)
+    total, ms_soma = mediana_ms(soma, repeticoes)
+    medicao = {
+        "bytes_bson": sum(len(BSON.encode(doc)) for doc in docs),
+        "varredura_ms": ms_varredura,
+        "filtro_celula_ms": ms_filtro,
+        "soma_celula_ms": ms_soma,
+        "documentos": n_varridos,
+        "filtrados": n_filtrados,
+        "soma": total,
+    }
+    try:
+        stats = db.command('collStats', nome)
+        medicao.update({"tamanho_dados": stats.get('size'), "tamanho_armazenado": stats.get('storageSize')})
+    except Exception as e:  # mongomock não implementa collStats
+        medicao["collstats_indisponivel"] = str(e)
+    return medicao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--iniciar-mongod', action='store_true')
+    parser.add_argument('--mongomock', action='store_true')
+    parser.add_argument('--municipios', type=int, default=5570)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados.")
+    args = parser.parse_args()
+
+    detalhados = municipios_sinteticos(args.municipios)
+    compactos = [compactar(doc) for doc in detalhados]
+    ida_e_volta = all(decodificar(c['indicadores_educacionais'][CAMPO_MATRIZ]) == d['indicadores_educacionais']['nivel_instrucao']
+                      for c, d in zip(compactos, detalhados))
+    print(f"{'✅' if ida_e_volta else '❌'} Codificar/decodificar reproduz o formato detalhado: {'SIM' if ida_e_volta else 'NÃO'}")
+
+    with servidor_benchmark(args.uri, args.iniciar_mongod, args.mongomock) as (client, _):
+        db = client[BANCO_BENCHMARK]
+        resultados = {
+            "municipios": args.municipios,
+            "detalhado": medir_layout(db, 'MunicipiosDetalhado', detalhados, False, args.repeticoes),
+            "compacto": medir_layout(db, 'MunicipiosCompacto', compactos, True, args.repeticoes),
+        }
+        db.client.drop_database(BANCO_BENCHMARK)
+
+    d, c = resultados["detalhado"], resultados["compacto"]
+    for rotulo, chave in [("BSON (bytes)", "bytes_bson"), ("Armazenado (bytes)", "tamanho_armazenado"),
+                          ("Varredura (ms)", "varredura_ms"), ("Filtro por célula (ms)", "filtro_celula_ms"),
+                          ("Soma da célula (ms)", "soma_celula_ms")]:
+        if d.get(chave) and c.get(chave):
+            print(f"📏 {rotulo:<24} detalhado={d[chave]:>14,} compacto={c[chave]:>14,}  ({d[chave] / c[chave]:.1f}x)")
+    mesmos = (d["filtrados"], d["soma"]) == (c["filtrados"], c["soma"])
+    print(f"{'✅' if mesmos else '❌'} Mesmos resultados nos dois formatos: {'SIM' if mesmos else 'NÃO'}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados gravados em {args.saida}")
+    if not (ida_e_volta and mesmos):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
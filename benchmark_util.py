@@ -0,0 +1,95 @@
+import contextlib
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+from pymongo import MongoClient
+
+# --- FERRAMENTAS COMUNS DOS BENCHMARKS: PERCENTIS, CRONÔMETRO E SERVIDOR DE TESTE ---
+
+
+def percentil(valores, p):
+    """Percentil por vizinho mais próximo (0.0 para uma lista vazia)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def cronometrar(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes; devolve (último resultado, [segundos de cada execução])."""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, tempos
+
+
+def iniciar_mongod():
+    """Sobe um mongod descartável (precisa do binário no PATH); devolve (processo, uri, diretório)."""
+    binario = shutil.which('mongod')
+    if not binario:
+        raise SystemExit("❌ mongod não encontrado no PATH.")
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+    diretorio = tempfile.mkdtemp(prefix='bench_mongod_')
+    processo = subprocess.Popen([binario, '--dbpath', diretorio, '--port', str(porta), '--bind_ip', '127.0.0.1'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    uri = f'mongodb://127.0.0.1:{porta}/'
+    for _ in range(100):
+        client = MongoClient(uri, serverSelectionTimeoutMS=200)
+        try:
+            client.admin.command('ping')
+            return processo, uri, diretorio
+        except Exception:
+            time.sleep(0.1)
+        finally:
+            client.close()
+    parar_mongod(processo, diretorio)
+    raise SystemExit("❌ mongod não respondeu a tempo.")
+
+
+def parar_mongod(processo, diretorio):
+    """Derruba o mongod de iniciar_mongod e apaga os seus dados."""
+    processo.terminate()
+    processo.wait()
+    shutil.rmtree(diretorio, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def servidor_benchmark(uri, iniciar_mongod_temporario=False, usar_mongomock=False, conectar=None):
+    """Cliente para um benchmark: mongomock no processo, um mongod temporário ou o servidor de `uri`.
+
+    Entrega (client, uri); a uri do mongomock é 'mongomock://'. `conectar(uri)` abre o cliente
+    real (padrão: MongoClient com 5 s de seleção de servidor). Ao sair, fecha o cliente e
+    derruba o mongod temporário.
+    """
+    processo = diretorio = None
+    if usar_mongomock:
+        import mongomock
+        client, uri = mongomock.MongoClient(), 'mongomock://'
+    else:
+        if iniciar_mongod_temporario:
+            processo, uri, diretorio = iniciar_mongod()
+        try:
+            client = (conectar or _conectar)(uri)
+        except BaseException:
+            if processo:
+                parar_mongod(processo, diretorio)
+            raise
+    try:
+        yield client, uri
+    finally:
+        client.close()
+        if processo:
+            parar_mongod(processo, diretorio)
+
+
+def _conectar(uri):
+    return MongoClient(uri, serverSelectionTimeoutMS=5000)
@@ -0,0 +1,184 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from bson import BSON, ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import DocumentTooLarge
+
+# --- CACHE DE RESULTADOS DAS CONSULTAS, INVALIDADO A CADA MIGRAÇÃO ---
+
+COLECAO_METADADOS = 'Metadados'
+ID_GERACAO = 'geracao'
+COLECAO_CACHE = 'CacheConsultas'
+INDICE_TTL = 'criado_em_ttl'
+TTL_CACHE_PADRAO = 24 * 3600
+MAX_ENTRADAS_LRU_PADRAO = 128
+# Margem abaixo do limite de 16 MB de um documento BSON
+LIMITE_BYTES_ENTRADA = 15 * 1024 * 1024
+
+
+def registrar_geracao(db, contagens=None):
+    """Carimba uma nova geração dos dados ao fim da migração e devolve o seu id.
+
+    Todo resultado guardado com a geração anterior deixa de ser encontrado; as entradas
+    antigas do cache em Mongo são apagadas aqui mesmo (e o TTL cuida das que sobrarem).
+    """
+    geracao = str(ObjectId())
+    db[COLECAO_METADADOS].replace_one({'_id': ID_GERACAO}, {
+        '_id': ID_GERACAO,
+        'geracao': geracao,
+        'concluida_em': datetime.now(timezone.utc),
+        'contagens': contagens or {},
+    }, upsert=True)
+    db[COLECAO_CACHE].delete_many({'geracao': {'$ne': geracao}})
+    return geracao
+
+
+def geracao_atual(db):
+    """Id da última geração carimbada, ou None se o banco foi carregado antes da existência do carimbo."""
+    doc = db[COLECAO_METADADOS].find_one({'_id': ID_GERACAO}, {'geracao': 1})
+    return doc['geracao'] if doc else None
+
+
+def chave_cache(consulta, geracao, parametros=None):
+    """Hash da coleção + pipeline + parâmetros, prefixado pela geração dos dados."""
+    conteudo = BSON.encode({'colecao': consulta.colecao, 'pipeline': consulta.pipeline, 'parametros': parametros or {}})
+    return f"{geracao}:{hashlib.blake2b(conteudo, digest_size=16).hexdigest()}"
+
+
+class CacheMongo:
+    """Resultados guardados na coleção CacheConsultas, lidos pelo `_id` e expirados por TTL."""
+
+    def __init__(self, db, ttl_segundos=TTL_CACHE_PADRAO):
+        self.colecao = db[COLECAO_CACHE]
+        self._garantir_indice_ttl(db, ttl_segundos)
+
+    def _garantir_indice_ttl(self, db, ttl_segundos):
+        """Cria o índice TTL ou, se ele já existe com outra validade, altera só a validade (collMod).
+
+        Recriar com outro expireAfterSeconds falharia com IndexOptionsConflict no servidor.
+        """
+        existente = self.colecao.index_information().get(INDICE_TTL)
+        if existente is None:
+            self.colecao.create_index([('criado_em', ASCENDING)], name=INDICE_TTL, expireAfterSeconds=ttl_segundos)
+        elif existente.get('expireAfterSeconds') != ttl_segundos:
+            db.command('collMod', COLECAO_CACHE, index={'name': INDICE_TTL, 'expireAfterSeconds': ttl_segundos})
+
+    def obter(self, chave):
+        doc = self.colecao.find_one({'_id': chave}, {'resultado': 1})
+        return doc['resultado'] if doc else None
+
+    def guardar(self, chave, nome, geracao, resultado):
+        """Devolve False quando o resultado não cabe em um documento."""
+        entrada = {'_id': chave, 'consulta': nome, 'geracao': geracao,
+                   'criado_em': datetime.now(timezone.utc), 'resultado': resultado}
+        if len(BSON.encode(entrada)) > LIMITE_BYTES_ENTRADA:
+            return False
+        try:
+            self.colecao.replace_one({'_id': chave}, entrada, upsert=True)
+        except DocumentTooLarge:
+            return False
+        return True
+
+
+class CacheLRU:
+    """Resultados em memória no próprio processo, limitados às `max_entradas` mais recentes."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_LRU_PADRAO):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            if chave not in self._entradas:
+                return None
+            self._entradas.move_to_end(chave)
+            return self._entradas[chave]
+
+    def guardar(self, chave, nome, geracao, resultado):
+        with self._trava:
+            self._entradas[chave] = resultado
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return True
+
+
+class CacheConsultas:
+    """Camada de cache na frente das consultas do registro, com estatísticas de acertos e falhas.
+
+    A geração é relida a cada consulta (leitura pontual pelo `_id`), de modo que uma nova
+    migração invalida tudo sem nenhuma ação do lado de quem consulta. Sem geração carimbada
+    no banco, o cache é ignorado.
+    """
+
+    def __init__(self, db, armazenamento, limite_bytes_entrada=LIMITE_BYTES_ENTRADA):
+        self.db = db
+        self.armazenamento = armazenamento
+        # Quem acumula um resultado para guardá-lo desiste ao passar deste tamanho (BSON)
+        self.limite_bytes_entrada = limite_bytes_entrada
+        self._trava = threading.Lock()
+        self.estatisticas = {"acertos": 0, "falhas": 0, "ignorados": 0, "nao_armazenados": 0}
+        self.por_consulta = {}
+
+    def _contar(self, nome, evento):
+        with self._trava:
+            self.estatisticas[evento] += 1
+            self.por_consulta.setdefault(nome, {"acertos": 0, "falhas": 0})
+            if evento in ("acertos", "falhas"):
+                self.por_consulta[nome][evento] += 1
+
+    def consultar(self, consulta, parametros=None):
+        """Devolve (chave, resultado guardado ou None). Chave None indica que não há cache para usar."""
+        geracao = geracao_atual(self.db)
+        if geracao is None:
+            self._contar(consulta.nome, "ignorados")
+            return None, None
+        chave = chave_cache(consulta, geracao, parametros)
+        resultado = self.armazenamento.obter(chave)
+        self._contar(consulta.nome, "acertos" if resultado is not None else "falhas")
+        return chave, resultado
+
+    def guardar(self, chave, consulta, resultado):
+        geracao = chave.split(':', 1)[0]
+        if not self.armazenamento.guardar(chave, consulta.nome, geracao, resultado):
+            self._contar(consulta.nome, "nao_armazenados")
+
+    def descartar(self, consulta):
+        """Registra um resultado que não será guardado por passar de `limite_bytes_entrada`."""
+        self._contar(consulta.nome, "nao_armazenados")
+
+    def executar(self, consulta, calcular, parametros=None):
+        """Resultado de `consulta`, vindo do cache ou de `calcular()` (que é então guardado)."""
+        chave, resultado = self.consultar(consulta, parametros)
+        if resultado is None:
+            resultado = list(calcular())
+            if chave is not None:
+                self.guardar(chave, consulta, resultado)
+        return resultado
+
+    def relatorio(self):
+        total = self.estatisticas["acertos"] + self.estatisticas["falhas"]
+        return {
+            **self.estatisticas,
+            "taxa_acerto": round(self.estatisticas["acertos"] / total, 3) if total else 0.0,
+            "por_consulta": self.por_consulta,
+        }
+
+
+def criar_cache(db, tipo, ttl_segundos=TTL_CACHE_PADRAO, max_entradas=MAX_ENTRADAS_LRU_PADRAO):
+    """tipo: 'mongo', 'memoria' ou 'nenhum' (devolve None)."""
+    if tipo == 'mongo':
+        return CacheConsultas(db, CacheMongo(db, ttl_segundos))
+    if tipo == 'memoria':
+        return CacheConsultas(db, CacheLRU(max_entradas))
+    return None
+
+
+def imprimir_relatorio_cache(relatorio):
+    print(f"🗃️  Cache: {relatorio['acertos']} acertos, {relatorio['falhas']} falhas "
+          f"(taxa de acerto {relatorio['taxa_acerto']:.0%}), {relatorio['ignorados']} sem geração, "
+          f"{relatorio['nao_armazenados']} grandes demais para guardar")
@@ -0,0 +1,227 @@
+"""Teste de carga da API de leitura (api.py): requisições/s e latência p50/p95/p99 por rota.
+
+Cada thread mantém a sua conexão HTTP (keep-alive) e sorteia rotas segundo a mistura pedida,
+com municípios e escolas reais lidos da própria API antes da medição. Com `--etag`, repete
+as URLs já vistas enviando If-None-Match, como faria um cliente com cache.
+
+Uso:
+    python carga_api.py --url http://localhost:8080 --concorrencia 32 --duracao 30
+    python carga_api.py --mongomock --escolas 20000 --concorrencia 8 --duracao 10   # tudo local, sem servidor
+    python carga_api.py --iniciar-mongod --escolas 100000 --etag --saida carga.json
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmark_consultas import BANCO_SINTETICO, popular_base_sintetica
+from benchmark_util import percentil, servidor_benchmark
+
+MISTURA_PADRAO = 'municipio=4,escolas=2,escola=3,lista=1,consulta=1'
+CONSULTAS_CARGA = ['consulta1', 'consulta3', 'consulta5']
+UFS_CARGA = ['AM', 'RR', 'MS', 'BA', 'PA', 'MT']
+
+
+def _ler_mistura(texto):
+    mistura = {}
+    for parte in texto.split(','):
+        rota, _, peso = parte.partition('=')
+        mistura[rota.strip()] = float(peso or 1)
+    return mistura
+
+
+class Cliente:
+    """Conexão HTTP persistente de uma thread."""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.host, self.porta = partes.hostname, partes.port or 80
+        self.conexao = None
+
+    def get(self, caminho, cabecalhos=None):
+        for tentativa in range(2):
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=60)
+            try:
+                self.conexao.request('GET', caminho, headers=cabecalhos or {})
+                resposta = self.conexao.getresponse()
+                return resposta.status, resposta.read(), resposta.getheader('ETag')
+            except (http.client.HTTPException, ConnectionError):
+                # Conexão fechada pelo servidor entre requisições: reabre uma vez
+                self.conexao.close()
+                self.conexao = None
+                if tentativa:
+                    raise
+
+    def fechar(self):
+        if self.conexao:
+            self.conexao.close()
+
+
+def amostrar_ids(url, municipios=200, municipios_com_escolas=20):
+    """(co_municipio, co_entidade) existentes, lidos pela própria API."""
+    cliente = Cliente(url)
+    try:
+        status, corpo, _ = cliente.get(f"/municipios?limite={municipios}&campos=co_municipio")
+        if status != 200:
+            raise SystemExit(f"❌ A API respondeu {status} em /municipios: {corpo[:200]!r}")
+        cos_municipio = [m['co_municipio'] for m in json.loads(corpo)['itens']]
+        cos_entidade = []
+        for co in cos_municipio[:municipios_com_escolas]:
+            status, corpo, _ = cliente.get(f"/municipios/{co}/escolas?limite=50&campos=co_entidade")
+            if status == 200:
+                cos_entidade.extend(e['co_entidade'] for e in json.loads(corpo)['itens'])
+    finally:
+        cliente.fechar()
+    if not cos_municipio or not cos_entidade:
+        raise SystemExit("❌ Banco sem municípios ou escolas para o teste de carga.")
+    return cos_municipio, cos_entidade
+
+
+def gerador_de_rotas(cos_municipio, cos_entidade, rng, consultas=CONSULTAS_CARGA):
+    return {
+        'municipio': lambda: f"/municipios/{rng.choice(cos_municipio)}",
+        'escolas': lambda: f"/municipios/{rng.choice(cos_municipio)}/escolas?limite=50",
+        'escola': lambda: f"/escolas/{rng.choice(cos_entidade)}",
+        'lista': lambda: f"/municipios?uf={rng.choice(UFS_CARGA)}&limite=50&campos=co_municipio,nome_municipio,populacao_indigena",
+        'consulta': lambda: f"/consultas/{rng.choice(consultas)}?uf={rng.choice(UFS_CARGA)}&limite=5",
+    }
+
+
+def executar_carga(url, concorrencia, duracao, mistura, usar_etag=False, semente=1, consultas=CONSULTAS_CARGA):
+    cos_municipio, cos_entidade = amostrar_ids(url)
+    medicoes = defaultdict(list)
+    status_por_rota = defaultdict(Counter)
+    trava = threading.Lock()
+    fim = time.perf_counter() + duracao
+
+    def trabalhador(numero):
+        rng = random.Random(semente + numero)
+        rotas = gerador_de_rotas(cos_municipio, cos_entidade, rng, consultas)
+        nomes, pesos = list(mistura), list(mistura.values())
+        cliente, etags = Cliente(url), {}
+        locais, status_locais = defaultdict(list), defaultdict(Counter)
+        try:
+            while time.perf_counter() < fim:
+                rota = rng.choices(nomes, pesos)[0]
+                caminho = rotas[rota]()
+                cabecalhos = {'If-None-Match': etags[caminho]} if usar_etag and caminho in etags else None
+                inicio = time.perf_counter()
+                try:
+                    status, _, etag = cliente.get(caminho, cabecalhos)
+                except Exception:
+                    status, etag = 'erro', None
+                locais[rota].append(time.perf_counter() - inicio)
+                status_locais[rota][status] += 1
+                if usar_etag and etag:
+                    etags[caminho] = etag
+        finally:
+            cliente.fechar()
+        with trava:
+            for rota, tempos in locais.items():
+                medicoes[rota].extend(tempos)
+                status_por_rota[rota].update(status_locais[rota])
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+
+    def resumo(tempos, status):
+        return {
+            "requisicoes": len(tempos),
+            "req_por_segundo": round(len(tempos) / decorrido, 1),
+            "p50_ms": round(percentil(tempos, 50) * 1000, 2),
+            "p95_ms": round(percentil(tempos, 95) * 1000, 2),
+            "p99_ms": round(percentil(tempos, 99) * 1000, 2),
+            "max_ms": round(max(tempos) * 1000, 2),
+            "status": {str(k): v for k, v in status.items()},
+        }
+
+    todos = [t for tempos in medicoes.values() for t in tempos]
+    if not todos:
+        raise SystemExit("❌ Nenhuma requisição concluída.")
+    status_total = sum(status_por_rota.values(), Counter())
+    return {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "url": url,
+        "concorrencia": concorrencia,
+        "duracao_s": round(decorrido, 2),
+        "etag": usar_etag,
+        "mistura": mistura,
+        "total": resumo(todos, status_total),
+        "rotas": {rota: resumo(tempos, status_por_rota[rota]) for rota, tempos in sorted(medicoes.items())},
+    }
+
+
+def imprimir_relatorio(relatorio):
+    total = relatorio["total"]
+    print(f"\n🚦 {total['requisicoes']} requisições em {relatorio['duracao_s']} s com {relatorio['concorrencia']} "
+          f"conexões: {total['req_por_segundo']} req/s | p50={total['p50_ms']} ms p95={total['p95_ms']} ms "
+          f"p99={total['p99_ms']} ms max={total['max_ms']} ms | status {total['status']}")
+    for rota, r in relatorio["rotas"].items():
+        print(f"   {rota:<10} {r['requisicoes']:>7} req ({r['req_por_segundo']:>8} req/s) "
+              f"p50={r['p50_ms']:>8} ms p95={r['p95_ms']:>8} ms p99={r['p99_ms']:>8} ms | {r['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8080', help="API já no ar.")
+    parser.add_argument('--concorrencia', type=int, default=16, help="Threads, cada uma com uma conexão keep-alive.")
+    parser.add_argument('--duracao', type=float, default=15, help="Segundos de medição.")
+    parser.add_argument('--mistura', default=MISTURA_PADRAO,
+                        help="Pesos das rotas: municipio, escolas, escola, lista e consulta.")
+    parser.add_argument('--consultas', nargs='+', default=CONSULTAS_CARGA,
+                        help="Consultas sorteadas na rota consulta (o mongomock não executa $round: use consulta1 consulta3).")
+    parser.add_argument('--etag', action='store_true', help="Revalida as URLs repetidas com If-None-Match.")
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados.")
+    parser.add_argument('--mongomock', action='store_true',
+                        help="Sobe a API neste processo sobre um mongomock com dados sintéticos.")
+    parser.add_argument('--iniciar-mongod', action='store_true',
+                        help="Sobe um mongod temporário com dados sintéticos e a API neste processo.")
+    parser.add_argument('--escolas', type=int, default=20_000, help="Escolas sintéticas (com --mongomock/--iniciar-mongod).")
+    parser.add_argument('--pool', type=int, default=None, help="maxPoolSize da API local (padrão: concorrência).")
+    args = parser.parse_args()
+
+    mistura = _ler_mistura(args.mistura)
+    url = args.url
+    with contextlib.ExitStack() as pilha:
+        if args.mongomock or args.iniciar_mongod:
+            from api import ServicoLeitura, conectar, criar_servidor
+            from cache_consultas import criar_cache, registrar_geracao
+            from indices import criar_indices
+            client, _ = pilha.enter_context(servidor_benchmark(
+                None, args.iniciar_mongod, args.mongomock, lambda uri: conectar(uri, args.pool or args.concorrencia)))
+            db = client[BANCO_SINTETICO]
+            popular_base_sintetica(db, args.escolas)
+            if not args.mongomock:
+                criar_indices(db)
+            registrar_geracao(db)
+            servico = ServicoLeitura(db, criar_cache(db, 'memoria'))
+            servidor = criar_servidor(servico, '127.0.0.1', 0)
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            pilha.callback(servidor.server_close)
+            pilha.callback(servidor.shutdown)
+            url = f"http://127.0.0.1:{servidor.server_address[1]}"
+            print(f"🌐 API local em {url}")
+
+        relatorio = executar_carga(url, args.concorrencia, args.duracao, mistura, args.etag, consultas=args.consultas)
+
+    imprimir_relatorio(relatorio)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
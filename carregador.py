@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+
+from benchmark_util import percentil
+
+# --- CARGA EM LOTES PARALELA NO MONGODB ---
+
+TAMANHO_LOTE_PADRAO = 1000
+WORKERS_PADRAO = 4
+
+
+def _em_lotes(documentos, tamanho_lote):
+    lote = []
+    for doc in documentos:
+        lote.append(doc)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _inserir(colecao, lote):
+    colecao.insert_many(lote, ordered=False)
+
+
+def _executar_bulk(colecao, lote):
+    colecao.bulk_write(lote, ordered=False)
+
+
+class CarregadorEmLotes:
+    """Grava qualquer iterador de documentos em lotes `insert_many(ordered=False)` paralelos.
+
+    Os workers compartilham o pool de conexões do MongoClient da coleção. No máximo
+    `max_lotes_pendentes` lotes ficam em memória aguardando gravação: quando o limite é
+    atingido, quem produz os documentos espera (backpressure), e assim a transformação
+    e a escrita se sobrepõem sem acumular o conjunto inteiro.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE_PADRAO, workers=WORKERS_PADRAO, max_lotes_pendentes=None, verboso=False):
+        self.tamanho_lote = tamanho_lote
+        self.workers = workers
+        self.max_lotes_pendentes = max_lotes_pendentes or workers * 2
+        self.verboso = verboso
+
+    def _gravar_lote(self, colecao, numero, lote, gravar):
+        inicio = time.perf_counter()
+        gravar(colecao, lote)
+        latencia = time.perf_counter() - inicio
+        if self.verboso:
+            print(f"   lote {numero}: {len(lote)} docs em {latencia * 1000:.1f} ms ({len(lote) / latencia:.0f} docs/s)")
+        return len(lote), latencia
+
+    def carregar(self, colecao, documentos):
+        """Consome `documentos` e grava tudo em `colecao`; devolve um relatório da carga.
+
+        Documentos sem `_id` recebem um ObjectId gerado no cliente antes do envio.
+        """
+        def preparar(lote):
+            for doc in lote:
+                if '_id' not in doc:
+                    doc['_id'] = ObjectId()
+
+        return self._processar(colecao, documentos, _inserir, preparar)
+
+    def executar_operacoes(self, colecao, operacoes):
+        """Executa operações de escrita (InsertOne, ReplaceOne, DeleteMany...) em lotes `bulk_write` não ordenados."""
+        return self._processar(colecao, operacoes, _executar_bulk)
+
+    def _processar(self, colecao, itens, gravar, preparar=None):
+        vagas = threading.BoundedSemaphore(self.max_lotes_pendentes)
+        futuros = []
+        inicio = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for numero, lote in enumerate(_em_lotes(itens, self.tamanho_lote), start=1):
+                if preparar:
+                    preparar(lote)
+                vagas.acquire()
+                futuro = executor.submit(self._gravar_lote, colecao, numero, lote, gravar)
+                futuro.add_done_callback(lambda _: vagas.release())
+                futuros.append(futuro)
+            resultados = [futuro.result() for futuro in futuros]
+
+        duracao = time.perf_counter() - inicio
+        total = sum(n for n, _ in resultados)
+        latencias = sorted(latencia for _, latencia in resultados)
+        return {
+            "colecao": colecao.name,
+            "documentos": total,
+            "lotes": len(resultados),
+            "segundos": round(duracao, 3),
+            "docs_por_segundo": round(total / duracao, 1) if duracao > 0 else 0.0,
+            "latencia_lote_ms": {
+                "p50": round(percentil(latencias, 50) * 1000, 1),
+                "p95": round(percentil(latencias, 95) * 1000, 1),
+                "max": round(latencias[-1] * 1000, 1) if latencias else 0.0,
+            },
+        }
+
+
+def imprimir_relatorio_carga(relatorio):
+    latencia = relatorio["latencia_lote_ms"]
+    print(f"📦 {relatorio['colecao']}: {relatorio['documentos']} docs em {relatorio['lotes']} lotes, "
+          f"{relatorio['segundos']} s ({relatorio['docs_por_segundo']} docs/s) | "
+          f"latência por lote p50={latencia['p50']} ms p95={latencia['p95']} ms max={latencia['max']} ms")
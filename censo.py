@@ -0,0 +1,384 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- LEITURA EM BLOCOS DOS MICRODADOS DO CENSO ESCOLAR ---
+
+# Colunas que a migração realmente utiliza; as demais (centenas) nunca são carregadas.
+COLUNAS_CENSO = [
+    'NU_ANO_CENSO', 'NO_REGIAO', 'SG_UF', 'NO_MUNICIPIO', 'CO_MUNICIPIO',
+    'NO_ENTIDADE', 'CO_ENTIDADE', 'TP_DEPENDENCIA', 'TP_LOCALIZACAO',
+    'TP_LOCALIZACAO_DIFERENCIADA', 'TP_SITUACAO_FUNCIONAMENTO', 'IN_EDUCACAO_INDIGENA',
+    'IN_INF', 'IN_FUND_AI', 'IN_FUND_AF', 'IN_MED', 'IN_EJA',
+    'QT_MAT_BAS', 'QT_MAT_BAS_INDIGENA', 'QT_TUR_INF', 'QT_TUR_FUND', 'QT_TUR_MED', 'QT_TUR_EJA'
+]
+
+UFS = [
+    'RO', 'AC', 'AM', 'RR', 'PA', 'AP', 'TO', 'MA', 'PI', 'CE', 'RN', 'PB', 'PE', 'AL',
+    'SE', 'BA', 'MG', 'ES', 'RJ', 'SP', 'PR', 'SC', 'RS', 'MS', 'MT', 'GO', 'DF'
+]
+REGIOES = ['Norte', 'Nordeste', 'Sudeste', 'Sul', 'Centro-Oeste']
+
+# Categorias fixas: blocos diferentes compartilham o mesmo dtype e podem ser concatenados sem virar object.
+DTYPES_LEITURA = {
+    'SG_UF': pd.CategoricalDtype(UFS),
+    'NO_REGIAO': pd.CategoricalDtype(REGIOES),
+}
+
+# Colunas zeradas quando ausentes/inválidas (mesmo tratamento do carregamento integral), com o tipo compacto de cada uma.
+COLUNAS_ZERADAS = {
+    'QT_MAT_BAS': 'int32', 'QT_MAT_BAS_INDIGENA': 'int32',
+    'QT_TUR_INF': 'int32', 'QT_TUR_FUND': 'int32', 'QT_TUR_MED': 'int32', 'QT_TUR_EJA': 'int32',
+    'NU_ANO_CENSO': 'int16',
+    'IN_INF': 'int8', 'IN_FUND_AI': 'int8', 'IN_FUND_AF': 'int8', 'IN_MED': 'int8', 'IN_EJA': 'int8'
+}
+
+# Códigos que NÃO são zerados: o valor ausente precisa continuar ausente (vira 'NI' nos mapeamentos),
+# por isso usam float32 em vez de inteiro.
+COLUNAS_CODIGO = [
+    'TP_DEPENDENCIA', 'TP_LOCALIZACAO', 'TP_SITUACAO_FUNCIONAMENTO',
+    'TP_LOCALIZACAO_DIFERENCIADA', 'IN_EDUCACAO_INDIGENA'
+]
+
+TAMANHO_BLOCO_PADRAO = 100_000
+
+
+def _compactar_bloco(bloco):
+    """Converte as colunas numéricas de um bloco para tipos pequenos.
+
+    Linhas sem CO_MUNICIPIO ou CO_ENTIDADE numéricos são descartadas (ler_censo_em_blocos as conta).
+    """
+    for col, dtype in COLUNAS_ZERADAS.items():
+        valores = bloco[col] if col in bloco.columns else pd.Series(0, index=bloco.index)
+        bloco[col] = pd.to_numeric(valores, errors='coerce').fillna(0).astype(dtype)
+    for col in COLUNAS_CODIGO:
+        bloco[col] = pd.to_numeric(bloco[col], errors='coerce').astype('float32')
+    for col in ('CO_MUNICIPIO', 'CO_ENTIDADE'):
+        bloco[col] = pd.to_numeric(bloco[col], errors='coerce')
+    bloco = bloco.dropna(subset=['CO_MUNICIPIO', 'CO_ENTIDADE'])
+    return bloco.astype({'CO_MUNICIPIO': 'int32', 'CO_ENTIDADE': 'int32'})
+
+
+def colunas_censo_presentes(caminho):
+    """Colunas de COLUNAS_CENSO no cabeçalho do CSV.
+
+    As de COLUNAS_ZERADAS podem faltar e viram 0, como no carregamento integral; a falta de
+    qualquer outra é um erro que nomeia as colunas.
+    """
+    nome = os.path.basename(caminho)
+    cabecalho = set(pd.read_csv(caminho, sep=';', encoding='latin1', nrows=0).columns)
+    ausentes = [col for col in COLUNAS_CENSO if col not in cabecalho]
+    obrigatorias = [col for col in ausentes if col not in COLUNAS_ZERADAS]
+    if obrigatorias:
+        raise ValueError(f"Coluna(s) obrigatória(s) ausente(s) no censo {nome}: {', '.join(obrigatorias)}")
+    if ausentes:
+        print(f"⚠️  Coluna(s) ausente(s) no censo {nome}, preenchida(s) com 0: {', '.join(ausentes)}")
+    return [col for col in COLUNAS_CENSO if col in cabecalho]
+
+
+def ler_censo_em_blocos(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    """Lê o CSV do censo em blocos de tamanho limitado, apenas com as colunas usadas e tipos compactos."""
+    descartadas = 0
+    with pd.read_csv(caminho, sep=';', encoding='latin1', usecols=colunas_censo_presentes(caminho),
+                     dtype=DTYPES_LEITURA, chunksize=tamanho_bloco) as leitor:
+        for bloco in leitor:
+            lidas = len(bloco)
+            bloco = _compactar_bloco(bloco)
+            descartadas += lidas - len(bloco)
+            yield bloco
+    if descartadas:
+        print(f"⚠️  {descartadas} linha(s) do censo {os.path.basename(caminho)} sem CO_MUNICIPIO ou CO_ENTIDADE "
+              f"válidos foram descartadas.")
+
+
+class AgregadorCenso:
+    """Acumula, bloco a bloco, os agregados por município, as escolas e os territórios do censo.
+
+    O estado guardado é proporcional ao número de municípios/escolas, e não ao tamanho do arquivo:
+    cada bloco é reduzido antes de ser combinado com o acumulado.
+    """
+
+    def __init__(self):
+        self._municipios = None
+        self._escolas = []
+        self._territorios = []
+        self._entidades_vistas = set()
+        self.linhas_lidas = 0
+        self.blocos_lidos = 0
+
+    def adicionar(self, bloco):
+        self.linhas_lidas += len(bloco)
+        self.blocos_lidos += 1
+
+        parcial = bloco.groupby('CO_MUNICIPIO').agg(
+            nome_municipio=('NO_MUNICIPIO', 'first'),
+            uf_sigla=('SG_UF', 'first'),
+            regiao_nome=('NO_REGIAO', 'first'),
+            populacao_total=('QT_MAT_BAS', 'sum'),
+            populacao_indigena=('QT_MAT_BAS_INDIGENA', 'sum')
+        ).astype({'populacao_total': 'int64', 'populacao_indigena': 'int64'})
+        if self._municipios is not None:
+            parcial = pd.concat([self._municipios, parcial])
+        self._municipios = parcial.groupby(level=0).agg({
+            'nome_municipio': 'first', 'uf_sigla': 'first', 'regiao_nome': 'first',
+            'populacao_total': 'sum', 'populacao_indigena': 'sum'
+        })
+
+        escolas = bloco.drop_duplicates(subset='CO_ENTIDADE')
+        escolas = escolas[~escolas['CO_ENTIDADE'].isin(self._entidades_vistas)]
+        self._entidades_vistas.update(escolas['CO_ENTIDADE'].tolist())
+        self._escolas.append(escolas)
+
+        territorios = bloco.loc[bloco['TP_LOCALIZACAO_DIFERENCIADA'] == 1, ['NO_MUNICIPIO', 'SG_UF', 'NO_REGIAO']]
+        self._territorios.append(territorios.drop_duplicates(subset=['NO_MUNICIPIO', 'SG_UF']))
+
+    def municipios(self):
+        """Agregados por município, ordenados por CO_MUNICIPIO (mesmo formato do groupby integral)."""
+        if self._municipios is None:
+            return pd.DataFrame(columns=['CO_MUNICIPIO', 'nome_municipio', 'uf_sigla', 'regiao_nome',
+                                         'populacao_total', 'populacao_indigena'])
+        return self._municipios.rename_axis('CO_MUNICIPIO').reset_index()
+
+    def escolas(self):
+        """Primeira ocorrência de cada CO_ENTIDADE, na ordem do arquivo."""
+        if not self._escolas:
+            return pd.DataFrame(columns=COLUNAS_CENSO)
+        return pd.concat(self._escolas, ignore_index=True)
+
+    def territorios(self):
+        """Municípios/UF com localização diferenciada (TP_LOCALIZACAO_DIFERENCIADA == 1), sem repetição."""
+        if not self._territorios:
+            return pd.DataFrame(columns=['NO_MUNICIPIO', 'SG_UF', 'NO_REGIAO'])
+        return pd.concat(self._territorios, ignore_index=True).drop_duplicates(subset=['NO_MUNICIPIO', 'SG_UF'])
+
+
+def agregar_censo(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, usar_staging=False):
+    """Percorre o CSV do censo em blocos e devolve o AgregadorCenso preenchido.
+
+    Com `usar_staging=True` os blocos vêm do arquivo Arrow preparado (ver staging.blocos_censo).
+    """
+    if usar_staging:
+        from staging import blocos_censo
+        blocos = blocos_censo(caminho, tamanho_bloco)
+    else:
+        blocos = ler_censo_em_blocos(caminho, tamanho_bloco)
+    agregador = AgregadorCenso()
+    for bloco in blocos:
+        agregador.adicionar(bloco)
+    return agregador
+
+
+# --- TRANSFORMAÇÃO COLUNAR DAS ESCOLAS ---
+
+MAPA_DEPENDENCIA = {1: 'Federal', 2: 'Estadual', 3: 'Municipal', 4: 'Privada'}
+MAPA_LOCALIZACAO = {1: 'Urbana', 2: 'Rural'}
+MAPA_SITUACAO = {1: 'Ativa', 2: 'Inativa', 3: 'Paralisada'}
+
+# Os três indicadores de oferta (Infantil, Fundamental, Médio) formam um código de 3 bits;
+# cada código corresponde a uma única lista de níveis ofertados.
+NIVEIS_POR_CODIGO = [
+    [n for bit, n in enumerate(["Infantil", "Fundamental", "Médio"]) if codigo & (1 << bit)]
+    for codigo in range(8)
+]
+
+
+def _mapear_codigo(serie, mapa):
+    """Traduz uma coluna de códigos pelo dicionário, usando 'NI' para ausentes ou desconhecidos."""
+    return serie.map(mapa).fillna('NI').tolist()
+
+
+def _codigo_niveis(df):
+    """Código de 3 bits dos níveis ofertados (Infantil, Fundamental, Médio) de cada escola."""
+    return (
+        (df['IN_INF'] != 0).to_numpy().astype('int8')
+        | (((df['IN_FUND_AI'] != 0) | (df['IN_FUND_AF'] != 0)).to_numpy().astype('int8') << 1)
+        | ((df['IN_MED'] != 0).to_numpy().astype('int8') << 2)
+    )
+
+
+def gerar_documentos_escolas(escolas_df, municipio_map):
+    """Gera (sob demanda) os documentos da coleção Escolas a partir das colunas do censo.
+
+    Mapeamentos, filtros de turmas, níveis ofertados e a junção com o ObjectId do município
+    são feitos coluna a coluna; só a montagem final de cada dicionário acontece por linha.
+    Escolas cujo município não está em `municipio_map` são descartadas.
+    """
+    ids_municipio = escolas_df['CO_MUNICIPIO'].map(municipio_map)
+    df = escolas_df[ids_municipio.notna().to_numpy()]
+    ids_municipio = ids_municipio[ids_municipio.notna()]
+
+    codigo_niveis = _codigo_niveis(df)
+
+    colunas = zip(
+        df['CO_ENTIDADE'].astype('int64').tolist(),
+        df['NO_ENTIDADE'].tolist(),
+        ids_municipio.tolist(),
+        df['SG_UF'].tolist(),
+        df['NO_REGIAO'].tolist(),
+        _mapear_codigo(df['TP_DEPENDENCIA'], MAPA_DEPENDENCIA),
+        _mapear_codigo(df['TP_LOCALIZACAO'], MAPA_LOCALIZACAO),
+        _mapear_codigo(df['TP_SITUACAO_FUNCIONAMENTO'], MAPA_SITUACAO),
+        # Ausente conta como verdadeiro, como em bool(NaN)
+        (df['IN_EDUCACAO_INDIGENA'] != 0).tolist(),
+        df['QT_TUR_INF'].astype('int64').tolist(),
+        df['QT_TUR_FUND'].astype('int64').tolist(),
+        df['QT_TUR_MED'].astype('int64').tolist(),
+        codigo_niveis.tolist(),
+        df['NU_ANO_CENSO'].astype('int64').tolist(),
+        df['QT_MAT_BAS'].astype('int64').tolist(),
+        df['QT_MAT_BAS_INDIGENA'].astype('int64').tolist(),
+    )
+
+    for (co_entidade, nome, municipio_id, uf, regiao, dependencia, localizacao, situacao, indigena,
+         tur_inf, tur_fund, tur_med, codigo, ano, mat_total, mat_indigenas) in colunas:
+        turmas = []
+        if tur_inf > 0:
+            turmas.append({"nivel_ensino": "Infantil", "qt_turmas": tur_inf})
+        if tur_fund > 0:
+            turmas.append({"nivel_ensino": "Fundamental", "qt_turmas": tur_fund})
+        if tur_med > 0:
+            turmas.append({"nivel_ensino": "Médio", "qt_turmas": tur_med})
+
+        matriculas = [{
+            "ano_referencia": ano,
+            "niveis_ofertados": list(NIVEIS_POR_CODIGO[codigo]),
+            "qt_matriculas_total": mat_total,
+            "qt_matriculas_indigenas": mat_indigenas
+        }] if codigo else []
+
+        yield {
+            "co_entidade": co_entidade,
+            "nome_escola": nome,
+            "municipio_id": municipio_id,
+            "uf_sigla": uf,
+            "regiao_nome": regiao,
+            "tipo_dependencia": dependencia,
+            "tipo_localizacao": localizacao,
+            "situacao_funcionamento": situacao,
+            "indigena": indigena,
+            "turmas": turmas,
+            "matriculas": matriculas
+        }
+
+
+# --- RESUMO POR MUNICÍPIO ---
+
+def resumir_escolas_por_municipio(escolas_df):
+    """Totais de escolas, matrículas e turmas por CO_MUNICIPIO.
+
+    Segue a mesma regra dos documentos de Escolas: só escolas com algum nível ofertado
+    têm entrada em `matriculas`, e só turmas positivas são contadas.
+    """
+    tem_matriculas = _codigo_niveis(escolas_df) != 0
+    indigena = (escolas_df['IN_EDUCACAO_INDIGENA'] != 0).to_numpy()
+    indigena_com_matriculas = tem_matriculas & indigena
+    mat_total = escolas_df['QT_MAT_BAS'].to_numpy().astype('int64')
+    mat_indigenas = escolas_df['QT_MAT_BAS_INDIGENA'].to_numpy().astype('int64')
+
+    totais = pd.DataFrame({
+        'CO_MUNICIPIO': escolas_df['CO_MUNICIPIO'].to_numpy(),
+        'escolas': 1,
+        'escolas_indigenas': indigena.astype('int64'),
+        'registros_matriculas': tem_matriculas.astype('int64'),
+        'matriculas_total': np.where(tem_matriculas, mat_total, 0),
+        'matriculas_indigenas': np.where(tem_matriculas, mat_indigenas, 0),
+        'registros_escolas_indigenas': indigena_com_matriculas.astype('int64'),
+        'matriculas_indigenas_escolas_indigenas': np.where(indigena_com_matriculas, mat_indigenas, 0),
+        'turmas_infantil': escolas_df['QT_TUR_INF'].to_numpy().astype('int64').clip(min=0),
+        'turmas_fundamental': escolas_df['QT_TUR_FUND'].to_numpy().astype('int64').clip(min=0),
+        'turmas_medio': escolas_df['QT_TUR_MED'].to_numpy().astype('int64').clip(min=0),
+    })
+    return totais.groupby('CO_MUNICIPIO').sum()
+
+
+def _turmas_do_nivel(nivel):
+    return {'$filter': {'input': {'$ifNull': ['$turmas', []]}, 'as': 't',
+                        'cond': {'$eq': ['$$t.nivel_ensino', nivel]}}}
+
+
+# Os mesmos totais de resumir_escolas_por_municipio, calculados sobre os documentos gravados em
+# Escolas: `matriculas` traz todos os anos mesclados, como nas consultas 2, 4 e 5.
+PIPELINE_RESUMO_ESCOLAS = [
+    {'$project': {
+        'municipio_id': 1,
+        'indigena': {'$cond': ['$indigena', 1, 0]},
+        'registros': {'$size': {'$ifNull': ['$matriculas', []]}},
+        'total': {'$sum': '$matriculas.qt_matriculas_total'},
+        'indigenas': {'$sum': '$matriculas.qt_matriculas_indigenas'},
+        'infantil': _turmas_do_nivel('Infantil'),
+        'fundamental': _turmas_do_nivel('Fundamental'),
+        'medio': _turmas_do_nivel('Médio'),
+    }},
+    {'$project': {
+        'municipio_id': 1, 'indigena': 1, 'registros': 1, 'total': 1, 'indigenas': 1,
+        'registros_indigena': {'$cond': [{'$eq': ['$indigena', 1]}, '$registros', 0]},
+        'indigenas_indigena': {'$cond': [{'$eq': ['$indigena', 1]}, '$indigenas', 0]},
+        'infantil': {'$sum': '$infantil.qt_turmas'},
+        'fundamental': {'$sum': '$fundamental.qt_turmas'},
+        'medio': {'$sum': '$medio.qt_turmas'},
+    }},
+    {'$group': {
+        '_id': '$municipio_id',
+        'escolas': {'$sum': 1},
+        'escolas_indigenas': {'$sum': '$indigena'},
+        'registros_matriculas': {'$sum': '$registros'},
+        'matriculas_total': {'$sum': '$total'},
+        'matriculas_indigenas': {'$sum': '$indigenas'},
+        'registros_escolas_indigenas': {'$sum': '$registros_indigena'},
+        'matriculas_indigenas_escolas_indigenas': {'$sum': '$indigenas_indigena'},
+        'turmas_infantil': {'$sum': '$infantil'},
+        'turmas_fundamental': {'$sum': '$fundamental'},
+        'turmas_medio': {'$sum': '$medio'},
+    }},
+]
+
+
+def resumir_escolas_gravadas(colecao, municipio_map):
+    """Totais de resumir_escolas_por_municipio a partir da coleção Escolas já gravada, por CO_MUNICIPIO.
+
+    Inclui os anos mesclados por censo_anual e, na migração incremental, tudo o que ficou no
+    banco. Escolas de municípios fora de `municipio_map` ficam de fora, como no $lookup das consultas.
+    """
+    co_por_id = {id_: co for co, id_ in municipio_map.items()}
+    linhas = [dict(doc, CO_MUNICIPIO=co_por_id[doc.pop('_id')])
+              for doc in colecao.aggregate(PIPELINE_RESUMO_ESCOLAS, allowDiskUse=True)
+              if doc['_id'] in co_por_id]
+    colunas = [c for c in PIPELINE_RESUMO_ESCOLAS[-1]['$group'] if c != '_id']
+    return pd.DataFrame(linhas, columns=['CO_MUNICIPIO', *colunas]).set_index('CO_MUNICIPIO')
+
+
+def gerar_documentos_resumo(municipios_agrupados, resumo, municipio_map):
+    """Gera os documentos de ResumoMunicipios (um por município, com o mesmo _id do município).
+
+    `resumo` vem de resumir_escolas_gravadas ou, sem banco, de resumir_escolas_por_municipio.
+    """
+    df = municipios_agrupados.join(resumo, on='CO_MUNICIPIO')
+    df[resumo.columns] = df[resumo.columns].fillna(0).astype('int64')
+
+    for row in df.to_dict('records'):
+        co_municipio = int(row['CO_MUNICIPIO'])
+        yield {
+            "_id": municipio_map[co_municipio],
+            "co_municipio": co_municipio,
+            "nome_municipio": row['nome_municipio'],
+            "uf_sigla": row['uf_sigla'],
+            "regiao_nome": row['regiao_nome'],
+            "populacao_total": int(row['populacao_total']),
+            "populacao_indigena": int(row['populacao_indigena']),
+            "escolas": {"total": int(row['escolas']), "indigenas": int(row['escolas_indigenas'])},
+            "matriculas": {
+                "registros": int(row['registros_matriculas']),
+                "total": int(row['matriculas_total']),
+                "indigenas": int(row['matriculas_indigenas'])
+            },
+            "matriculas_escolas_indigenas": {
+                "registros": int(row['registros_escolas_indigenas']),
+                "indigenas": int(row['matriculas_indigenas_escolas_indigenas'])
+            },
+            "turmas": {
+                "Infantil": int(row['turmas_infantil']),
+                "Fundamental": int(row['turmas_fundamental']),
+                "Médio": int(row['turmas_medio'])
+            }
+        }
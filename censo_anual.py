@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pymongo import MongoClient, UpdateOne
+
+from carregador import CarregadorEmLotes, TAMANHO_LOTE_PADRAO, WORKERS_PADRAO
+from censo import agregar_censo, gerar_documentos_escolas, TAMANHO_BLOCO_PADRAO
+
+# --- CENSO DE VÁRIOS ANOS: UM PROCESSO POR ANO, MESCLANDO AS MATRÍCULAS NAS ESCOLAS ---
+
+PADRAO_ARQUIVO_CENSO = re.compile(r'^microdados_ed_basica_(\d{4})\.csv$')
+
+# Chave de partição de Escolas (pronta para shardCollection): as escolas de um município
+# ficam juntas e as UFs se distribuem entre os shards. Ver indices.particionar.
+CHAVE_PARTICAO_ESCOLAS = ('uf_sigla', 'municipio_id')
+
+
+def descobrir_anos(diretorio):
+    """[(ano, caminho)] dos arquivos microdados_ed_basica_AAAA.csv do diretório, em ordem crescente de ano."""
+    anos = []
+    for nome in os.listdir(diretorio):
+        encontrado = PADRAO_ARQUIVO_CENSO.match(nome)
+        if encontrado:
+            anos.append((int(encontrado.group(1)), os.path.join(diretorio, nome)))
+    return sorted(anos)
+
+
+def operacoes_mesclagem(documentos, localizacao_existente):
+    """Upsert de cada escola acrescentando (`$push`) as matrículas do ano, sem reescrever o documento.
+
+    O filtro usa a chave de partição + co_entidade. Para escolas já gravadas, a localização
+    gravada é mantida (a escola pode ter mudado de município entre um ano e outro); os demais
+    campos só são gravados quando a escola ainda não existe.
+    """
+    for doc in documentos:
+        matriculas = doc.pop('matriculas')
+        co_entidade = doc['co_entidade']
+        uf_sigla, municipio_id = localizacao_existente.get(co_entidade, (doc['uf_sigla'], doc['municipio_id']))
+        filtro = {'uf_sigla': uf_sigla, 'municipio_id': municipio_id, 'co_entidade': co_entidade}
+        yield UpdateOne(filtro, {
+            '$setOnInsert': {k: v for k, v in doc.items() if k not in filtro},
+            '$push': {'matriculas': {'$each': matriculas, '$sort': {'ano_referencia': 1}}},
+        }, upsert=True)
+
+
+def mesclar_ano(caminho, uri, banco, tamanho_bloco=TAMANHO_BLOCO_PADRAO, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                workers=WORKERS_PADRAO, usar_staging=True):
+    """Lê um ano do censo e mescla as suas matrículas em Escolas. Roda em um processo próprio.
+
+    Idempotente: as entradas de `matriculas` do mesmo ano são retiradas (`$pull`) antes de
+    serem acrescentadas de novo. Só este ano fica em memória no processo. O relatório traz em
+    `co_entidades` as escolas mescladas (a migração incremental não as remove, ver mesclar_anos).
+    """
+    inicio = time.perf_counter()
+    censo = agregar_censo(caminho, tamanho_bloco, usar_staging)
+    escolas = censo.escolas()
+    ano = int(escolas['NU_ANO_CENSO'].mode().iloc[0]) if len(escolas) else None
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    try:
+        db = client[banco]
+        municipio_map = {d['co_municipio']: d['_id'] for d in db.Municipios.find({}, {'co_municipio': 1})}
+        localizacao = {d['co_entidade']: (d['uf_sigla'], d['municipio_id'])
+                       for d in db.Escolas.find({}, {'_id': 0, 'co_entidade': 1, 'uf_sigla': 1, 'municipio_id': 1})}
+        retiradas = db.Escolas.update_many({'matriculas.ano_referencia': ano},
+                                           {'$pull': {'matriculas': {'ano_referencia': ano}}}).modified_count
+        carregador = CarregadorEmLotes(tamanho_lote=tamanho_lote, workers=workers)
+        co_entidades = []
+
+        def registrando(documentos):
+            for doc in documentos:
+                co_entidades.append(doc['co_entidade'])
+                yield doc
+
+        relatorio = carregador.executar_operacoes(
+            db.Escolas, operacoes_mesclagem(registrando(gerar_documentos_escolas(escolas, municipio_map)), localizacao))
+    finally:
+        client.close()
+
+    relatorio.update({
+        "ano": ano,
+        "arquivo": os.path.basename(caminho),
+        "linhas": censo.linhas_lidas,
+        "escolas_no_ano": len(escolas),
+        "entradas_substituidas": retiradas,
+        "co_entidades": co_entidades,
+        "segundos_total": round(time.perf_counter() - inicio, 3),
+        "pid": os.getpid(),
+    })
+    return relatorio
+
+
+def mesclar_anos(anos, uri, banco, processos=None, tamanho_bloco=TAMANHO_BLOCO_PADRAO,
+                 tamanho_lote=TAMANHO_LOTE_PADRAO, workers=WORKERS_PADRAO, usar_staging=True):
+    """Mescla vários anos em paralelo, um processo por ano (no máximo `processos` ao mesmo tempo).
+
+    Devolve (relatórios dos anos mesclados, {ano: erro} dos que falharam, {(co_entidade,)} das
+    escolas mescladas). As chaves saem dos relatórios, que assim continuam pequenos.
+    """
+    processos = max(1, min(processos or os.cpu_count() or 1, len(anos)))
+    # spawn: o processo principal já tem um MongoClient aberto, que não deve ser herdado por fork;
+    # cada filho abre o seu próprio.
+    contexto = multiprocessing.get_context('spawn')
+    relatorios, falhas, chaves = [], {}, set()
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        futuros = {executor.submit(mesclar_ano, caminho, uri, banco, tamanho_bloco, tamanho_lote, workers,
+                                   usar_staging): ano
+                   for ano, caminho in anos}
+        for futuro in as_completed(futuros):
+            ano = futuros[futuro]
+            try:
+                relatorio = futuro.result()
+            except Exception as e:
+                falhas[ano] = str(e)
+                print(f"❌ Censo {ano}: {e}")
+                continue
+            chaves.update((co,) for co in relatorio.pop('co_entidades'))
+            relatorios.append(relatorio)
+            imprimir_relatorio_ano(relatorio)
+    return sorted(relatorios, key=lambda r: r['ano'] or 0), falhas, chaves
+
+
+def imprimir_relatorio_ano(relatorio):
+    print(f"📅 Censo {relatorio['ano']} ({relatorio['arquivo']}, processo {relatorio['pid']}): "
+          f"{relatorio['escolas_no_ano']} escolas mescladas em {relatorio['segundos_total']} s "
+          f"({relatorio['linhas']} linhas lidas, {relatorio['entradas_substituidas']} entradas do ano substituídas)")
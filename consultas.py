@@ -1,19 +1,13 @@
 from pymongo import MongoClient
-from pprint import pprint
+import argparse
+import copy
+from collections import namedtuple
 
-try:
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['educacao_indigena'] 
-    db.command('ping')
-    print("✅ Conexão com MongoDB estabelecida com sucesso.")
-except Exception as e:
-    print(f"❌ Falha na conexão com MongoDB. Erro: {e}")
-    exit()
-
-print("\n--- INICIANDO CONSULTAS TEMÁTICAS AVANÇADAS ---")
+from cache_consultas import criar_cache, imprimir_relatorio_cache, TTL_CACHE_PADRAO
+from executor_consultas import (abrir_cursor, criar_saida, executar_consultas, imprimir_relatorio_consultas,
+                                salvar_relatorio, FORMATOS, WORKERS_CONSULTAS_PADRAO)
 
 # --- Consulta 1: Painel da Educação Indígena na Região Norte (`$facet`) ---
-print("\n\n[Consulta 1: Painel da Educação Indígena na Região Norte]")
 pipeline1 = [
     { "$match": { "regiao_nome": "Norte" } },
     {
@@ -38,10 +32,8 @@ pipeline1 = [
         }
     }
 ]
-pprint(list(db.Escolas.aggregate(pipeline1)))
 
 # --- Consulta 2: Ranking de Municípios por Proporção de Alunos Indígenas (`$setWindowFields`) ---
-print("\n\n[Consulta 2: Top 3 Municípios por UF com Maior Proporção de Alunos Indígenas]")
 pipeline2 = [
     { "$unwind": "$matriculas" },
     { "$group": {
@@ -65,10 +57,8 @@ pipeline2 = [
     { "$sort": { "dados_municipio.uf_sigla": 1, "ranking_no_estado": 1 } },
     { "$project": { "_id": 0, "Município": "$dados_municipio.nome_municipio", "UF": "$dados_municipio.uf_sigla", "Proporção de Alunos Indígenas": "$proporcao_indigena", "Ranking no Estado": "$ranking_no_estado" }}
 ]
-pprint(list(db.Escolas.aggregate(pipeline2)))
 
 # --- Consulta 3: Municípios em Alerta: População Indígena Alta vs. Indicadores Críticos ---
-print("\n\n[Consulta 3: Municípios com >5.000 Indígenas e Média de Estudo < 8 anos]")
 pipeline3 = [
     {"$match": {"populacao_indigena": {"$gt": 5000},"indicadores_educacionais.anos_estudo": {"$elemMatch": {"faixa_etaria": "25 anos ou mais","media_anos": {"$lt": 8}}}}},
     {"$unwind": "$indicadores_educacionais.anos_estudo"},
@@ -76,10 +66,28 @@ pipeline3 = [
     {"$project": {"_id": 0, "Município": "$nome_municipio", "UF": "$uf_sigla", "População Indígena": "$populacao_indigena", "Média Anos de Estudo (25+)": "$indicadores_educacionais.anos_estudo.media_anos"}},
     {"$sort": {"Média Anos de Estudo (25+)": 1}}
 ]
-pprint(list(db.Municipios.aggregate(pipeline3)))
+
+# Variante para o modelo com UFs separadas (`migracao.py --ufs-separadas`): filtra primeiro as UFs
+# com média de estudo (25+) abaixo de 8 anos e só então busca os municípios dessas UFs.
+pipeline3_ufs = [
+    {"$match": {"indicadores_educacionais.anos_estudo": {"$elemMatch": {"faixa_etaria": "25 anos ou mais", "media_anos": {"$lt": 8}}}}},
+    {"$unwind": "$indicadores_educacionais.anos_estudo"},
+    {"$match": {"indicadores_educacionais.anos_estudo.faixa_etaria": "25 anos ou mais"}},
+    {"$lookup": {
+        "from": "Municipios",
+        "let": {"uf": "$uf_sigla"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$uf_sigla", "$$uf"]}, "populacao_indigena": {"$gt": 5000}}},
+            {"$project": {"_id": 0, "nome_municipio": 1, "populacao_indigena": 1}}
+        ],
+        "as": "municipios"
+    }},
+    {"$unwind": "$municipios"},
+    {"$project": {"_id": 0, "Município": "$municipios.nome_municipio", "UF": "$uf_sigla", "População Indígena": "$municipios.populacao_indigena", "Média Anos de Estudo (25+)": "$indicadores_educacionais.anos_estudo.media_anos"}},
+    {"$sort": {"Média Anos de Estudo (25+)": 1}}
+]
 
 # --- Consulta 4 Otimizada: Correlação: % Pop. Indígena vs. Infraestrutura Escolar (`$bucketAuto`) ---
-print("\n\n[Consulta 4 Otimizada: Proporção de Escolas Indígenas por Faixa de População Indígena do Município]")
 pipeline4_otimizada = [
     # Etapa 1: Começa pelas escolas e agrupa por município para pré-calcular os totais
     {
@@ -134,10 +142,8 @@ pipeline4_otimizada = [
         }
     }
 ]
-pprint(list(db.Escolas.aggregate(pipeline4_otimizada)))
 
 # --- Consulta 5: Score de "Polo Educacional Indígena" ---
-print("\n\n[Consulta 5: Top 10 Municípios por Score de 'Polo Educacional Indígena']")
 pipeline5 = [
     { "$match": { "indigena": True } }, # Começa apenas com escolas indígenas para otimizar
     { "$unwind": "$matriculas" },
@@ -153,8 +159,158 @@ pipeline5 = [
     { "$unwind": "$dados_municipio" },
     { "$project": { "_id": 0, "Município": "$dados_municipio.nome_municipio", "UF": "$dados_municipio.uf_sigla", "Score": { "$round": ["$score", 2] }, "Escolas Indígenas": "$total_escolas_indigenas", "Alunos Indígenas": "$total_alunos_indigenas" }}
 ]
-pprint(list(db.Escolas.aggregate(pipeline5)))
 
-# --- Fim ---
-print("\n--- CONSULTAS TEMÁTICAS AVANÇADAS CONCLUÍDAS ---")
-client.close()
\ No newline at end of file
+# --- Variantes sobre a coleção ResumoMunicipios ---
+# Mesmos resultados das consultas 2, 4 e 5, lendo ~5,5 mil resumos pré-agregados pela migração
+# (sobre Escolas, com todos os anos mesclados) em vez de agrupar todas as escolas e fazer $lookup em Municipios.
+
+pipeline2_resumo = [
+    { "$match": { "matriculas.registros": { "$gt": 0 } } },
+    { "$addFields": {
+        "proporcao_indigena": {
+            "$cond": [{ "$eq": ["$matriculas.total", 0] }, 0, { "$divide": ["$matriculas.indigenas", "$matriculas.total"] }]
+        }
+    }},
+    { "$setWindowFields": {
+        "partitionBy": "$uf_sigla",
+        "sortBy": { "proporcao_indigena": -1 },
+        "output": { "ranking_no_estado": { "$rank": {} } }
+    }},
+    { "$match": { "ranking_no_estado": { "$lte": 3 } } },
+    { "$sort": { "uf_sigla": 1, "ranking_no_estado": 1 } },
+    { "$project": { "_id": 0, "Município": "$nome_municipio", "UF": "$uf_sigla", "Proporção de Alunos Indígenas": "$proporcao_indigena", "Ranking no Estado": "$ranking_no_estado" }}
+]
+
+pipeline4_resumo = [
+    { "$match": { "escolas.total": { "$gt": 0 } } },
+    {
+        "$addFields": {
+            "proporcao_pop_indigena": {
+                "$cond": [{ "$eq": ["$populacao_total", 0] }, 0, { "$divide": ["$populacao_indigena", "$populacao_total"] }]
+            },
+            "proporcao_escolas_indigenas": { "$divide": ["$escolas.indigenas", "$escolas.total"] }
+        }
+    },
+    # $bucketAuto e formatação idênticos aos da consulta 4
+    *pipeline4_otimizada[-2:]
+]
+
+pipeline5_resumo = [
+    { "$match": { "matriculas_escolas_indigenas.registros": { "$gt": 0 } } },
+    { "$addFields": { "score": { "$add": [ { "$multiply": ["$matriculas_escolas_indigenas.registros", 10] }, { "$multiply": ["$matriculas_escolas_indigenas.indigenas", 0.5] } ] } } },
+    { "$sort": { "score": -1 } },
+    { "$limit": 10 },
+    { "$project": { "_id": 0, "Município": "$nome_municipio", "UF": "$uf_sigla", "Score": { "$round": ["$score", 2] }, "Escolas Indígenas": "$matriculas_escolas_indigenas.registros", "Alunos Indígenas": "$matriculas_escolas_indigenas.indigenas" }}
+]
+
+# --- Registro das consultas ---
+# `opcoes` são repassadas ao aggregate (ex.: allowDiskUse nos $group sobre todas as escolas)
+Consulta = namedtuple('Consulta', ['nome', 'titulo', 'colecao', 'pipeline', 'opcoes'], defaults=(None,))
+AGRUPA_TODAS_AS_ESCOLAS = {"allowDiskUse": True}
+
+REGISTRO = {c.nome: c for c in [
+    Consulta("consulta1", "[Consulta 1: Painel da Educação Indígena na Região Norte]", "Escolas", pipeline1),
+    Consulta("consulta2", "[Consulta 2: Top 3 Municípios por UF com Maior Proporção de Alunos Indígenas]", "Escolas", pipeline2, AGRUPA_TODAS_AS_ESCOLAS),
+    Consulta("consulta3", "[Consulta 3: Municípios com >5.000 Indígenas e Média de Estudo < 8 anos]", "Municipios", pipeline3),
+    Consulta("consulta4", "[Consulta 4 Otimizada: Proporção de Escolas Indígenas por Faixa de População Indígena do Município]", "Escolas", pipeline4_otimizada, AGRUPA_TODAS_AS_ESCOLAS),
+    Consulta("consulta5", "[Consulta 5: Top 10 Municípios por Score de 'Polo Educacional Indígena']", "Escolas", pipeline5),
+    Consulta("consulta3_ufs", "[Consulta 3 (UFs): Municípios com >5.000 Indígenas e Média de Estudo < 8 anos]", "UFs", pipeline3_ufs),
+    Consulta("consulta2_resumo", "[Consulta 2 (resumo): Top 3 Municípios por UF com Maior Proporção de Alunos Indígenas]", "ResumoMunicipios", pipeline2_resumo),
+    Consulta("consulta4_resumo", "[Consulta 4 (resumo): Proporção de Escolas Indígenas por Faixa de População Indígena do Município]", "ResumoMunicipios", pipeline4_resumo),
+    Consulta("consulta5_resumo", "[Consulta 5 (resumo): Top 10 Municípios por Score de 'Polo Educacional Indígena']", "ResumoMunicipios", pipeline5_resumo),
+]}
+
+CONSULTAS = [REGISTRO[n] for n in ("consulta1", "consulta2", "consulta3", "consulta4", "consulta5")]
+CONSULTAS_RESUMO = [REGISTRO[n] for n in ("consulta1", "consulta2_resumo", "consulta3", "consulta4_resumo", "consulta5_resumo")]
+
+def parametrizar(consulta, regiao=None, uf=None, limite=None):
+    """Cópia de uma consulta do registro restrita a uma região e/ou UF e com outro top-N.
+
+    O filtro entra no `$match` inicial (ou em um novo, no começo do pipeline), para usar os
+    índices por UF/região antes de qualquer agrupamento. `limite` substitui os `$limit` do
+    pipeline (inclusive os de `$facet`) e o corte do ranking por UF da consulta 2; nas consultas
+    sem top-N, limita o número de linhas devolvidas.
+    """
+    filtro = {campo: valor for campo, valor in (("regiao_nome", regiao), ("uf_sigla", uf)) if valor}
+    pipeline = copy.deepcopy(consulta.pipeline)
+    if filtro:
+        if pipeline and "$match" in pipeline[0]:
+            pipeline[0]["$match"].update(filtro)
+        else:
+            pipeline.insert(0, {"$match": filtro})
+    if limite:
+        encontrou = False
+        for etapa in pipeline:
+            for subpipeline in etapa.get("$facet", {}).values():
+                for subetapa in subpipeline:
+                    if "$limit" in subetapa:
+                        subetapa["$limit"], encontrou = limite, True
+            if "$limit" in etapa:
+                etapa["$limit"], encontrou = limite, True
+            elif "ranking_no_estado" in etapa.get("$match", {}):
+                etapa["$match"]["ranking_no_estado"]["$lte"], encontrou = limite, True
+        if not encontrou:
+            pipeline.append({"$limit": limite})
+    detalhes = ", ".join(f"{k}={v}" for k, v in (("região", regiao), ("UF", uf), ("top", limite)) if v)
+    return consulta._replace(pipeline=pipeline, titulo=f"{consulta.titulo} ({detalhes})" if detalhes else consulta.titulo)
+
+def executar(db, consulta):
+    """Executa uma consulta do registro e devolve a lista de resultados."""
+    return list(abrir_cursor(db, consulta))
+
+# --- Execução ---
+def main():
+    parser = argparse.ArgumentParser(description="Executa as consultas analíticas no banco populado.")
+    parser.add_argument('--resumo', action='store_true',
+                        help="Usa as variantes que leem a coleção pré-agregada ResumoMunicipios.")
+    parser.add_argument('--consultas', nargs='+', choices=list(REGISTRO),
+                        help="Executa apenas as consultas indicadas (padrão: as cinco consultas).")
+    parser.add_argument('--workers', type=int, default=WORKERS_CONSULTAS_PADRAO,
+                        help="Consultas executadas ao mesmo tempo (1 = uma depois da outra).")
+    parser.add_argument('--tamanho-lote', type=int, default=None,
+                        help="batchSize dos cursores (documentos por ida ao servidor).")
+    parser.add_argument('--allow-disk-use', action='store_true', default=None,
+                        help="Permite que todas as consultas usem disco em $group/$sort grandes.")
+    parser.add_argument('--max-time-ms', type=int, default=None,
+                        help="Tempo máximo de cada consulta no servidor.")
+    parser.add_argument('--formato', choices=FORMATOS, default='terminal',
+                        help="terminal, ou um arquivo JSONL/CSV por consulta em --saida.")
+    parser.add_argument('--saida', default='resultados',
+                        help="Diretório dos arquivos de resultado (formatos jsonl e csv).")
+    parser.add_argument('--cache', choices=['mongo', 'memoria', 'nenhum'], default='mongo',
+                        help="Reaproveita resultados da mesma geração de dados (coleção CacheConsultas, memória do processo ou nada).")
+    parser.add_argument('--cache-ttl', type=int, default=TTL_CACHE_PADRAO,
+                        help="Validade, em segundos, das entradas do cache em Mongo.")
+    parser.add_argument('--relatorio', help="Grava o relatório de tempos em JSON neste arquivo.")
+    args = parser.parse_args()
+
+    try:
+        client = MongoClient('mongodb://localhost:27017/')
+        db = client['educacao_indigena']
+        db.command('ping')
+        print("✅ Conexão com MongoDB estabelecida com sucesso.")
+    except Exception as e:
+        print(f"❌ Falha na conexão com MongoDB. Erro: {e}")
+        exit()
+
+    print("\n--- INICIANDO CONSULTAS TEMÁTICAS AVANÇADAS ---")
+    if args.consultas:
+        consultas = [REGISTRO[nome] for nome in args.consultas]
+    else:
+        consultas = CONSULTAS_RESUMO if args.resumo else CONSULTAS
+    saida = criar_saida(args.formato, args.saida, concorrente=args.workers > 1)
+    cache = criar_cache(db, args.cache, ttl_segundos=args.cache_ttl)
+    relatorio = executar_consultas(db, consultas, saida, workers=args.workers, tamanho_lote=args.tamanho_lote,
+                                   allow_disk_use=args.allow_disk_use, max_time_ms=args.max_time_ms, cache=cache)
+
+    print("\n--- CONSULTAS TEMÁTICAS AVANÇADAS CONCLUÍDAS ---")
+    imprimir_relatorio_consultas(relatorio)
+    if cache:
+        imprimir_relatorio_cache(relatorio["cache"])
+    if args.relatorio:
+        salvar_relatorio(relatorio, args.relatorio)
+        print(f"💾 Relatório gravado em {args.relatorio}")
+    client.close()
+
+if __name__ == "__main__":
+    main()
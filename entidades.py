@@ -0,0 +1,77 @@
+import threading
+import time
+
+from cache_consultas import geracao_atual
+from nivel_instrucao import expandir_documento
+
+# --- LEITURA DAS ENTIDADES MONTADAS (MUNICÍPIO + INDICADORES DA UF) ---
+# Com `migracao.py --ufs-separadas`, frequência escolar e anos de estudo ficam uma única vez
+# na coleção UFs; estes helpers devolvem o município no mesmo formato do modelo embutido.
+
+CAMPOS_INDICADORES_UF = ('frequencia_escolar', 'anos_estudo')
+# Por quanto tempo a geração lida do banco é reaproveitada antes de ser relida
+INTERVALO_GERACAO_PADRAO = 2.0
+
+
+class LeitorEntidades:
+    """Monta municípios completos, resolvendo os indicadores da UF sob demanda.
+
+    Os documentos de UF (27) ficam em memória e são recarregados quando a geração dos dados
+    muda; municípios migrados no modelo embutido são devolvidos como estão. O nível de
+    instrução gravado como matriz compacta é devolvido no formato detalhado.
+
+    A geração é relida no máximo a cada `intervalo_geracao` segundos, e não a cada município
+    montado. Quem já acompanha a geração (a API, por exemplo) pode passar `geracao`, uma função
+    sem argumentos que a devolve, e o leitor não faz nenhuma leitura própria.
+    """
+
+    def __init__(self, db, intervalo_geracao=INTERVALO_GERACAO_PADRAO, geracao=None):
+        self.db = db
+        self.intervalo_geracao = intervalo_geracao
+        self._fonte_geracao = geracao
+        self._ufs = {}
+        self._geracao = None
+        self._geracao_lida, self._lida_em = None, None
+        self._trava = threading.Lock()
+
+    def geracao(self):
+        if self._fonte_geracao is not None:
+            return self._fonte_geracao()
+        agora = time.monotonic()
+        with self._trava:
+            if self._lida_em is None or agora - self._lida_em >= self.intervalo_geracao:
+                self._geracao_lida, self._lida_em = geracao_atual(self.db), agora
+            return self._geracao_lida
+
+    def _ufs_atuais(self):
+        geracao = self.geracao()
+        with self._trava:
+            if geracao != self._geracao or not self._ufs:
+                self._ufs = {doc['uf_sigla']: doc for doc in self.db.UFs.find({}, {'hash_conteudo': 0})}
+                self._geracao = geracao
+            return self._ufs
+
+    def uf(self, sigla):
+        return self._ufs_atuais().get(sigla)
+
+    def montar(self, municipio):
+        """Completa `indicadores_educacionais` de um documento de Municipios com os dados da sua UF."""
+        indicadores = expandir_documento(municipio).get('indicadores_educacionais')
+        if indicadores is None or all(campo in indicadores for campo in CAMPOS_INDICADORES_UF):
+            return municipio
+        uf = self.uf(municipio.get('uf_sigla')) or {}
+        da_uf = uf.get('indicadores_educacionais', {})
+        # Mesma ordem de campos do modelo embutido
+        municipio['indicadores_educacionais'] = {
+            **{campo: da_uf.get(campo, []) for campo in CAMPOS_INDICADORES_UF},
+            **indicadores,
+        }
+        return municipio
+
+    def municipio(self, co_municipio, projecao=None):
+        doc = self.db.Municipios.find_one({'co_municipio': co_municipio}, projecao)
+        return self.montar(doc) if doc else None
+
+    def municipios(self, filtro=None, projecao=None, limite=0):
+        for doc in self.db.Municipios.find(filtro or {}, projecao, limit=limite):
+            yield self.montar(doc)
@@ -0,0 +1,234 @@
+import contextlib
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pprint import pprint
+
+from bson import BSON, ObjectId, json_util
+
+# --- EXECUÇÃO CONCORRENTE DAS CONSULTAS COM CURSORES EM FLUXO ---
+
+WORKERS_CONSULTAS_PADRAO = 5
+FORMATOS = ('terminal', 'jsonl', 'csv')
+
+
+def abrir_cursor(db, consulta, tamanho_lote=None, allow_disk_use=None, max_time_ms=None):
+    """Abre o cursor de uma consulta do registro sem materializar o resultado.
+
+    As opções passadas aqui prevalecem sobre as declaradas em `consulta.opcoes`.
+    """
+    opcoes = dict(consulta.opcoes or {})
+    if tamanho_lote:
+        opcoes['batchSize'] = tamanho_lote
+    if allow_disk_use is not None:
+        opcoes['allowDiskUse'] = allow_disk_use
+    if max_time_ms:
+        opcoes['maxTimeMS'] = max_time_ms
+    return db[consulta.colecao].aggregate(consulta.pipeline, **opcoes)
+
+
+def _json(doc):
+    return json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS, ensure_ascii=False)
+
+
+def _achatar(doc, prefixo=''):
+    """Subdocumentos viram colunas `a.b`; listas são gravadas como JSON na própria célula."""
+    linha = {}
+    for chave, valor in doc.items():
+        coluna = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            linha.update(_achatar(valor, f"{coluna}."))
+        elif isinstance(valor, list):
+            linha[coluna] = _json(valor)
+        elif isinstance(valor, ObjectId):
+            linha[coluna] = str(valor)
+        else:
+            linha[coluna] = valor
+    return linha
+
+
+# --- Destinos dos resultados ---
+# Cada destino abre um escritor por consulta; os escritores recebem um documento por vez.
+
+class _EscritorTerminal:
+    def __init__(self, consulta, trava, prefixar):
+        self.consulta, self.trava, self.prefixar = consulta, trava, prefixar
+        if not prefixar:
+            print(f"\n\n{consulta.titulo}")
+
+    def escrever(self, doc):
+        if self.prefixar:
+            # Execução concorrente: uma linha por documento, identificada pela consulta
+            linha = f"[{self.consulta.nome}] {_json(doc)}"
+            with self.trava:
+                print(linha)
+        else:
+            pprint(doc)
+
+    def fechar(self):
+        sys.stdout.flush()
+
+
+class SaidaTerminal:
+    def __init__(self, prefixar=False):
+        self.prefixar = prefixar
+        self._trava = threading.Lock()
+
+    def abrir(self, consulta):
+        return _EscritorTerminal(consulta, self._trava, self.prefixar)
+
+
+class _EscritorJSONL:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, 'w', encoding='utf-8')
+
+    def escrever(self, doc):
+        self._arquivo.write(_json(doc) + '\n')
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class _EscritorCSV:
+    """As colunas vêm do primeiro documento; campos ausentes ficam vazios e campos extras são ignorados."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, 'w', encoding='utf-8', newline='')
+        self._escritor = None
+
+    def escrever(self, doc):
+        linha = _achatar(doc)
+        if self._escritor is None:
+            self._escritor = csv.DictWriter(self._arquivo, fieldnames=list(linha), extrasaction='ignore')
+            self._escritor.writeheader()
+        self._escritor.writerow(linha)
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class SaidaArquivos:
+    """Um arquivo `<nome da consulta>.<formato>` por consulta dentro de `diretorio`."""
+
+    def __init__(self, diretorio, formato):
+        if formato not in ('jsonl', 'csv'):
+            raise ValueError(f"Formato de arquivo desconhecido: {formato}")
+        self.diretorio, self.formato = diretorio, formato
+        os.makedirs(diretorio, exist_ok=True)
+
+    def abrir(self, consulta):
+        caminho = os.path.join(self.diretorio, f"{consulta.nome}.{self.formato}")
+        return (_EscritorJSONL if self.formato == 'jsonl' else _EscritorCSV)(caminho)
+
+
+def criar_saida(formato, diretorio=None, concorrente=False):
+    if formato == 'terminal':
+        return SaidaTerminal(prefixar=concorrente)
+    return SaidaArquivos(diretorio or 'resultados', formato)
+
+
+# --- Execução ---
+
+def _executar_em_fluxo(db, consulta, saida, opcoes_cursor, cache=None):
+    inicio = time.perf_counter()
+    primeiro_ms = None
+    documentos = 0
+    chave, guardado = cache.consultar(consulta) if cache else (None, None)
+    # Em uma falha de cache o resultado é acumulado enquanto é escrito, para ser guardado no fim.
+    # Passando de cache.limite_bytes_entrada o acúmulo é abandonado e o fluxo volta a ter memória constante.
+    acumulado = [] if chave is not None and guardado is None else None
+    bytes_acumulados = 0
+    descartado = False
+    escritor = saida.abrir(consulta)
+    try:
+        with contextlib.ExitStack() as pilha:
+            if guardado is not None:
+                origem = guardado
+            else:
+                origem = pilha.enter_context(abrir_cursor(db, consulta, **opcoes_cursor))
+            for doc in origem:
+                if primeiro_ms is None:
+                    primeiro_ms = (time.perf_counter() - inicio) * 1000
+                escritor.escrever(doc)
+                documentos += 1
+                if acumulado is not None:
+                    bytes_acumulados += len(BSON.encode(doc))
+                    if bytes_acumulados > cache.limite_bytes_entrada:
+                        acumulado, descartado = None, True
+                        cache.descartar(consulta)
+                    else:
+                        acumulado.append(doc)
+    finally:
+        escritor.fechar()
+    if acumulado is not None:
+        cache.guardar(chave, consulta, acumulado)
+    relatorio = {
+        "consulta": consulta.nome,
+        "documentos": documentos,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "primeiro_documento_ms": round(primeiro_ms, 1) if primeiro_ms is not None else None,
+    }
+    if cache:
+        relatorio["cache"] = ("sem geração" if chave is None else "acerto" if guardado is not None
+                              else "falha (grande demais para guardar)" if descartado else "falha")
+    if hasattr(escritor, 'caminho'):
+        relatorio["arquivo"] = escritor.caminho
+    return relatorio
+
+
+def executar_consultas(db, consultas, saida, workers=WORKERS_CONSULTAS_PADRAO, tamanho_lote=None,
+                       allow_disk_use=None, max_time_ms=None, cache=None):
+    """Executa as consultas (independentes entre si) em paralelo, escrevendo cada resultado em fluxo.
+
+    Os workers compartilham o pool de conexões do MongoClient de `db`; o tempo total tende ao
+    da consulta mais lenta. Uma consulta que falha (ex.: `maxTimeMS` estourado) não interrompe
+    as demais: o erro fica registrado no relatório. Com `cache` (ver cache_consultas), os
+    resultados da geração atual dos dados são servidos sem reexecutar o pipeline.
+    """
+    opcoes_cursor = {"tamanho_lote": tamanho_lote, "allow_disk_use": allow_disk_use, "max_time_ms": max_time_ms}
+
+    def tarefa(consulta):
+        inicio_consulta = time.perf_counter()
+        try:
+            return _executar_em_fluxo(db, consulta, saida, opcoes_cursor, cache)
+        except Exception as e:
+            return {"consulta": consulta.nome, "erro": str(e),
+                    "segundos": round(time.perf_counter() - inicio_consulta, 3)}
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        resultados = list(executor.map(tarefa, consultas))
+    relatorio = {
+        "workers": workers,
+        "segundos_total": round(time.perf_counter() - inicio, 3),
+        "soma_segundos_consultas": round(sum(r.get("segundos", 0) for r in resultados), 3),
+        "consultas": resultados,
+    }
+    if cache:
+        relatorio["cache"] = cache.relatorio()
+    return relatorio
+
+
+def imprimir_relatorio_consultas(relatorio):
+    print()
+    for r in relatorio["consultas"]:
+        if "erro" in r:
+            print(f"❌ {r['consulta']}: {r['erro']}")
+            continue
+        destino = f" -> {r['arquivo']}" if "arquivo" in r else ""
+        cache = f" [cache: {r['cache']}]" if "cache" in r else ""
+        print(f"⏱️  {r['consulta']:<18} {r['documentos']:>6} docs em {r['segundos']:.3f} s "
+              f"(primeiro em {r['primeiro_documento_ms']} ms){cache}{destino}")
+    print(f"🏁 {len(relatorio['consultas'])} consultas em {relatorio['segundos_total']} s com {relatorio['workers']} workers "
+          f"(soma dos tempos individuais: {relatorio['soma_segundos_consultas']} s)")
+
+
+def salvar_relatorio(relatorio, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,397 @@
+"""Exportação da migração para arquivos e restauração paralela no MongoDB.
+
+`python migracao.py --exportar DIR` roda a transformação completa sem banco e grava cada coleção
+em arquivos (shards) comprimidos, JSONL (Extended JSON) ou BSON, mais um `manifesto.json`. Os
+`_id` são gerados no cliente, então as referências Escolas -> Municipios continuam válidas.
+
+Uso:
+    python exportacao.py verificar --diretorio exportacao/
+    python exportacao.py comparar --diretorio exportacao/ --outro exportacao_anterior/
+    python exportacao.py restaurar --diretorio exportacao/ --uri mongodb://mongo:27017/ --processos 8
+"""
+import argparse
+import gzip
+import hashlib
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from bson import BSON, ObjectId, decode_file_iter, json_util
+from pymongo import MongoClient
+
+from cache_consultas import registrar_geracao, COLECAO_METADADOS
+from carregador import CarregadorEmLotes, imprimir_relatorio_carga, TAMANHO_LOTE_PADRAO
+from indices import criar_indices
+from sincronizacao import CAMPO_HASH, CHAVES_NATURAIS, calcular_hash, com_hash
+
+FORMATOS_ARQUIVO = ('jsonl', 'bson')
+ARQUIVO_MANIFESTO = 'manifesto.json'
+DOCUMENTOS_POR_ARQUIVO_PADRAO = 50_000
+NIVEL_COMPRESSAO = 6
+# Incrementar quando o formato dos arquivos ou do manifesto mudar
+VERSAO_EXPORTACAO = 1
+# Extended JSON relaxado: ObjectId e datas preservados, números como números
+OPCOES_JSON = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=True,
+                                    tzinfo=timezone.utc)
+WORKERS_POR_ARQUIVO = 2
+
+
+# --- Leitura e escrita dos shards ---
+
+def _gravar_documento(arquivo, doc, formato):
+    if formato == 'bson':
+        arquivo.write(BSON.encode(doc))
+    else:
+        arquivo.write(json_util.dumps(doc, json_options=OPCOES_JSON).encode('utf-8') + b'\n')
+
+
+def ler_arquivo(caminho, formato):
+    """Documentos de um shard (.jsonl.gz ou .bson.gz), na ordem em que foram gravados."""
+    with gzip.open(caminho, 'rb') as arquivo:
+        if formato == 'bson':
+            yield from decode_file_iter(arquivo)
+        else:
+            for linha in arquivo:
+                yield json_util.loads(linha, json_options=OPCOES_JSON)
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _assinatura(hashes):
+    """Assinatura do conteúdo de uma coleção, independente da ordem dos documentos."""
+    h = hashlib.blake2b(digest_size=16)
+    for valor in sorted(hashes):
+        h.update(valor.encode('ascii'))
+    return h.hexdigest()
+
+
+def gravar_shards(diretorio, nome, documentos, formato='jsonl', documentos_por_arquivo=DOCUMENTOS_POR_ARQUIVO_PADRAO,
+                  nivel_compressao=NIVEL_COMPRESSAO):
+    """Grava `documentos` em arquivos de até `documentos_por_arquivo` documentos; devolve a entrada do manifesto."""
+    pasta = os.path.join(diretorio, nome)
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.makedirs(pasta)
+    arquivos, hashes, total = [], [], 0
+    arquivo = atual = None
+
+    def fechar():
+        arquivo.close()
+        caminho = os.path.join(pasta, atual['arquivo'])
+        atual.update(bytes=os.path.getsize(caminho), hash=_hash_arquivo(caminho))
+        arquivos.append(atual)
+
+    try:
+        for doc in documentos:
+            if arquivo is None or atual['documentos'] >= documentos_por_arquivo:
+                if arquivo is not None:
+                    fechar()
+                atual = {'arquivo': f"{nome}-{len(arquivos):05d}.{formato}.gz", 'documentos': 0}
+                arquivo = gzip.open(os.path.join(pasta, atual['arquivo']), 'wb', compresslevel=nivel_compressao)
+            _gravar_documento(arquivo, doc, formato)
+            atual['documentos'] += 1
+            hashes.append(doc[CAMPO_HASH])
+            total += 1
+        if arquivo is not None:
+            fechar()
+            arquivo = None
+    finally:
+        if arquivo is not None:
+            arquivo.close()
+
+    return {'documentos': total, 'assinatura': _assinatura(hashes), 'arquivos': arquivos}
+
+
+def _com_id(documentos):
+    for doc in documentos:
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+        yield doc
+
+
+class DestinoArquivos:
+    """Destino da migração que grava arquivos em vez de escrever no MongoDB (modo offline).
+
+    Mesma interface de migracao.DestinoMongo. A exportação só fica completa quando
+    `finalizar` grava o manifesto, e a restauração se recusa a ler um diretório sem ele.
+    """
+
+    db = None
+    incremental = False
+
+    def __init__(self, diretorio, formato='jsonl', documentos_por_arquivo=DOCUMENTOS_POR_ARQUIVO_PADRAO,
+                 nivel_compressao=NIVEL_COMPRESSAO):
+        if formato not in FORMATOS_ARQUIVO:
+            raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS_ARQUIVO)})")
+        self.diretorio = diretorio
+        self.formato = formato
+        self.documentos_por_arquivo = documentos_por_arquivo
+        self.nivel_compressao = nivel_compressao
+        os.makedirs(diretorio, exist_ok=True)
+        # Um manifesto antigo não pode descrever uma exportação pela metade
+        if os.path.exists(os.path.join(diretorio, ARQUIVO_MANIFESTO)):
+            os.remove(os.path.join(diretorio, ARQUIVO_MANIFESTO))
+        self.colecoes = {}
+        self.removidas = []
+        self.metadados = []
+
+    def estado(self, nome):
+        return None
+
+    def gravar(self, nome, documentos, estado=None, etapa=None, preservar=None):
+        inicio = time.perf_counter()
+        if etapa is not None:
+            documentos = etapa.contar(documentos)
+        entrada = gravar_shards(self.diretorio, nome, com_hash(_com_id(documentos)), self.formato,
+                                self.documentos_por_arquivo, self.nivel_compressao)
+        self.colecoes[nome] = entrada
+        duracao = time.perf_counter() - inicio
+        tamanho = sum(a['bytes'] for a in entrada['arquivos'])
+        print(f"💾 {nome}: {entrada['documentos']} docs em {len(entrada['arquivos'])} arquivo(s) {self.formato}.gz, "
+              f"{tamanho / 1024 ** 2:.1f} MB em {duracao:.3f} s")
+        if etapa is not None:
+            etapa.detalhes['exportacao'] = {'arquivos': len(entrada['arquivos']), 'bytes': tamanho}
+        return entrada['documentos']
+
+    def remover(self, nome):
+        self.removidas.append(nome)
+
+    def gravar_metadados(self, doc):
+        self.metadados.append(doc)
+
+    def finalizar(self, contagens, parametros=None):
+        manifesto = {
+            'versao': VERSAO_EXPORTACAO,
+            'formato': self.formato,
+            'criado_em': datetime.now(timezone.utc),
+            'contagens': contagens,
+            'colecoes': self.colecoes,
+            'removidas': self.removidas,
+            'metadados': self.metadados,
+            'parametros': parametros or {},
+        }
+        caminho = os.path.join(self.diretorio, ARQUIVO_MANIFESTO)
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(json_util.dumps(manifesto, json_options=OPCOES_JSON, ensure_ascii=False, indent=2))
+        os.replace(caminho + '.tmp', caminho)
+        print(f"📜 Manifesto gravado em {caminho}")
+
+
+def ler_manifesto(diretorio):
+    caminho = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"{caminho} não existe: a exportação não foi concluída.")
+    with open(caminho, encoding='utf-8') as f:
+        manifesto = json_util.loads(f.read(), json_options=OPCOES_JSON)
+    if manifesto.get('versao') != VERSAO_EXPORTACAO:
+        raise ValueError(f"Versão da exportação {manifesto.get('versao')} diferente da esperada ({VERSAO_EXPORTACAO}).")
+    return manifesto
+
+
+def _arquivos(diretorio, manifesto):
+    """[(coleção, caminho, entrada do arquivo)] de todos os shards do manifesto."""
+    return [(nome, os.path.join(diretorio, nome, arquivo['arquivo']), arquivo)
+            for nome, colecao in manifesto['colecoes'].items() for arquivo in colecao['arquivos']]
+
+
+# --- Verificação e comparação ---
+
+def verificar_exportacao(diretorio):
+    """Confere hash e contagem de cada arquivo e o `hash_conteudo` de cada documento; devolve a lista de problemas."""
+    manifesto = ler_manifesto(diretorio)
+    problemas = []
+    for nome, caminho, arquivo in _arquivos(diretorio, manifesto):
+        if not os.path.exists(caminho):
+            problemas.append(f"{nome}: {arquivo['arquivo']} ausente")
+            continue
+        if _hash_arquivo(caminho) != arquivo['hash']:
+            problemas.append(f"{nome}: {arquivo['arquivo']} com hash diferente do manifesto")
+            continue
+        documentos = alterados = 0
+        for doc in ler_arquivo(caminho, manifesto['formato']):
+            documentos += 1
+            alterados += calcular_hash(doc) != doc.get(CAMPO_HASH)
+        if documentos != arquivo['documentos']:
+            problemas.append(f"{nome}: {arquivo['arquivo']} tem {documentos} documentos, manifesto diz {arquivo['documentos']}")
+        if alterados:
+            problemas.append(f"{nome}: {alterados} documentos de {arquivo['arquivo']} não conferem com {CAMPO_HASH}")
+    for nome, colecao in manifesto['colecoes'].items():
+        status = '❌' if any(p.startswith(f"{nome}:") for p in problemas) else '✅'
+        print(f"{status} {nome}: {colecao['documentos']} documentos em {len(colecao['arquivos'])} arquivo(s)")
+    return problemas
+
+
+def _referencias(diretorio, manifesto):
+    """_id -> co_municipio dos Municipios da exportação.
+
+    Os _id são gerados a cada exportação; as referências (Escolas.municipio_id) são comparadas
+    pelo município a que apontam, não pelo ObjectId.
+    """
+    return {doc['_id']: doc['co_municipio']
+            for _, caminho, _ in (a for a in _arquivos(diretorio, manifesto) if a[0] == 'Municipios')
+            for doc in ler_arquivo(caminho, manifesto['formato'])}
+
+
+def _hashes_por_chave(diretorio, manifesto, nome, referencias):
+    campos = CHAVES_NATURAIS.get(nome)
+    hashes = {}
+    for _, caminho, _ in (a for a in _arquivos(diretorio, manifesto) if a[0] == nome):
+        for doc in ler_arquivo(caminho, manifesto['formato']):
+            chave = tuple(doc.get(campo) for campo in campos) if campos else doc['_id']
+            if any(isinstance(v, ObjectId) for k, v in doc.items() if k != '_id'):
+                doc = {k: referencias.get(v, v) if isinstance(v, ObjectId) else v for k, v in doc.items()}
+                hashes[chave] = calcular_hash(doc)
+            else:
+                hashes[chave] = doc[CAMPO_HASH]
+    return hashes
+
+
+def comparar_exportacoes(diretorio, outro):
+    """Diferenças por coleção entre duas exportações (`outro` é a referência), pela chave natural."""
+    atual, referencia = ler_manifesto(diretorio), ler_manifesto(outro)
+    refs_atual, refs_referencia = _referencias(diretorio, atual), _referencias(outro, referencia)
+    diferencas = {}
+    for nome in sorted(set(atual['colecoes']) | set(referencia['colecoes'])):
+        a, r = atual['colecoes'].get(nome), referencia['colecoes'].get(nome)
+        if a and r and a['assinatura'] == r['assinatura']:
+            diferencas[nome] = {'documentos': a['documentos'], 'iguais': True}
+            continue
+        novos = _hashes_por_chave(diretorio, atual, nome, refs_atual) if a else {}
+        antigos = _hashes_por_chave(outro, referencia, nome, refs_referencia) if r else {}
+        alterados = sorted((chave for chave in novos.keys() & antigos.keys() if novos[chave] != antigos[chave]), key=str)
+        diferencas[nome] = {
+            'documentos': len(novos),
+            'iguais': not alterados and novos.keys() == antigos.keys(),
+            'inseridos': len(novos.keys() - antigos.keys()),
+            'removidos': len(antigos.keys() - novos.keys()),
+            'alterados': len(alterados),
+            'exemplos_alterados': [list(chave) if isinstance(chave, tuple) else str(chave) for chave in alterados[:5]],
+        }
+    return diferencas
+
+
+def imprimir_comparacao(diferencas):
+    for nome, d in diferencas.items():
+        if d['iguais']:
+            print(f"✅ {nome}: idêntica ({d['documentos']} documentos)")
+        else:
+            print(f"🔁 {nome}: {d['inseridos']} inseridos, {d['alterados']} alterados, {d['removidos']} removidos "
+                  f"({d['documentos']} documentos){' | ex.: ' + str(d['exemplos_alterados']) if d['exemplos_alterados'] else ''}")
+
+
+# --- Restauração paralela ---
+
+def restaurar_arquivo(caminho, formato, uri, banco, nome, tamanho_lote=TAMANHO_LOTE_PADRAO, workers=WORKERS_POR_ARQUIVO):
+    """Carrega um shard em `nome` com a sua própria conexão. Roda em um processo próprio."""
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    try:
+        carregador = CarregadorEmLotes(tamanho_lote=tamanho_lote, workers=workers)
+        relatorio = carregador.carregar(client[banco][nome], ler_arquivo(caminho, formato))
+    finally:
+        client.close()
+    relatorio.update(arquivo=os.path.basename(caminho), pid=os.getpid())
+    return relatorio
+
+
+def restaurar(diretorio, uri, banco, processos=None, tamanho_lote=TAMANHO_LOTE_PADRAO, workers=WORKERS_POR_ARQUIVO):
+    """Apaga as coleções exportadas e as recarrega em paralelo, um processo (e uma conexão) por arquivo.
+
+    Depois recria os índices e carimba uma nova geração dos dados, como ao fim da migração.
+    Devolve o relatório da restauração.
+    """
+    manifesto = ler_manifesto(diretorio)
+    arquivos = sorted(_arquivos(diretorio, manifesto), key=lambda a: a[2]['bytes'], reverse=True)
+    processos = max(1, min(processos or os.cpu_count() or 1, len(arquivos) or 1))
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    try:
+        db = client[banco]
+        inicio = time.perf_counter()
+        for nome in list(manifesto['colecoes']) + manifesto['removidas']:
+            db[nome].drop()
+
+        relatorios, falhas = [], {}
+        # spawn: cada processo abre a sua conexão, sem herdar o pool do cliente deste processo
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futuros = {executor.submit(restaurar_arquivo, caminho, manifesto['formato'], uri, banco, nome,
+                                       tamanho_lote, workers): arquivo['arquivo']
+                       for nome, caminho, arquivo in arquivos}
+            for futuro in as_completed(futuros):
+                try:
+                    relatorio = futuro.result()
+                except Exception as e:
+                    falhas[futuros[futuro]] = str(e)
+                    print(f"❌ {futuros[futuro]}: {e}")
+                    continue
+                relatorios.append(relatorio)
+                imprimir_relatorio_carga(relatorio)
+        carga = time.perf_counter() - inicio
+        if falhas:
+            raise RuntimeError(f"{len(falhas)} arquivo(s) não restaurado(s): {', '.join(sorted(falhas))}")
+
+        for doc in manifesto['metadados']:
+            db[COLECAO_METADADOS].replace_one({'_id': doc['_id']}, doc, upsert=True)
+        criar_indices(db)
+        geracao = registrar_geracao(db, manifesto['contagens'])
+    finally:
+        client.close()
+
+    documentos = sum(r['documentos'] for r in relatorios)
+    return {
+        'arquivos': len(relatorios),
+        'processos': processos,
+        'documentos': documentos,
+        'segundos_carga': round(carga, 3),
+        'segundos_total': round(time.perf_counter() - inicio, 3),
+        'docs_por_segundo': round(documentos / carga, 1) if carga > 0 else 0.0,
+        'geracao': geracao,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('comando', choices=['restaurar', 'verificar', 'comparar'])
+    parser.add_argument('--diretorio', required=True, help="Diretório gerado por `migracao.py --exportar`.")
+    parser.add_argument('--outro', help="Exportação de referência para o comando comparar.")
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--banco', default='educacao_indigena')
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Arquivos restaurados ao mesmo tempo (padrão: número de CPUs).")
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE_PADRAO)
+    parser.add_argument('--workers', type=int, default=WORKERS_POR_ARQUIVO,
+                        help="Threads de escrita por arquivo.")
+    parser.add_argument('--sem-verificar', action='store_true',
+                        help="Restaura sem conferir antes os hashes dos arquivos e documentos.")
+    args = parser.parse_args()
+
+    if args.comando == 'comparar':
+        if not args.outro:
+            parser.error("comparar exige --outro")
+        imprimir_comparacao(comparar_exportacoes(args.diretorio, args.outro))
+        return
+
+    if args.comando == 'verificar' or not args.sem_verificar:
+        problemas = verificar_exportacao(args.diretorio)
+        for problema in problemas:
+            print(f"❌ {problema}")
+        if problemas:
+            raise SystemExit(1)
+        print("✅ Exportação íntegra.")
+    if args.comando == 'restaurar':
+        relatorio = restaurar(args.diretorio, args.uri, args.banco, args.processos, args.tamanho_lote, args.workers)
+        print(f"🎉 {relatorio['documentos']} documentos de {relatorio['arquivos']} arquivos restaurados com "
+              f"{relatorio['processos']} processos: carga em {relatorio['segundos_carga']} s "
+              f"({relatorio['docs_por_segundo']} docs/s), {relatorio['segundos_total']} s com índices. "
+              f"Geração {relatorio['geracao']}")
+
+
+if __name__ == "__main__":
+    main()
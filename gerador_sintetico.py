@@ -0,0 +1,523 @@
+"""Gerador de dados sintéticos no formato exato das fontes da migração: microdados do censo escolar e planilhas do IBGE.
+
+Produz `censo/microdados_ed_basica_AAAA.csv` (';', latin1, as colunas de censo.COLUNAS_CENSO e
+outras que a migração ignora) e `indicadores/{frequencia_escolar,media_anos,nivel_instrucao}.xlsx`
+com o mesmo cabeçalho, rótulos ("Brasil", nomes dos estados, "Nome (UF)", rodapé da fonte) e
+marcadores '-' que processar_indicadores() espera, de modo que `migracao.py --diretorio-censo ...
+--diretorio-indicadores ...` roda sobre eles sem nenhuma adaptação.
+
+As distribuições seguem o censo real: 5.570 municípios com a contagem real por UF, escolas
+concentradas nos municípios maiores, ~17% sem funcionamento (sem matrículas), escolas indígenas
+concentradas nas UFs com terras indígenas, códigos TP_* do dicionário do INEP. A escala multiplica
+as escolas (1x = ESCOLAS_NACIONAIS linhas); com --escalar-municipios os municípios também crescem.
+Tudo é determinístico pela semente, e cada ano gerado tem as mesmas escolas com matrículas diferentes.
+
+Uso:
+    python gerador_sintetico.py                                   # 1x em ./datasets/sintetico/escala_1x
+    python gerador_sintetico.py --escala 10 --colunas-extras 300  # 10x, com a largura do arquivo real
+    python gerador_sintetico.py --escala 1 --anos 2021 2022 2023  # vários anos (censo_anual)
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from censo import COLUNAS_CENSO, REGIOES, UFS
+from nivel_instrucao import FAIXAS_ETARIAS, NIVEIS
+from nomes_municipios import normalize_string
+
+ESCOLAS_NACIONAIS = 217_000  # linhas do censo escolar 2023, com as escolas paralisadas e extintas
+ANO_PADRAO = 2023
+SEMENTE_PADRAO = 42
+TAMANHO_BLOCO_GERACAO = 200_000
+DIRETORIO_PADRAO = './datasets/sintetico'
+ARQUIVO_MANIFESTO = 'manifesto_sintetico.json'
+LINHAS_MAXIMAS_XLSX = 1_048_576
+
+MUNICIPIOS_POR_UF = {
+    'RO': 52, 'AC': 22, 'AM': 62, 'RR': 15, 'PA': 144, 'AP': 16, 'TO': 139, 'MA': 217, 'PI': 224,
+    'CE': 184, 'RN': 167, 'PB': 223, 'PE': 185, 'AL': 102, 'SE': 75, 'BA': 417, 'MG': 853, 'ES': 78,
+    'RJ': 92, 'SP': 645, 'PR': 399, 'SC': 295, 'RS': 497, 'MS': 79, 'MT': 141, 'GO': 246, 'DF': 1
+}
+CODIGO_UF = {
+    'RO': 11, 'AC': 12, 'AM': 13, 'RR': 14, 'PA': 15, 'AP': 16, 'TO': 17, 'MA': 21, 'PI': 22, 'CE': 23,
+    'RN': 24, 'PB': 25, 'PE': 26, 'AL': 27, 'SE': 28, 'BA': 29, 'MG': 31, 'ES': 32, 'RJ': 33, 'SP': 35,
+    'PR': 41, 'SC': 42, 'RS': 43, 'MS': 50, 'MT': 51, 'GO': 52, 'DF': 53
+}
+NOME_ESTADO = {
+    'RO': 'Rondônia', 'AC': 'Acre', 'AM': 'Amazonas', 'RR': 'Roraima', 'PA': 'Pará', 'AP': 'Amapá',
+    'TO': 'Tocantins', 'MA': 'Maranhão', 'PI': 'Piauí', 'CE': 'Ceará', 'RN': 'Rio Grande do Norte',
+    'PB': 'Paraíba', 'PE': 'Pernambuco', 'AL': 'Alagoas', 'SE': 'Sergipe', 'BA': 'Bahia',
+    'MG': 'Minas Gerais', 'ES': 'Espírito Santo', 'RJ': 'Rio de Janeiro', 'SP': 'São Paulo',
+    'PR': 'Paraná', 'SC': 'Santa Catarina', 'RS': 'Rio Grande do Sul', 'MS': 'Mato Grosso do Sul',
+    'MT': 'Mato Grosso', 'GO': 'Goiás', 'DF': 'Distrito Federal'
+}
+CAPITAL = {
+    'RO': 'Porto Velho', 'AC': 'Rio Branco', 'AM': 'Manaus', 'RR': 'Boa Vista', 'PA': 'Belém',
+    'AP': 'Macapá', 'TO': 'Palmas', 'MA': 'São Luís', 'PI': 'Teresina', 'CE': 'Fortaleza', 'RN': 'Natal',
+    'PB': 'João Pessoa', 'PE': 'Recife', 'AL': 'Maceió', 'SE': 'Aracaju', 'BA': 'Salvador',
+    'MG': 'Belo Horizonte', 'ES': 'Vitória', 'RJ': 'Rio de Janeiro', 'SP': 'São Paulo', 'PR': 'Curitiba',
+    'SC': 'Florianópolis', 'RS': 'Porto Alegre', 'MS': 'Campo Grande', 'MT': 'Cuiabá', 'GO': 'Goiânia',
+    'DF': 'Brasília'
+}
+REGIAO_UF = {uf: REGIOES[int(str(codigo)[0]) - 1] for uf, codigo in CODIGO_UF.items()}
+
+# Probabilidade de um município ter escolas indígenas (terra indígena no território)
+TERRA_INDIGENA_POR_UF = {
+    'RO': .3, 'AC': .5, 'AM': .7, 'RR': .8, 'PA': .25, 'AP': .3, 'TO': .1, 'MA': .12, 'PI': .01,
+    'CE': .1, 'RN': .01, 'PB': .03, 'PE': .07, 'AL': .08, 'SE': .01, 'BA': .06, 'MG': .02, 'ES': .03,
+    'RJ': .03, 'SP': .03, 'PR': .06, 'SC': .08, 'RS': .08, 'MS': .35, 'MT': .3, 'GO': .01, 'DF': 0
+}
+
+PREFIXOS_NOME = [
+    '', 'São João do', 'Santa Rita do', 'Nova', 'Porto', 'Barra do', 'Serra do', 'Alto', 'Campo',
+    'Lagoa do', 'Ponte', 'Vila', 'Conceição do', 'Bom Jesus do', 'Santo Antônio do', 'Água Boa do',
+    "Pau d'Arco do", "Olho d'Água do", 'Riacho do', 'Cachoeira do'
+]
+BASES_NOME = [
+    'Araguaia', 'Xingu', 'Itapecuru', 'Guaporé', 'Tapajós', 'Iguaçu', 'Paraná', 'Tocantins',
+    'Jequitinhonha', 'Piracicaba', 'Carajás', 'Juruá', 'Pindaré', 'Capibaribe', 'Mearim', 'Parnaíba',
+    'Jaguaribe', 'Itaúna', 'Ipiranga', 'Jacuí', 'Uruguai', 'Taquari', 'Paraguaçu', 'Caeté', 'Abaeté',
+    'Mucuri', 'Jacuípe', 'Gurupi', 'Acaraú', 'Poti', 'Curimataú', 'Piranhas', 'Una', 'Japaratuba',
+    'Itapicuru', 'Pardo', 'Verde', 'Preto', 'Claro', 'Grande', 'Formoso', 'Bonito', 'Belo', 'Alegre',
+    'Feliz', 'Esperança', 'Aurora', 'Horizonte', 'Paraíso', 'Sertão'
+]
+SUFIXOS_NOME = ['', ' do Norte', ' do Sul', " d'Oeste", ' da Serra', ' dos Índios', ' Paulista', ' Mirim']
+PROPORCAO_NOMES_MAIUSCULOS = 0.02  # grafia antiga do INEP (maiúsculas, sem acento) em parte dos municípios
+
+PATRONOS = [
+    'JOSÉ DE ALENCAR', 'TIRADENTES', 'SANTOS DUMONT', 'MONTEIRO LOBATO', 'CECÍLIA MEIRELES', 'RUI BARBOSA',
+    'MACHADO DE ASSIS', 'PAULO FREIRE', 'DOM PEDRO II', 'CASTRO ALVES', 'ANITA GARIBALDI', 'OSWALDO CRUZ',
+    'CORA CORALINA', 'CARLOS DRUMMOND DE ANDRADE', 'CHICO MENDES', 'MARECHAL RONDON', 'PRINCESA ISABEL',
+    'JOAQUIM NABUCO', 'ZUMBI DOS PALMARES', 'NOSSA SENHORA APARECIDA', 'SÃO JOSÉ', 'SANTA TEREZINHA',
+    'FREI CANECA', 'GONÇALVES DIAS', 'RACHEL DE QUEIROZ'
+]
+POVOS = [
+    'YANOMAMI', 'TICUNA', 'GUARANI KAIOWÁ', 'TERENA', 'MAKUXI', 'KAYAPÓ', 'XAVANTE', 'PATAXÓ', 'TUKANO',
+    'BANIWA', 'MUNDURUKU', 'KAINGANG', 'SATERÉ-MAWÉ', 'POTIGUARA', 'GUAJAJARA', 'XUKURU', 'WAPIXANA',
+    'PARESI', 'BORORO', 'KRAHÔ'
+]
+# TP_DEPENDENCIA: 1 federal, 2 estadual, 3 municipal, 4 privada
+PREFIXO_DEPENDENCIA = np.array(['', 'INSTITUTO FEDERAL CAMPUS ', 'EE ', 'EMEF ', 'COLÉGIO '], dtype=object)
+PROPORCAO_DEPENDENCIA = [.004, .135, .6, .261]
+PROPORCAO_DEPENDENCIA_INDIGENA = [.005, .55, .445, 0]
+FATOR_MATRICULAS_DEPENDENCIA = np.array([0, 4.0, 2.2, 1.0, 0.8])
+# TP_SITUACAO_FUNCIONAMENTO: 1 em atividade, 2 paralisada, 3 extinta no ano, 4 extinta em anos anteriores
+PROPORCAO_SITUACAO = [.83, .06, .01, .10]
+PROPORCAO_SITUACAO_INDIGENA = [.9, .05, .01, .04]
+# Etapas ofertadas (IN_INF, IN_FUND_AI, IN_FUND_AF, IN_MED, IN_EJA) por dependência; indígenas na última linha
+OFERTA_POR_DEPENDENCIA = np.array([
+    [0, 0, 0, 0, 0],
+    [.02, .05, .1, .95, .2],
+    [.05, .3, .75, .6, .25],
+    [.7, .7, .25, .01, .1],
+    [.75, .55, .35, .2, .03],
+    [.5, .9, .45, .15, .2],
+])
+
+# Ordem das faixas lida por processar_indicadores (colunas 1 a 6 das planilhas estaduais)
+FAIXAS_FREQUENCIA = ['0 a 3 anos', '4 a 5 anos', '6 a 14 anos', '15 a 17 anos', '18 a 24 anos', '25 anos ou mais']
+MEDIA_FREQUENCIA = [35.0, 90.0, 97.5, 85.0, 30.0, 5.0]
+MEDIA_ANOS_ESTUDO = [None, None, 4.6, 8.3, 9.6, 6.4]  # '-' nas faixas em que o indicador não se aplica
+# Faixas "folha" da planilha de instrução; as demais colunas são somas delas
+FAIXAS_FOLHA = [
+    '18 a 19 anos', '20 a 24 anos', '25 a 29 anos', '30 a 34 anos', '35 a 39 anos', '40 a 44 anos',
+    '45 a 49 anos', '50 a 54 anos', '55 a 59 anos', '60 a 64 anos', '65 a 69 anos', '70 a 74 anos',
+    '75 a 79 anos', '80 anos ou mais'
+]
+AGREGADOS_FAIXA = {
+    'Total': FAIXAS_FOLHA, '18 a 24 anos': FAIXAS_FOLHA[:2], '25 anos ou mais': FAIXAS_FOLHA[2:],
+    '25 a 64 anos': FAIXAS_FOLHA[2:10], '65 anos ou mais': FAIXAS_FOLHA[10:]
+}
+PROPORCAO_FAIXA_FOLHA = np.array([.07, .14, .12, .11, .10, .09, .08, .07, .06, .05, .04, .03, .02, .02])
+RODAPE = 'Fonte: IBGE - Censo Demográfico'
+
+
+def _nomes_municipios(rng, n, capital):
+    """n nomes distintos para os municípios de uma UF; o primeiro é a capital."""
+    combinacoes = [f"{prefixo} {base}{sufixo}".strip()
+                   for prefixo in PREFIXOS_NOME for base in BASES_NOME for sufixo in SUFIXOS_NOME]
+    combinacoes = [nome for nome in combinacoes if nome != capital]
+    ordem = rng.permutation(len(combinacoes))
+    nomes = [capital]
+    for i in range(n - 1):
+        ciclo, posicao = divmod(i, len(combinacoes))
+        nome = combinacoes[ordem[posicao]]
+        nomes.append(f"{nome} {ciclo + 1}" if ciclo else nome)
+    return nomes
+
+
+def gerar_municipios(fator=1, semente=SEMENTE_PADRAO):
+    """DataFrame dos municípios sintéticos, na ordem das UFs (`fator` multiplica a contagem real de cada UF)."""
+    rng = np.random.default_rng([semente, 0])
+    partes = []
+    for indice_uf, uf in enumerate(UFS):
+        n = MUNICIPIOS_POR_UF[uf] * fator
+        passo = max(1, 99_998 // n)
+        nomes = _nomes_municipios(rng, n, CAPITAL[uf])
+        populacao = rng.lognormal(np.log(11_000), 1.1, n)
+        populacao[0] *= 40
+        terra_indigena = rng.random(n) < TERRA_INDIGENA_POR_UF[uf]
+        tem_indigenas = terra_indigena | (rng.random(n) < 0.6)
+        pop_indigena = np.where(terra_indigena, rng.lognormal(np.log(1_500), 1.2, n),
+                                np.where(tem_indigenas, rng.lognormal(np.log(60), 1.3, n), 0))
+        rural = rng.beta(2, 3.5, n)
+        rural[0] = 0.05
+        partes.append(pd.DataFrame({
+            'co_municipio': CODIGO_UF[uf] * 100_000 + 1 + np.arange(n) * passo,
+            'nome': nomes,
+            'nome_censo': [normalize_string(nome) if sorteio < PROPORCAO_NOMES_MAIUSCULOS else nome
+                           for nome, sorteio in zip(nomes, rng.random(n))],
+            'indice_uf': indice_uf,
+            'populacao': populacao,
+            'tem_indigenas': tem_indigenas,
+            'terra_indigena': terra_indigena,
+            'fracao_indigena': np.where(terra_indigena, rng.beta(1.5, 5, n), 0.0),
+            'pop_indigena': pop_indigena.round().astype('int64'),
+            'fracao_rural': rural,
+        }))
+    return pd.concat(partes, ignore_index=True)
+
+
+def distribuir_escolas(municipios, n_escolas, semente=SEMENTE_PADRAO):
+    """Escolas por município: ao menos uma em cada, o restante proporcional à população^0,8."""
+    rng = np.random.default_rng([semente, 1])
+    n_escolas = max(n_escolas, len(municipios))
+    pesos = municipios['populacao'].to_numpy() ** 0.8
+    return 1 + rng.multinomial(n_escolas - len(municipios), pesos / pesos.sum())
+
+
+def _anulavel(valores, nulos, dtype='int32'):
+    """Coluna inteira com células vazias onde `nulos`, como no CSV do INEP."""
+    return pd.arrays.IntegerArray(np.asarray(valores).astype(dtype), np.asarray(nulos, dtype=bool).copy())
+
+
+class GeradorCenso:
+    """Gera as linhas do censo bloco a bloco, sem manter o arquivo inteiro em memória.
+
+    Os atributos de cada escola vêm de um gerador semeado por (semente, bloco) e as matrículas de
+    um gerador semeado por (semente, ano, bloco): anos diferentes têm as mesmas escolas.
+    """
+
+    def __init__(self, municipios, escolas_por_municipio, semente=SEMENTE_PADRAO, colunas_extras=0,
+                 tamanho_bloco=TAMANHO_BLOCO_GERACAO):
+        self.municipios = municipios
+        self.semente = semente
+        self.tamanho_bloco = tamanho_bloco
+        self.total = int(escolas_por_municipio.sum())
+        self.municipio_da_escola = np.repeat(np.arange(len(municipios), dtype='int32'), escolas_por_municipio)
+
+        # CO_ENTIDADE = código da UF + sequencial da escola na UF (como no INEP, o prefixo é a UF)
+        indice_uf = municipios['indice_uf'].to_numpy()
+        escolas_por_uf = np.bincount(indice_uf, weights=escolas_por_municipio, minlength=len(UFS)).astype('int64')
+        if escolas_por_uf.max() >= 10 ** 7:
+            raise ValueError("Escala grande demais: CO_ENTIDADE teria mais de 7 dígitos sequenciais por UF.")
+        self._primeira_escola_uf = np.concatenate([[0], np.cumsum(escolas_por_uf)[:-1]])
+        self._codigo_uf = np.array([CODIGO_UF[uf] for uf in UFS], dtype='int64')
+        self._nomes_estados = [NOME_ESTADO[uf] for uf in UFS]
+        self._regioes = np.array([REGIAO_UF[uf] for uf in UFS], dtype=object)
+
+        rng = np.random.default_rng([semente, 2])
+        self.colunas_extras = [f'IN_COMPLEMENTAR_{i:03d}' for i in range(1, colunas_extras + 1)]
+        self._proporcao_extras = rng.random(colunas_extras)
+
+        # Ordem do arquivo do INEP: identificação, colunas de infraestrutura (as extras), etapas e quantidades
+        nucleo = [c for c in COLUNAS_CENSO if not c.startswith(('IN_INF', 'IN_FUND', 'IN_MED', 'IN_EJA', 'QT_'))]
+        finais = [c for c in COLUNAS_CENSO if c not in nucleo]
+        self.colunas = nucleo[:3] + ['NO_UF', 'CO_UF'] + nucleo[3:] + self.colunas_extras + finais
+
+    def blocos(self, ano):
+        for numero, inicio in enumerate(range(0, self.total, self.tamanho_bloco)):
+            yield self._bloco(numero, inicio, min(inicio + self.tamanho_bloco, self.total), ano)
+
+    def _bloco(self, numero, inicio, fim, ano):
+        rng = np.random.default_rng([self.semente, 3, numero])
+        rng_ano = np.random.default_rng([self.semente, ano, numero])
+        mun = self.municipios
+        m = self.municipio_da_escola[inicio:fim]
+        n = fim - inicio
+        indice_uf = mun['indice_uf'].to_numpy()[m]
+
+        indigena = rng.random(n) < mun['fracao_indigena'].to_numpy()[m]
+        situacao = np.where(indigena, rng.choice([1, 2, 3, 4], n, p=PROPORCAO_SITUACAO_INDIGENA),
+                            rng.choice([1, 2, 3, 4], n, p=PROPORCAO_SITUACAO))
+        inativa = situacao != 1
+        dependencia = np.where(indigena, rng.choice([1, 2, 3, 4], n, p=PROPORCAO_DEPENDENCIA_INDIGENA),
+                               rng.choice([1, 2, 3, 4], n, p=PROPORCAO_DEPENDENCIA))
+        rural = rng.random(n) < np.where(indigena, 0.95, mun['fracao_rural'].to_numpy()[m])
+        # TP_LOCALIZACAO_DIFERENCIADA: 0 nenhuma, 1 assentamento, 2 terra indígena, 3 quilombola
+        diferenciada = np.where(indigena, rng.choice([2, 0], n, p=[.88, .12]),
+                                rng.choice([0, 1, 3], n, p=[.955, .03, .015]))
+
+        probabilidades = OFERTA_POR_DEPENDENCIA[np.where(indigena, 5, dependencia)].copy()
+        probabilidades[rural, 2:4] *= 0.5
+        oferta = rng.random((n, 5)) < probabilidades
+        sem_oferta = ~oferta.any(axis=1)
+        oferta[sem_oferta, 1] = True
+        etapas = oferta.sum(axis=1)
+
+        mediana = np.where(rural, 45, 220) * FATOR_MATRICULAS_DEPENDENCIA[dependencia]
+        matriculas = rng.lognormal(np.log(mediana), 0.75)
+        matriculas *= rng_ano.lognormal(0, 0.08, n) * (1 - 0.01 * (ano - ANO_PADRAO))
+        matriculas = np.clip(matriculas.round(), 1, 8_000).astype('int32')
+        poucos_indigenas = rng.random(n) < np.where(mun['tem_indigenas'].to_numpy()[m], 0.08, 0.01)
+        matriculas_indigenas = np.where(
+            indigena, (matriculas * rng.beta(9, 1, n)).round(),
+            np.where(poucos_indigenas, np.minimum(rng_ano.poisson(1.2, n) + 1, matriculas), 0)).astype('int32')
+        alunos_por_turma = np.where(rural, 14, 24)
+        turmas = np.where(oferta, np.maximum(1, (matriculas / etapas / alunos_por_turma).round())[:, None], 0)
+
+        sorteio_nome = rng.integers(0, len(PATRONOS), n)
+        nomes = np.where(indigena,
+                         np.array(['ESCOLA INDÍGENA ' + povo for povo in POVOS], dtype=object)[sorteio_nome % len(POVOS)],
+                         PREFIXO_DEPENDENCIA[dependencia] + np.array(PATRONOS, dtype=object)[sorteio_nome])
+
+        colunas = {
+            'NU_ANO_CENSO': np.full(n, ano, dtype='int16'),
+            'NO_REGIAO': self._regioes[indice_uf],
+            'SG_UF': pd.Categorical.from_codes(indice_uf, UFS),
+            'NO_UF': pd.Categorical.from_codes(indice_uf, self._nomes_estados),
+            'CO_UF': self._codigo_uf[indice_uf],
+            'NO_MUNICIPIO': mun['nome_censo'].to_numpy()[m],
+            'CO_MUNICIPIO': mun['co_municipio'].to_numpy()[m],
+            'NO_ENTIDADE': nomes,
+            'CO_ENTIDADE': self._codigo_uf[indice_uf] * 10 ** 7 + np.arange(inicio, fim)
+            - self._primeira_escola_uf[indice_uf] + 1,
+            'TP_DEPENDENCIA': dependencia,
+            'TP_LOCALIZACAO': np.where(rural, 2, 1),
+            'TP_LOCALIZACAO_DIFERENCIADA': _anulavel(diferenciada, situacao >= 3),
+            'TP_SITUACAO_FUNCIONAMENTO': situacao,
+            'IN_EDUCACAO_INDIGENA': indigena.astype('int8'),
+        }
+        for nome, proporcao in zip(self.colunas_extras, self._proporcao_extras):
+            colunas[nome] = _anulavel(rng.random(n) < proporcao, inativa, 'int8')
+        for j, nome in enumerate(['IN_INF', 'IN_FUND_AI', 'IN_FUND_AF', 'IN_MED', 'IN_EJA']):
+            colunas[nome] = _anulavel(oferta[:, j], inativa, 'int8')
+        colunas.update({
+            'QT_MAT_BAS': _anulavel(matriculas, inativa),
+            'QT_MAT_BAS_INDIGENA': _anulavel(matriculas_indigenas, inativa),
+            'QT_TUR_INF': _anulavel(turmas[:, 0], inativa),
+            'QT_TUR_FUND': _anulavel(turmas[:, 1] + turmas[:, 2], inativa),
+            'QT_TUR_MED': _anulavel(turmas[:, 3], inativa),
+            'QT_TUR_EJA': _anulavel(turmas[:, 4], inativa),
+        })
+        return pd.DataFrame(colunas, columns=self.colunas)
+
+    def gravar(self, caminho, ano):
+        """Grava o CSV do ano; devolve as contagens do que foi escrito."""
+        contagens = {"linhas": 0, "escolas_ativas": 0, "escolas_indigenas": 0, "matriculas": 0, "matriculas_indigenas": 0}
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with open(caminho, 'w', encoding='latin-1', newline='') as f:
+            for numero, bloco in enumerate(self.blocos(ano)):
+                bloco.to_csv(f, sep=';', index=False, header=numero == 0, na_rep='')
+                contagens["linhas"] += len(bloco)
+                contagens["escolas_ativas"] += int((bloco['TP_SITUACAO_FUNCIONAMENTO'] == 1).sum())
+                contagens["escolas_indigenas"] += int(bloco['IN_EDUCACAO_INDIGENA'].sum())
+                contagens["matriculas"] += int(bloco['QT_MAT_BAS'].sum())
+                contagens["matriculas_indigenas"] += int(bloco['QT_MAT_BAS_INDIGENA'].sum())
+                if numero % 10 == 9:
+                    print(f"   ... {contagens['linhas']:,}/{self.total:,} linhas".replace(',', '.'))
+        return contagens
+
+
+def _gravar_planilha(caminho, titulo, variavel, cabecalhos, linhas):
+    """Planilha no layout do SIDRA: título, variável, cabeçalhos, linhas de dados e rodapé da fonte.
+
+    Escrita em modo streaming (write_only): as planilhas com municípios em escala não cabem em memória
+    como células do openpyxl.
+    """
+    from openpyxl import Workbook
+    if len(cabecalhos) + len(linhas) + 3 > LINHAS_MAXIMAS_XLSX:
+        raise ValueError(f"{os.path.basename(caminho)}: {len(linhas)} linhas não cabem em uma planilha .xlsx.")
+    livro = Workbook(write_only=True)
+    folha = livro.create_sheet('Tabela')
+    folha.append([titulo])
+    folha.append([variavel])
+    for cabecalho in cabecalhos:
+        folha.append(cabecalho)
+    for linha in linhas:
+        folha.append(linha)
+    folha.append([RODAPE])
+    livro.save(caminho)
+
+
+def _celula(valor):
+    return '-' if valor is None or (isinstance(valor, float) and np.isnan(valor)) else valor
+
+
+def _linhas_estaduais(rng, municipios, medias, desvio):
+    """Linhas Brasil, estados e municípios com Total/Homens/Mulheres de cada faixa (colunas 1-6 = Total)."""
+    medias = np.array([np.nan if m is None else m for m in medias])
+    teto = 100 if np.nanmax(medias) > 20 else 15
+    por_uf = np.clip(medias + rng.normal(0, desvio, (len(UFS), len(medias))), 0, teto)
+
+    def com_sexo(valores, ruido):
+        homens = np.clip(valores + rng.normal(-ruido, ruido, valores.shape), 0, teto)
+        mulheres = np.clip(valores + rng.normal(ruido, ruido, valores.shape), 0, teto)
+        return np.concatenate([valores, homens, mulheres], axis=-1).round(2)
+
+    linhas = [['Brasil'] + [_celula(v) for v in com_sexo(por_uf.mean(axis=0), desvio / 4).tolist()]]
+    linhas += [[NOME_ESTADO[uf]] + [_celula(v) for v in linha]
+               for uf, linha in zip(UFS, com_sexo(por_uf, desvio / 4).tolist())]
+    presentes = municipios[municipios['tem_indigenas']]
+    valores = com_sexo(np.clip(por_uf[presentes['indice_uf'].to_numpy()]
+                               + rng.normal(0, 2 * desvio, (len(presentes), len(medias))), 0, teto), desvio / 2)
+    valores[rng.random(len(presentes)) < 0.15] = np.nan  # municípios com poucos indígenas: '-'
+    for nome, indice_uf, linha in zip(presentes['nome'], presentes['indice_uf'], valores.tolist()):
+        linhas.append([f"{nome} ({UFS[indice_uf]})"] + [_celula(v) for v in linha])
+    return linhas
+
+
+def _matriz_instrucao(rng, municipios):
+    """Pessoas por município x (nível, faixa), nível a nível, com as faixas agregadas somando as folhas."""
+    adultos = municipios['pop_indigena'].to_numpy() * 0.6
+    posicao = np.linspace(0, 1, len(FAIXAS_FOLHA))
+    proporcao_nivel = np.stack([0.08 + 0.47 * posicao, np.full_like(posicao, 0.12),
+                                0.35 - 0.27 * posicao, 0.03 - 0.01 * posicao], axis=1)
+    proporcao_nivel[0, 3] = 0.005  # quase ninguém com 18-19 anos tem curso superior completo
+    esperado = adultos[:, None, None] * PROPORCAO_FAIXA_FOLHA[None, :, None] * proporcao_nivel[None, :, :]
+    folhas = rng.poisson(esperado)  # municípios x faixas folha x níveis
+    soma = np.zeros((len(FAIXAS_FOLHA), len(FAIXAS_ETARIAS)), dtype='int64')
+    for j, faixa in enumerate(FAIXAS_ETARIAS):
+        for folha in AGREGADOS_FAIXA.get(faixa, [faixa]):
+            soma[FAIXAS_FOLHA.index(folha), j] = 1
+    completo = np.einsum('mfn,fj->mnj', folhas, soma)  # municípios x níveis x faixas
+    return completo.reshape(len(municipios), len(NIVEIS) * len(FAIXAS_ETARIAS))
+
+
+def gravar_indicadores(diretorio, municipios, semente=SEMENTE_PADRAO):
+    """Grava as três planilhas de indicadores; devolve o número de municípios em cada uma."""
+    os.makedirs(diretorio, exist_ok=True)
+    rng = np.random.default_rng([semente, 4])
+    cabecalho_estadual = [
+        ['Brasil, Unidade da Federação e Município', 'Ano x Grupo de idade x Sexo'],
+        [None, str(ANO_PADRAO - 1)],
+        [None] + FAIXAS_FREQUENCIA * 3,
+        [None] + ['Total'] * 6 + ['Homens'] * 6 + ['Mulheres'] * 6,
+    ]
+    linhas = {}
+    for arquivo, titulo, variavel, medias, desvio in [
+        ('frequencia_escolar.xlsx',
+         'Tabela 10066 - Taxa bruta de frequência escolar das pessoas indígenas, segundo os grupos de idade e o sexo',
+         'Variável - Taxa de frequência escolar bruta das pessoas indígenas (%)', MEDIA_FREQUENCIA, 4.0),
+        ('media_anos.xlsx',
+         'Tabela 10067 - Média de anos de estudo das pessoas indígenas, segundo os grupos de idade e o sexo',
+         'Variável - Média de anos de estudo das pessoas indígenas (Anos)', MEDIA_ANOS_ESTUDO, 0.6),
+    ]:
+        dados = _linhas_estaduais(rng, municipios, medias, desvio)
+        _gravar_planilha(os.path.join(diretorio, arquivo), titulo, variavel, cabecalho_estadual, dados)
+        linhas[arquivo] = len(dados)
+
+    # Nível de instrução: uma linha de cabeçalho a mais (nível, faixa e sexo) e colunas 1-76 = 4 níveis x 19 faixas
+    presentes = municipios[municipios['tem_indigenas']].reset_index(drop=True)
+    matriz = _matriz_instrucao(rng, presentes)
+    por_uf = np.zeros((len(UFS), matriz.shape[1]), dtype='int64')
+    np.add.at(por_uf, presentes['indice_uf'].to_numpy(), matriz)
+
+    def linha(rotulo, valores):
+        return [rotulo] + [v if v else '-' for v in valores]
+
+    dados = [linha('Brasil', por_uf.sum(axis=0).tolist())]
+    dados += [linha(NOME_ESTADO[uf], valores) for uf, valores in zip(UFS, por_uf.tolist())]
+    dados += [linha(f"{nome} ({UFS[indice_uf]})", valores)
+              for nome, indice_uf, valores in zip(presentes['nome'], presentes['indice_uf'], matriz.tolist())]
+    _gravar_planilha(
+        os.path.join(diretorio, 'nivel_instrucao.xlsx'),
+        'Tabela 10071 - Pessoas indígenas de 18 anos ou mais de idade, por nível de instrução, segundo os grupos de idade e o sexo',
+        'Variável - Pessoas indígenas de 18 anos ou mais de idade (Pessoas)',
+        [['Brasil, Unidade da Federação e Município', 'Ano x Nível de instrução x Grupo de idade x Sexo'],
+         [None, str(ANO_PADRAO - 1)],
+         [None] + [nivel if j == 0 else None for nivel in NIVEIS for j in range(len(FAIXAS_ETARIAS))],
+         [None] + FAIXAS_ETARIAS * len(NIVEIS),
+         [None] + ['Total'] * (len(NIVEIS) * len(FAIXAS_ETARIAS))],
+        dados)
+    linhas['nivel_instrucao.xlsx'] = len(dados)
+    return linhas
+
+
+def diretorio_escala(escala, base=DIRETORIO_PADRAO):
+    return os.path.join(base, f"escala_{escala:g}x")
+
+
+def gerar_conjunto(diretorio, escala=1, anos=(ANO_PADRAO,), escalar_municipios=False, colunas_extras=0,
+                   semente=SEMENTE_PADRAO, tamanho_bloco=TAMANHO_BLOCO_GERACAO, reaproveitar=True):
+    """Gera censo e planilhas em `diretorio` (subpastas censo/ e indicadores/) e grava o manifesto.
+
+    Com `reaproveitar=True`, um conjunto já gerado com os mesmos parâmetros é devolvido sem ser refeito.
+    """
+    parametros = {
+        "escala": escala, "anos": sorted(anos), "escalar_municipios": escalar_municipios,
+        "colunas_extras": colunas_extras, "semente": semente,
+    }
+    caminho_manifesto = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    if reaproveitar and os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            manifesto = json.load(f)
+        if manifesto.get("parametros") == parametros:
+            print(f"♻️  Dados sintéticos de {escala:g}x já gerados em {diretorio}")
+            return manifesto
+
+    inicio = time.perf_counter()
+    fator_municipios = max(1, round(escala)) if escalar_municipios else 1
+    municipios = gerar_municipios(fator_municipios, semente)
+    escolas = distribuir_escolas(municipios, round(ESCOLAS_NACIONAIS * escala), semente)
+    print(f"🧪 Gerando {escala:g}x: {len(municipios)} municípios, {int(escolas.sum())} escolas por ano "
+          f"({', '.join(str(ano) for ano in sorted(anos))}) em {diretorio}")
+
+    gerador = GeradorCenso(municipios, escolas, semente, colunas_extras, tamanho_bloco)
+    diretorio_censo = os.path.join(diretorio, 'censo')
+    censo = {}
+    for ano in sorted(anos):
+        caminho = os.path.join(diretorio_censo, f"microdados_ed_basica_{ano}.csv")
+        censo[ano] = gerador.gravar(caminho, ano)
+        censo[ano]["megabytes"] = round(os.path.getsize(caminho) / 1024 ** 2, 1)
+        print(f"✅ {os.path.basename(caminho)}: {censo[ano]['linhas']} linhas, {censo[ano]['megabytes']} MB")
+
+    diretorio_indicadores = os.path.join(diretorio, 'indicadores')
+    planilhas = gravar_indicadores(diretorio_indicadores, municipios, semente)
+    print(f"✅ Planilhas de indicadores: {planilhas}")
+
+    manifesto = {
+        "parametros": parametros,
+        "municipios": len(municipios),
+        "municipios_com_indigenas": int(municipios['tem_indigenas'].sum()),
+        "escolas": int(escolas.sum()),
+        "diretorio_censo": os.path.abspath(diretorio_censo),
+        "diretorio_indicadores": os.path.abspath(diretorio_indicadores),
+        "censo": {str(ano): contagens for ano, contagens in censo.items()},
+        "planilhas": planilhas,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+    with open(caminho_manifesto, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    print(f"🎉 Dados sintéticos gerados em {manifesto['segundos']} s")
+    return manifesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', type=float, default=1,
+                        help=f"Múltiplo do tamanho nacional (1 = {ESCOLAS_NACIONAIS} escolas); aceita frações para testes rápidos.")
+    parser.add_argument('--saida', help=f"Diretório de saída (padrão: {DIRETORIO_PADRAO}/escala_<N>x).")
+    parser.add_argument('--anos', type=int, nargs='+', default=[ANO_PADRAO], help="Anos do censo a gerar.")
+    parser.add_argument('--escalar-municipios', action='store_true',
+                        help="Multiplica também os municípios (e as linhas das planilhas) pela escala.")
+    parser.add_argument('--colunas-extras', type=int, default=0,
+                        help="Colunas que a migração ignora, para aproximar a largura do arquivo real (~370).")
+    parser.add_argument('--semente', type=int, default=SEMENTE_PADRAO)
+    parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_GERACAO, help="Linhas geradas por vez.")
+    parser.add_argument('--forcar', action='store_true', help="Gera de novo mesmo que o manifesto seja igual.")
+    args = parser.parse_args()
+
+    manifesto = gerar_conjunto(args.saida or diretorio_escala(args.escala), args.escala, args.anos,
+                               args.escalar_municipios, args.colunas_extras, args.semente, args.tamanho_bloco,
+                               reaproveitar=not args.forcar)
+    print(f"\nPara migrar:\n    python migracao.py --diretorio-censo {manifesto['diretorio_censo']} "
+          f"--diretorio-indicadores {manifesto['diretorio_indicadores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Índices secundários das coleções e verificação dos planos das consultas.
+
+Uso:
+    python indices.py criar                    # cria/atualiza os índices declarados
+    python indices.py verificar --fator 10     # explain("executionStats") de cada consulta
+    python indices.py particionar --uri mongodb://mongos:27017/   # distribui Escolas pela chave de partição
+"""
+import argparse
+import time
+
+from pymongo import ASCENDING, MongoClient, IndexModel
+
+from censo_anual import CHAVE_PARTICAO_ESCOLAS
+from consultas import CONSULTAS, CONSULTAS_RESUMO
+
+# --- ESPECIFICAÇÃO DECLARATIVA DOS ÍNDICES ---
+# Cada índice existe para um filtro, agrupamento ou $lookup concreto das consultas (ou para a chave natural).
+INDICES = {
+    'Municipios': [
+        IndexModel([('co_municipio', ASCENDING)], name='co_municipio_unico', unique=True),
+        # Consulta 3: populacao_indigena > 5000
+        IndexModel([('populacao_indigena', ASCENDING)], name='populacao_indigena'),
+        # Consulta 3 (UFs): $lookup dos municípios de cada UF selecionada
+        IndexModel([('uf_sigla', ASCENDING), ('populacao_indigena', ASCENDING)], name='uf_populacao_indigena'),
+        # Consulta 3: $elemMatch em anos_estudo (faixa_etaria + media_anos)
+        IndexModel([('indicadores_educacionais.anos_estudo.faixa_etaria', ASCENDING),
+                    ('indicadores_educacionais.anos_estudo.media_anos', ASCENDING)],
+                   name='anos_estudo_faixa_media'),
+    ],
+    'Escolas': [
+        # Unicidade prefixada pela chave de partição (exigência do shardCollection); o filtro dos
+        # upserts da mesclagem de anos usa exatamente estes campos
+        IndexModel([*((campo, ASCENDING) for campo in CHAVE_PARTICAO_ESCOLAS), ('co_entidade', ASCENDING)],
+                   name='particao_co_entidade_unico', unique=True),
+        IndexModel([('co_entidade', ASCENDING)], name='co_entidade'),
+        # Consulta 1: $match por região
+        IndexModel([('regiao_nome', ASCENDING)], name='regiao_nome'),
+        # Consulta 5: só escolas indígenas, agrupadas por município
+        IndexModel([('indigena', ASCENDING), ('municipio_id', ASCENDING)], name='indigena_municipio_parcial',
+                   partialFilterExpression={'indigena': True}),
+        # Consultas 2 e 4 (agrupamento) e escolas de um município
+        IndexModel([('municipio_id', ASCENDING)], name='municipio_id'),
+    ],
+    'ResumoMunicipios': [
+        IndexModel([('co_municipio', ASCENDING)], name='co_municipio_unico', unique=True),
+        # Variantes das consultas 2, 4 e 5
+        IndexModel([('matriculas.registros', ASCENDING)], name='matriculas_registros'),
+        IndexModel([('escolas.total', ASCENDING)], name='escolas_total'),
+        IndexModel([('matriculas_escolas_indigenas.registros', ASCENDING)], name='matriculas_escolas_indigenas_registros'),
+    ],
+    'UFs': [
+        IndexModel([('uf_sigla', ASCENDING)], name='uf_sigla_unico', unique=True),
+    ],
+    'TerritoriosIndigenas': [
+        IndexModel([('nome_territorio', ASCENDING), ('uf_sigla', ASCENDING)], name='territorio_uf_unico', unique=True),
+    ],
+}
+
+# Índices de versões anteriores que conflitam com os atuais e são removidos
+INDICES_OBSOLETOS = {
+    'Escolas': ['co_entidade_unico'],
+}
+
+FATOR_PADRAO = 10
+
+
+def criar_indices(db, colecoes=None):
+    """Cria os índices declarados em INDICES (ou só os de `colecoes`). Deve rodar depois da carga em massa."""
+    for nome_colecao, indices in INDICES.items():
+        if colecoes is not None and nome_colecao not in colecoes:
+            continue
+        existentes = db[nome_colecao].index_information()
+        for obsoleto in INDICES_OBSOLETOS.get(nome_colecao, []):
+            if obsoleto in existentes:
+                db[nome_colecao].drop_index(obsoleto)
+        inicio = time.perf_counter()
+        nomes = db[nome_colecao].create_indexes(indices)
+        print(f"🗂️  {nome_colecao}: índices {', '.join(nomes)} prontos em {time.perf_counter() - inicio:.2f} s")
+
+
+def particionar(client, banco):
+    """Habilita o sharding do banco e distribui Escolas por CHAVE_PARTICAO_ESCOLAS (precisa de um mongos).
+
+    Municipios, UFs, ResumoMunicipios e TerritoriosIndigenas são pequenas e ficam no shard primário.
+    """
+    criar_indices(client[banco], ['Escolas'])
+    client.admin.command('enableSharding', banco)
+    chave = {campo: 1 for campo in CHAVE_PARTICAO_ESCOLAS}
+    client.admin.command('shardCollection', f'{banco}.Escolas', key=chave)
+    print(f"🧩 {banco}.Escolas particionada por {chave}")
+
+
+# --- VERIFICAÇÃO DOS PLANOS DAS CONSULTAS ---
+
+def _percorrer(no, chave=None):
+    """Percorre o explain devolvendo (chave, dicionário), ignorando os planos rejeitados."""
+    if isinstance(no, dict):
+        yield chave, no
+        for k, v in no.items():
+            if k not in ('rejectedPlans', 'allPlansExecution'):
+                yield from _percorrer(v, k)
+    elif isinstance(no, list):
+        for v in no:
+            yield from _percorrer(v, chave)
+
+
+def analisar_explain(explain):
+    """Resume um explain("executionStats"): estágios do plano vencedor, varreduras completas, seletividade e tempo no servidor."""
+    estagios, varreduras_lookup = [], 0
+    examinados = retornados = None
+    tempo_ms = 0
+    for chave, no in _percorrer(explain):
+        estagio = no.get('stage')
+        if isinstance(estagio, str):
+            estagios.append(estagio)
+        # $lookup (MongoDB 5+) informa quantas varreduras completas fez na coleção estrangeira
+        varreduras_lookup += no.get('collectionScans', 0) or 0
+        for campo in ('executionTimeMillis', 'executionTimeMillisEstimate'):
+            if isinstance(no.get(campo), (int, float)):
+                tempo_ms = max(tempo_ms, no[campo])
+        if chave == 'executionStats' and examinados is None and 'totalDocsExamined' in no:
+            examinados, retornados = no['totalDocsExamined'], no.get('nReturned', 0)
+    return {
+        "estagios": estagios,
+        "collscan": 'COLLSCAN' in estagios,
+        "varreduras_lookup": varreduras_lookup,
+        "docs_examinados": examinados or 0,
+        "docs_retornados": retornados or 0,
+        "tempo_servidor_ms": tempo_ms,
+    }
+
+
+def explicar(db, colecao, pipeline):
+    return db.command('explain', {'aggregate': colecao, 'pipeline': pipeline, 'cursor': {}},
+                      verbosity='executionStats')
+
+
+def verificar_consultas(db, fator=FATOR_PADRAO, permitir_sem_filtro=False, consultas=CONSULTAS):
+    """Roda explain em cada consulta e devolve True se todas usam índice de forma seletiva.
+
+    Falha se algum estágio faz COLLSCAN ou se o cursor examina mais que `fator` vezes os
+    documentos que devolve ao pipeline, inclusive nas consultas que começam sem $match.
+    Com `permitir_sem_filtro=True`, essas consultas (que agregam a coleção inteira por
+    definição) viram apenas aviso.
+    """
+    aprovado = True
+    for consulta in consultas:
+        resumo = analisar_explain(explicar(db, consulta.colecao, consulta.pipeline))
+        sem_filtro = '$match' not in consulta.pipeline[0]
+        problemas = []
+        if resumo["collscan"]:
+            problemas.append("COLLSCAN no plano")
+        if resumo["varreduras_lookup"]:
+            problemas.append(f"$lookup com {resumo['varreduras_lookup']} varredura(s) completa(s)")
+        if resumo["docs_examinados"] > fator * max(resumo["docs_retornados"], 1):
+            problemas.append(f"examinou mais de {fator}x os documentos retornados")
+
+        if not problemas:
+            simbolo = '✅'
+        elif sem_filtro and permitir_sem_filtro:
+            simbolo = '⚠️ '
+            problemas.append("consulta sem filtro: varredura permitida por --permitir-collscan-sem-filtro")
+        else:
+            simbolo = '❌'
+            aprovado = False
+        print(f"{simbolo} {consulta.titulo}")
+        print(f"    estágios: {' > '.join(dict.fromkeys(resumo['estagios'])) or '-'} | "
+              f"examinados: {resumo['docs_examinados']} | retornados: {resumo['docs_retornados']}"
+              + (f" | {'; '.join(problemas)}" if problemas else ""))
+    return aprovado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('comando', choices=['criar', 'verificar', 'particionar'])
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--banco', default='educacao_indigena')
+    parser.add_argument('--fator', type=int, default=FATOR_PADRAO,
+                        help="Máximo de documentos examinados por documento retornado pelo cursor.")
+    parser.add_argument('--permitir-collscan-sem-filtro', action='store_true',
+                        help="Só avisa (sem reprovar) nas consultas sem $match inicial, que varrem a coleção inteira.")
+    parser.add_argument('--resumo', action='store_true',
+                        help="Verifica as variantes que leem a coleção ResumoMunicipios.")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    db = client[args.banco]
+    try:
+        if args.comando == 'criar':
+            criar_indices(db)
+        elif args.comando == 'particionar':
+            particionar(client, args.banco)
+        elif not verificar_consultas(db, args.fator, args.permitir_collscan_sem_filtro, CONSULTAS_RESUMO if args.resumo else CONSULTAS):
+            raise SystemExit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
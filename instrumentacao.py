@@ -0,0 +1,239 @@
+"""Instrumentação da migração: etapas cronometradas, vazão, memória e relatório JSON da execução.
+
+Cada etapa (`with instrumentos.etapa('nome') as etapa:`) registra tempo de parede, tempo de CPU
+do processo (todas as threads), linhas de entrada e saída, docs/s e o RSS no início, no fim e o
+maior RSS durante a própria etapa (amostrado em segundo plano). O relatório traz ainda o pico do
+processo inteiro (ru_maxrss), que nunca diminui e por isso não diz nada sobre uma etapa isolada.
+Opcionalmente, etapas escolhidas rodam sob cProfile (funções mais caras no relatório e .prof
+gravado em disco) e o tracemalloc mede o pico de memória alocada pelo Python em cada etapa.
+"""
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TODAS_AS_ETAPAS = 'todas'
+FUNCOES_NO_PERFIL = 15
+INTERVALO_AMOSTRAGEM_RSS = 0.05
+
+
+def rss_atual_mb():
+    """RSS atual do processo (None fora do Linux)."""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(paginas * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2, 1)
+
+
+def rss_pico_processo_mb():
+    """Maior RSS do processo desde o início (ru_maxrss: KB no Linux, bytes no macOS). Nunca diminui."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+
+class AmostradorRSS:
+    """Maior RSS observado enquanto o bloco `with` roda, lido por uma thread a cada `intervalo` segundos.
+
+    Picos mais curtos que o intervalo podem escapar; o início e o fim do bloco sempre entram.
+    Fora do Linux (sem /proc) o pico fica None.
+    """
+
+    def __init__(self, intervalo=INTERVALO_AMOSTRAGEM_RSS):
+        self.intervalo = intervalo
+        self.pico = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='amostrador-rss', daemon=True)
+
+    def _registrar(self, rss):
+        if rss is not None and (self.pico is None or rss > self.pico):
+            self.pico = rss
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self._registrar(rss_atual_mb())
+
+    def __enter__(self):
+        self._registrar(rss_atual_mb())
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._parar.set()
+        self._thread.join()
+        self._registrar(rss_atual_mb())
+
+
+class Etapa:
+    """Medições de uma etapa. Quem executa a etapa preenche as linhas e os detalhes."""
+
+    def __init__(self, nome, linhas_entrada=None):
+        self.nome = nome
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.detalhes = {}
+        self.medicoes = {}
+
+    def contar(self, iteravel):
+        """Repassa os itens de `iteravel`, contando-os em `linhas_saida` e somando o tempo gasto para produzi-los.
+
+        Útil quando a transformação é um gerador consumido pela escrita: o tempo de
+        transformação fica em `segundos_transformacao`, separado do total da etapa.
+        """
+        self.linhas_saida = 0
+        produzindo = 0.0
+        iterador = iter(iteravel)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                break
+            finally:
+                produzindo += time.perf_counter() - inicio
+                self.detalhes['segundos_transformacao'] = round(produzindo, 3)
+            self.linhas_saida += 1
+            yield item
+
+    def como_dict(self):
+        segundos = self.medicoes.get('segundos')
+        return {
+            "nome": self.nome,
+            "linhas_entrada": self.linhas_entrada,
+            "linhas_saida": self.linhas_saida,
+            **self.medicoes,
+            "docs_por_segundo": round(self.linhas_saida / segundos, 1) if self.linhas_saida and segundos else None,
+            **self.detalhes,
+        }
+
+
+class Instrumentacao:
+    """Coleta as etapas de uma execução e monta o relatório.
+
+    `perfilar`: nomes das etapas a rodar sob cProfile (ou 'todas'); os .prof vão para
+    `diretorio_perfis`, se informado. `rastrear_memoria`: liga o tracemalloc (deixa tudo
+    mais lento; use só para investigar). `verbosidade`: 0 = resumo, 1 = latência de cada lote,
+    2 = amostras de depuração dos dados.
+    """
+
+    def __init__(self, perfilar=(), rastrear_memoria=False, diretorio_perfis=None, verbosidade=0):
+        self.perfilar = set(perfilar or ())
+        self.rastrear_memoria = rastrear_memoria
+        self.diretorio_perfis = diretorio_perfis
+        self.verbosidade = verbosidade
+        self.etapas = []
+        self.parametros = {}
+        self.inicio = datetime.now(timezone.utc)
+        self._relogio = time.perf_counter()
+        self._cpu = time.process_time()
+        if rastrear_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _deve_perfilar(self, nome):
+        return TODAS_AS_ETAPAS in self.perfilar or nome in self.perfilar
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None):
+        etapa = Etapa(nome, linhas_entrada)
+        perfil = cProfile.Profile() if self._deve_perfilar(nome) else None
+        if self.rastrear_memoria:
+            tracemalloc.reset_peak()
+            alocado_antes = tracemalloc.get_traced_memory()[0]
+        rss_antes = rss_atual_mb()
+        amostrador = AmostradorRSS().__enter__()
+        inicio, cpu = time.perf_counter(), time.process_time()
+        if perfil:
+            perfil.enable()
+        try:
+            yield etapa
+        except BaseException as e:
+            etapa.detalhes['erro'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if perfil:
+                perfil.disable()
+            amostrador.__exit__(None, None, None)
+            etapa.medicoes = {
+                "segundos": round(time.perf_counter() - inicio, 3),
+                "cpu_segundos": round(time.process_time() - cpu, 3),
+                "rss_inicio_mb": rss_antes,
+                "rss_fim_mb": rss_atual_mb(),
+                "rss_pico_mb": amostrador.pico,
+            }
+            if self.rastrear_memoria:
+                _, pico = tracemalloc.get_traced_memory()
+                etapa.medicoes["alocado_pico_mb"] = round((pico - alocado_antes) / 1024 ** 2, 1)
+            if perfil:
+                etapa.detalhes['perfil'] = self._resumir_perfil(nome, perfil)
+            self.etapas.append(etapa)
+
+    def _resumir_perfil(self, nome, perfil):
+        resumo = {}
+        if self.diretorio_perfis:
+            os.makedirs(self.diretorio_perfis, exist_ok=True)
+            resumo['arquivo'] = os.path.join(self.diretorio_perfis, f"{nome.replace(' ', '_').replace(':', '_')}.prof")
+            perfil.dump_stats(resumo['arquivo'])
+        estatisticas = pstats.Stats(perfil, stream=io.StringIO()).sort_stats('cumulative')
+        resumo['funcoes'] = [
+            {
+                "funcao": f"{os.path.basename(arquivo)}:{linha}({funcao})",
+                "chamadas": chamadas,
+                "segundos_proprios": round(proprio, 4),
+                "segundos_acumulados": round(acumulado, 4),
+            }
+            for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _)
+            in sorted(estatisticas.stats.items(), key=lambda item: item[1][3], reverse=True)[:FUNCOES_NO_PERFIL]
+        ]
+        return resumo
+
+    def relatorio(self):
+        return {
+            "inicio": self.inicio.isoformat(),
+            "segundos_total": round(time.perf_counter() - self._relogio, 3),
+            "cpu_segundos_total": round(time.process_time() - self._cpu, 3),
+            "rss_pico_processo_mb": rss_pico_processo_mb(),
+            "ambiente": {
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "cpus": os.cpu_count(),
+                "pid": os.getpid(),
+            },
+            "parametros": self.parametros,
+            "etapas": [etapa.como_dict() for etapa in self.etapas],
+        }
+
+    def salvar_relatorio(self, caminho):
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 Relatório da migração gravado em {caminho}")
+
+    def imprimir_resumo(self):
+        relatorio = self.relatorio()
+        print(f"\n⏱️  Etapas da migração ({relatorio['segundos_total']} s, CPU {relatorio['cpu_segundos_total']} s, "
+              f"RSS de pico do processo {relatorio['rss_pico_processo_mb']} MB):")
+        for etapa in relatorio['etapas']:
+            vazao = f", {etapa['docs_por_segundo']} docs/s" if etapa['docs_por_segundo'] else ""
+            linhas = f"{etapa['linhas_entrada'] if etapa['linhas_entrada'] is not None else '-'} -> " \
+                     f"{etapa['linhas_saida'] if etapa['linhas_saida'] is not None else '-'}"
+            alocado = f", alocado {etapa['alocado_pico_mb']} MB" if 'alocado_pico_mb' in etapa else ""
+            print(f"   {etapa['nome']:<28} {etapa['segundos']:>9.3f} s (CPU {etapa['cpu_segundos']:.3f} s) "
+                  f"linhas {linhas}{vazao}, RSS {etapa['rss_fim_mb']} MB (pico {etapa['rss_pico_mb']} MB){alocado}")
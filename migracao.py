@@ -1,37 +1,92 @@
 import pandas as pd
+import numpy as np
 from pymongo import MongoClient
+from bson import BSON, ObjectId
 import os
-import unicodedata
+import math
+import hashlib
+import pickle
+import argparse
 from collections import defaultdict
+from itertools import islice
+
+from censo import (agregar_censo, gerar_documentos_escolas, gerar_documentos_resumo, resumir_escolas_gravadas,
+                   resumir_escolas_por_municipio, TAMANHO_BLOCO_PADRAO)
+from carregador import CarregadorEmLotes, imprimir_relatorio_carga, TAMANHO_LOTE_PADRAO, WORKERS_PADRAO
+from indices import criar_indices
+from censo_anual import descobrir_anos, mesclar_anos
+from staging import ler_planilha
+from exportacao import DestinoArquivos, FORMATOS_ARQUIVO, DOCUMENTOS_POR_ARQUIVO_PADRAO
+from instrumentacao import Instrumentacao, TODAS_AS_ETAPAS
+from cache_consultas import registrar_geracao, COLECAO_METADADOS
+from nivel_instrucao import (codificar, documento_dimensoes, expandir_documento, NIVEIS, FAIXAS_ETARIAS,
+                             CAMPO_MATRIZ)
+from nomes_municipios import separar_nome_uf, juntar_por_nome_uf, imprimir_relatorio_juncao
+from sincronizacao import EstadoColecao, com_hash, sincronizar_colecao, imprimir_relatorio_sincronizacao
 
 # --- 1. CONFIGURAÇÃO E CONEXÃO ---
-print("🚀 Iniciando migração direta dos arquivos para MongoDB...")
-try:
-    # Conecta usando o nome do serviço do docker-compose
-    client = MongoClient('mongodb://mongo:27017/', serverSelectionTimeoutMS=5000)
+URI_MONGO = 'mongodb://mongo:27017/'
+NOME_BANCO = 'educacao_indigena'
+CAMINHO_CENSO = './datasets/microdados_ed_basica_2023.csv'
+
+def conectar(uri=URI_MONGO):
+    """Abre o MongoClient e confere que o servidor responde (só quando a migração escreve no banco)."""
+    # Por padrão, o nome do serviço do docker-compose
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
     client.server_info()
-    db = client['educacao_indigena']
-    print("✅ Conexão com MongoDB estabelecida com sucesso.")
-except Exception as e:
-    print(f"❌ Erro de conexão com MongoDB: {e}")
-    exit()
+    return client
 
 # --- 2. FUNÇÕES AUXILIARES E DE PROCESSAMENTO ---
 
-def normalize_string(s):
-    """Converte para maiúsculas, remove espaços e acentos."""
-    if not isinstance(s, str):
-        return ""
-    s = s.strip().upper()
-    return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
-
-def processar_indicadores():
-    """Lê todos os arquivos XLSX e os processa em dicionários prontos para uso."""
+VALORES_INVALIDOS = ['-', '', 'X', '..', '...']
+
+ARQUIVOS_INDICADORES = {
+    'frequencia': './datasets/frequencia_escolar.xlsx',
+    'anos_estudo': './datasets/media_anos.xlsx',
+    'instrucao': './datasets/nivel_instrucao.xlsx',
+}
+CAMINHO_CACHE_INDICADORES = './datasets/.cache/indicadores.pickle'
+# Incrementar quando o formato do resultado de processar_indicadores() mudar
+VERSAO_CACHE_INDICADORES = 2
+
+def _limpar_valores(bloco, decimal_virgula=False):
+    """Converte um bloco de células das planilhas em float (NaN para vazios e marcadores como '-', 'X', '..')."""
+    bloco = bloco.mask(bloco.isin(VALORES_INVALIDOS))
+    numeros = bloco.apply(pd.to_numeric, errors='coerce').astype('float64')
+    # Só as células de texto que não viraram número passam pela limpeza de string
+    pendentes = (numeros.isna() & bloco.notna()).to_numpy()
+    if pendentes.any():
+        texto = pd.Series(bloco.to_numpy()[pendentes]).astype(str)
+        if decimal_virgula:
+            texto = texto.str.replace(',', '.', regex=False)
+        texto = texto.str.strip()
+        corrigidos = pd.to_numeric(texto.mask(texto.isin(VALORES_INVALIDOS)), errors='coerce')
+        matriz = numeros.to_numpy(copy=True)
+        matriz[pendentes] = corrigidos.to_numpy(dtype='float64')
+        numeros = pd.DataFrame(matriz, index=bloco.index, columns=bloco.columns)
+    return numeros
+
+def arquivos_indicadores(diretorio):
+    """Mesmas planilhas de ARQUIVOS_INDICADORES, procuradas em outro diretório (ex.: dados sintéticos)."""
+    return {nome: os.path.join(diretorio, os.path.basename(caminho)) for nome, caminho in ARQUIVOS_INDICADORES.items()}
+
+def _ler_indicador(caminho, usar_staging, decimal_virgula=False):
+    if usar_staging:
+        # Parquet já com as células convertidas, refeito quando a planilha muda
+        return ler_planilha(caminho, _limpar_valores, decimal_virgula)
+    return pd.read_excel(caminho, header=None, skiprows=5)
+
+def processar_indicadores(usar_staging=True, verbosidade=0, arquivos=None):
+    """Lê todos os arquivos XLSX e os processa em dicionários prontos para uso.
+
+    `arquivos` substitui ARQUIVOS_INDICADORES. As amostras de depuração só são mostradas com `verbosidade >= 2`.
+    """
+    arquivos = arquivos or ARQUIVOS_INDICADORES
     print("... Processando arquivos de indicadores (.xlsx)...")
     try:
-        df_frequencia = pd.read_excel('./datasets/frequencia_escolar.xlsx', header=None, skiprows=5)
-        df_anos_estudo = pd.read_excel('./datasets/media_anos.xlsx', header=None, skiprows=5)
-        df_instrucao = pd.read_excel('./datasets/nivel_instrucao.xlsx', header=None, skiprows=5)
+        df_frequencia = _ler_indicador(arquivos['frequencia'], usar_staging, decimal_virgula=True)
+        df_anos_estudo = _ler_indicador(arquivos['anos_estudo'], usar_staging, decimal_virgula=True)
+        df_instrucao = _ler_indicador(arquivos['instrucao'], usar_staging)
     except FileNotFoundError as e:
         print(f"❌ Erro: Arquivo de indicador não encontrado. Detalhes: {e}")
         return None, None, None
@@ -52,311 +107,510 @@ def processar_indicadores():
         '15 a 17 anos': 4, '18 a 24 anos': 5, '25 anos ou mais': 6
     }
 
-    # Processa Frequência e Anos de Estudo
+    # Processa Frequência e Anos de Estudo: só as linhas de UF, com as colunas das faixas limpas de uma vez
     frequencia_por_uf, anos_estudo_por_uf = {}, {}
     for df, target_dict, value_key in [(df_frequencia, frequencia_por_uf, "taxa"), (df_anos_estudo, anos_estudo_por_uf, "media_anos")]:
-        df.columns = ['UF'] + [f'col_{i}' for i in range(1, len(df.columns))]
-        for _, row in df.iterrows():
-            if row['UF'] == 'Brasil' or pd.isna(row['UF']):
-                continue
-            sigla = uf_to_sigla.get(row['UF'])
-            if not sigla:
-                continue
-            dados_para_uf = []
-            for faixa, idx in faixas_etarias_map.items():
-                col_name = f'col_{idx}'
-                if col_name not in row or pd.isna(row[col_name]):
-                    continue
-                try:
-                    valor_str = str(row[col_name]).replace(',', '.').strip()
-                    if valor_str in ['-', '', 'X', '..', '...']:
-                        continue
-                    dados_para_uf.append({"faixa_etaria": faixa, value_key: float(valor_str)})
-                except (ValueError, TypeError):
-                    continue
-            target_dict[sigla] = dados_para_uf
-
-    # ===== CORREÇÃO: Processa Nível de Instrução =====
-    print("🔍 Debug: Processando nível de instrução...")
-    print(f"🔍 Debug: Dataframe tem {len(df_instrucao)} linhas e {len(df_instrucao.columns)} colunas")
+        faixas = [(faixa, idx) for faixa, idx in faixas_etarias_map.items() if idx < len(df.columns)]
+        siglas = df[0].map(uf_to_sigla)  # 'Brasil', municípios e linhas vazias ficam sem sigla
+        linhas_uf = siglas.notna()
+        valores = _limpar_valores(df.loc[linhas_uf, [idx for _, idx in faixas]], decimal_virgula=True)
+        for sigla, linha in zip(siglas[linhas_uf].tolist(), valores.to_numpy().tolist()):
+            target_dict[sigla] = [
+                {"faixa_etaria": faixa, value_key: valor}
+                for (faixa, _), valor in zip(faixas, linha) if not math.isnan(valor)
+            ]
+
+    # ===== Nível de Instrução: reshape largo -> longo =====
+    if verbosidade >= 2:
+        print(f"🔍 Debug: Processando nível de instrução ({len(df_instrucao)} linhas e {len(df_instrucao.columns)} colunas)")
+
+    # Colunas 1..76 da planilha: 4 níveis x 19 faixas, nível a nível
+    colunas_instrucao = pd.MultiIndex.from_product([NIVEIS, FAIXAS_ETARIAS], names=['nivel', 'faixa_etaria'])
+    n_colunas = min(len(colunas_instrucao), len(df_instrucao.columns) - 1)
+
+    # Só as linhas de município, "Nome (UF)": Brasil, estados e o rodapé da fonte ficam de fora
+    locais = separar_nome_uf(df_instrucao[0].dropna())
+    duplicadas = int(locais.duplicated().sum())
+    if duplicadas:
+        print(f"⚠️  {duplicadas} municípios repetidos (mesmo nome e UF) na planilha de instrução; os registros serão acumulados na mesma chave.")
+
+    valores = _limpar_valores(df_instrucao.loc[locais.index, 1:n_colunas]).to_numpy()
+    # np.nonzero percorre linha a linha e, dentro da linha, nível a nível e faixa a faixa (ordem original)
+    linhas, colunas = np.nonzero(np.isfinite(valores))
+    longo = pd.DataFrame({
+        'municipio': locais['nome'].to_numpy()[linhas],
+        'uf': locais['uf'].to_numpy()[linhas],
+        'faixa_etaria': colunas_instrucao.get_level_values('faixa_etaria')[colunas],
+        'nivel': colunas_instrucao.get_level_values('nivel')[colunas],
+        'qt_pessoas': np.trunc(valores[linhas, colunas]).astype('int64'),
+    })
 
+    # Agrupa por (nome normalizado, UF), preservando a ordem de aparição
     instrucao_por_municipio = defaultdict(list)
+    for municipio, uf, faixa, nivel, qt_pessoas in zip(*(longo[c].tolist() for c in longo.columns)):
+        instrucao_por_municipio[(municipio, uf)].append({
+            "faixa_etaria": faixa,
+            "nivel": nivel,
+            "qt_pessoas": qt_pessoas
+        })
+
+    print(f"✅ Nível de instrução processado: {len(locais)} municípios, {len(longo)} registros")
+    if verbosidade >= 2:
+        print(f"🔍 Debug: Dicionário final tem {len(instrucao_por_municipio)} municípios com dados")
+        # Mostrar apenas os 3 primeiros municípios processados
+        for municipio, dados in islice(instrucao_por_municipio.items(), 3):
+            print(f"🔍 Debug: {municipio} tem {len(dados)} registros de instrução")
 
-    # Definições corretas baseadas no código PostgreSQL
-    niveis_instrucao = [
-        'Sem instrução e fundamental incompleto',
-        'Fundamental completo e médio incompleto',
-        'Médio completo e superior incompleto',
-        'Superior completo'
-    ]
-
-    faixas_etarias_inst = [
-        'Total', '18 a 24 anos', '18 a 19 anos', '20 a 24 anos',
-        '25 anos ou mais', '25 a 64 anos', '25 a 29 anos', '30 a 34 anos',
-        '35 a 39 anos', '40 a 44 anos', '45 a 49 anos', '50 a 54 anos',
-        '55 a 59 anos', '60 a 64 anos', '65 anos ou mais', '65 a 69 anos',
-        '70 a 74 anos', '75 a 79 anos', '80 anos ou mais'
-    ]
-
-    # Mapeamento para nomes abreviados
-    nivel_abreviado = {
-        'Sem instrução e fundamental incompleto': 'Sem instrução',
-        'Fundamental completo e médio incompleto': 'Fundamental completo',
-        'Médio completo e superior incompleto': 'Médio completo',
-        'Superior completo': 'Superior completo'
-    }
-
-    linhas_processadas = 0
-    registros_inseridos = 0
-
-    # Processar cada linha do DataFrame
-    for idx, row in df_instrucao.iterrows():
-        # Verificar se a primeira célula contém um nome válido
-        if pd.isna(row[0]) or not isinstance(row[0], str):
-            continue
-
-        nome_local = str(row[0]).strip()
-
-        # Pular totais nacionais
-        if nome_local == 'Brasil':
-            continue
-
-        # Normalizar nome do município
-        nome_municipio_normalizado = normalize_string(nome_local)
-        if not nome_municipio_normalizado:
-            continue
-
-        linhas_processadas += 1
-        if linhas_processadas <= 5:  # Debug apenas dos primeiros 5
-            print(f"🔍 Debug: Processando município {linhas_processadas}: {nome_local} -> {nome_municipio_normalizado}")
-
-        # Para cada nível de instrução
-        for nivel_idx, nivel_original in enumerate(niveis_instrucao):
-            # Calcular deslocamento das colunas para este nível
-            col_offset = 1 + (len(faixas_etarias_inst) * nivel_idx)
-
-            # Para cada faixa etária
-            for faixa_idx, faixa in enumerate(faixas_etarias_inst):
-                col_num = col_offset + faixa_idx
-
-                # Verificar se a coluna existe
-                if col_num >= len(row):
-                    continue
-
-                valor = row[col_num]
-
-                # Verificar se o valor é válido
-                if pd.isna(valor):
-                    continue
-
-                try:
-                    # Converter valor para string e limpar
-                    valor_str = str(valor).strip()
-
-                    # Pular valores inválidos
-                    if valor_str in ['-', '', 'X', '..', '...']:
-                        continue
-
-                    # Converter para número
-                    qt_pessoas = int(float(valor_str))
-
-                    # Se chegou até aqui, é um valor válido
-                    nivel_para_inserir = nivel_abreviado[nivel_original]
-
-                    instrucao_por_municipio[nome_municipio_normalizado].append({
-                        "faixa_etaria": faixa,
-                        "nivel": nivel_para_inserir,
-                        "qt_pessoas": qt_pessoas
-                    })
-
-                    registros_inseridos += 1
-
-                except (ValueError, TypeError) as e:
-                    if linhas_processadas <= 5:  # Debug apenas dos primeiros 5
-                        print(f"⚠️  Erro ao processar valor '{valor}' para {nome_local}, nível {nivel_original}, faixa {faixa}: {e}")
-                    continue
+    return frequencia_por_uf, anos_estudo_por_uf, instrucao_por_municipio
 
-    print(f"✅ Nível de instrução processado: {linhas_processadas} municípios, {registros_inseridos} registros")
-    print(f"🔍 Debug: Dicionário final tem {len(instrucao_por_municipio)} municípios com dados")
+def _impressao_digital(caminho):
+    """Tamanho, mtime e hash do conteúdo de um arquivo de origem."""
+    info = os.stat(caminho)
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return (info.st_size, info.st_mtime_ns, h.hexdigest())
+
+def carregar_indicadores(usar_cache=True, limpar_cache=False, usar_staging=True, verbosidade=0, arquivos=None):
+    """Devolve o resultado de processar_indicadores(), usando o cache em disco quando as planilhas não mudaram.
+
+    O cache é invalidado sozinho se tamanho, mtime ou hash de qualquer planilha mudar.
+    """
+    if limpar_cache and os.path.exists(CAMINHO_CACHE_INDICADORES):
+        os.remove(CAMINHO_CACHE_INDICADORES)
+        print("🧹 Cache de indicadores removido.")
+    if not usar_cache:
+        return processar_indicadores(usar_staging, verbosidade, arquivos)
 
-    # Debug: mostrar alguns municípios processados
-    for i, (municipio, dados) in enumerate(instrucao_por_municipio.items()):
-        if i < 3:  # Mostrar apenas os 3 primeiros
-            print(f"🔍 Debug: {municipio} tem {len(dados)} registros de instrução")
+    try:
+        chave = {nome: _impressao_digital(caminho) for nome, caminho in (arquivos or ARQUIVOS_INDICADORES).items()}
+        chave['versao'] = VERSAO_CACHE_INDICADORES
+    except FileNotFoundError as e:
+        print(f"❌ Erro: Arquivo de indicador não encontrado. Detalhes: {e}")
+        return None, None, None
 
-    return frequencia_por_uf, anos_estudo_por_uf, instrucao_por_municipio
+    if os.path.exists(CAMINHO_CACHE_INDICADORES):
+        try:
+            with open(CAMINHO_CACHE_INDICADORES, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.get('chave') == chave:
+                print("⚡ Indicadores carregados do cache (planilhas inalteradas).")
+                return cache['indicadores']
+            print("... Planilhas de indicadores mudaram; cache invalidado.")
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError) as e:
+            print(f"⚠️  Cache de indicadores ilegível, reprocessando. Detalhes: {e}")
+
+    indicadores = processar_indicadores(usar_staging, verbosidade, arquivos)
+    if indicadores[2] is not None:
+        os.makedirs(os.path.dirname(CAMINHO_CACHE_INDICADORES), exist_ok=True)
+        temporario = CAMINHO_CACHE_INDICADORES + '.tmp'
+        with open(temporario, 'wb') as f:
+            pickle.dump({'chave': chave, 'indicadores': indicadores}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, CAMINHO_CACHE_INDICADORES)
+    return indicadores
 
 # --- 3. FUNÇÃO PRINCIPAL DE MIGRAÇÃO ---
-def run_migration():
-    """Lê os arquivos de origem, transforma os dados e os insere no MongoDB."""
+def gravar_colecao(colecao, documentos, carregador, incremental=False, estado=None, etapa=None, preservar=None):
+    """Grava os documentos de uma coleção: recarga completa (drop + insert) ou sincronização incremental.
+
+    Na sincronização, as chaves de `preservar` não são removidas (ver sincronizacao.sincronizar_colecao).
+
+    Devolve o número de documentos da origem. Com `etapa` (instrumentacao.Etapa), conta os
+    documentos gerados, mede o tempo gasto gerando-os e guarda o relatório da escrita.
+    """
+    if etapa is not None:
+        documentos = etapa.contar(documentos)
+    if incremental:
+        relatorio = sincronizar_colecao(colecao, documentos, carregador, estado, preservar)
+        imprimir_relatorio_sincronizacao(relatorio)
+        total = relatorio['inseridos'] + relatorio['atualizados'] + relatorio['inalterados']
+    else:
+        colecao.drop()
+        relatorio = carregador.carregar(colecao, com_hash(documentos))
+        imprimir_relatorio_carga(relatorio)
+        total = relatorio['documentos']
+    if etapa is not None:
+        etapa.detalhes['escrita'] = relatorio
+    return total
+
+class DestinoMongo:
+    """Destino da migração que escreve direto no MongoDB (recarga completa ou incremental).
+
+    A alternativa offline, com a mesma interface, é exportacao.DestinoArquivos.
+    """
+
+    def __init__(self, client, banco=NOME_BANCO, uri=URI_MONGO, carregador=None, incremental=False):
+        self.db = client[banco]
+        self.banco = banco
+        self.uri = uri
+        self.carregador = carregador or CarregadorEmLotes()
+        self.incremental = incremental
+
+    def estado(self, nome):
+        """Chaves e hashes já gravados (só na migração incremental, para reaproveitar os _id)."""
+        return EstadoColecao(self.db[nome]) if self.incremental else None
+
+    def gravar(self, nome, documentos, estado=None, etapa=None, preservar=None):
+        return gravar_colecao(self.db[nome], documentos, self.carregador, self.incremental, estado, etapa, preservar)
+
+    def remover(self, nome):
+        if not self.incremental:
+            self.db[nome].drop()
+
+    def gravar_metadados(self, doc):
+        self.db[COLECAO_METADADOS].replace_one({'_id': doc['_id']}, doc, upsert=True)
+
+def documentos_ufs(municipios_agrupados, frequencia_por_uf, anos_estudo_por_uf):
+    """Um documento por UF com os indicadores estaduais (modelo com UFs separadas)."""
+    regioes = municipios_agrupados.groupby('uf_sigla', observed=True)['regiao_nome'].first()
+    for sigla, regiao in regioes.items():
+        yield {
+            "uf_sigla": sigla,
+            "regiao_nome": regiao,
+            "indicadores_educacionais": {
+                "frequencia_escolar": frequencia_por_uf.get(sigla, []),
+                "anos_estudo": anos_estudo_por_uf.get(sigla, [])
+            }
+        }
+
+def _tamanho_bson(doc):
+    return len(BSON.encode(doc))
+
+def imprimir_economia_ufs(municipios_agrupados, ufs_docs, ufs_separadas):
+    """Compara o tamanho BSON dos indicadores por UF copiados em cada município com o da coleção UFs."""
+    por_uf = {doc['uf_sigla']: _tamanho_bson(doc['indicadores_educacionais']) for doc in ufs_docs}
+    embutido = sum(por_uf.get(uf, 0) * n for uf, n in municipios_agrupados['uf_sigla'].value_counts().items())
+    colecao = sum(_tamanho_bson(doc) for doc in ufs_docs)
+    if ufs_separadas:
+        print(f"📏 Indicadores por UF: {colecao / 1024:.1f} KB na coleção UFs em vez de {embutido / 1024 ** 2:.2f} MB "
+              f"copiados em Municipios (economia de {(embutido - colecao) / 1024 ** 2:.2f} MB)")
+    else:
+        print(f"📏 Indicadores por UF copiados em Municipios: {embutido / 1024 ** 2:.2f} MB "
+              f"(com --ufs-separadas seriam {colecao / 1024:.1f} KB)")
+
+def mesclar_anos_anteriores(destino, anos_anteriores, etapa, processos, tamanho_bloco, usar_staging):
+    """Mescla as matrículas de `anos_anteriores` em Escolas (ver censo_anual.mesclar_anos).
+
+    Devolve as chaves naturais das escolas mescladas. Se algum ano falhar, devolve todas as de
+    Escolas: sem saber quais escolas eram só daquele ano, a sincronização incremental não remove nenhuma.
+    """
+    print(f"\n📅 Mesclando as matrículas de {len(anos_anteriores)} ano(s) anterior(es) em Escolas...")
+    with etapa('mesclagem dos anos anteriores') as medicao:
+        # Os upserts filtram pela chave de partição + co_entidade: o índice único precisa existir antes
+        criar_indices(destino.db, ['Escolas'])
+        relatorios_anos, falhas, chaves = mesclar_anos(anos_anteriores, destino.uri, destino.banco, processos,
+                                                       tamanho_bloco, destino.carregador.tamanho_lote,
+                                                       destino.carregador.workers, usar_staging)
+        medicao.linhas_entrada = sum(r['linhas'] for r in relatorios_anos)
+        medicao.linhas_saida = sum(r['escolas_no_ano'] for r in relatorios_anos)
+        medicao.detalhes.update(anos=relatorios_anos, falhas=falhas)
+    if falhas:
+        print(f"⚠️  Anos não mesclados: {', '.join(str(ano) for ano in sorted(falhas))}")
+        return {(doc['co_entidade'],) for doc in destino.db.Escolas.find({}, {'_id': 0, 'co_entidade': 1})}
+    return chaves
+
+def run_migration(destino, tamanho_bloco=TAMANHO_BLOCO_PADRAO, usar_cache=True, limpar_cache=False,
+                  ufs_separadas=False, instrucao_compacta=False, caminho_censo=CAMINHO_CENSO, anos_anteriores=None,
+                  processos=None, usar_staging=True, instrumentos=None, arquivos_indicadores=None):
+    """Lê os arquivos de origem, transforma os dados e os grava em `destino`.
+
+    `destino` é um DestinoMongo, que escreve no banco (com `incremental=True` as coleções não
+    são apagadas: só os documentos novos, alterados ou removidos na origem são escritos), ou um
+    exportacao.DestinoArquivos, que grava arquivos sem precisar de banco. Com `ufs_separadas=True`
+    a frequência escolar e os anos de estudo (indicadores estaduais) vão uma única vez para a
+    coleção UFs em vez de serem copiados em cada município (ver entidades.LeitorEntidades). Com
+    `instrucao_compacta=True` o nível de instrução é gravado como matriz 4 x 19 (ver nivel_instrucao).
+
+    `caminho_censo` é o ano mais recente, que define municípios, escolas e resumos. As matrículas
+    de `anos_anteriores` ([(ano, caminho)]) são mescladas depois nas Escolas, um processo por ano
+    (só com DestinoMongo: a mesclagem faz upserts sobre as escolas já gravadas).
+    Com `usar_staging=True` as fontes são lidas dos arquivos Arrow/Parquet preparados (ver staging).
+    `arquivos_indicadores` substitui ARQUIVOS_INDICADORES (ver arquivos_indicadores()).
+
+    Cada etapa é medida por `instrumentos` (instrumentacao.Instrumentacao), que no fim tem o
+    relatório da execução.
+    """
+    if anos_anteriores and destino.db is None:
+        raise ValueError("A mesclagem de anos anteriores precisa do banco; exporte um ano por vez.")
+    instrumentos = instrumentos or Instrumentacao()
+    etapa = instrumentos.etapa
     try:
-        df_censo = pd.read_csv('./datasets/microdados_ed_basica_2023.csv', sep=';', low_memory=False, encoding='latin1')
-        colunas_para_zerar = ['QT_MAT_BAS', 'QT_MAT_BAS_INDIGENA', 'QT_TUR_INF', 'QT_TUR_FUND', 'QT_TUR_MED', 'QT_TUR_EJA', 'NU_ANO_CENSO', 'IN_INF', 'IN_FUND_AI', 'IN_FUND_AF', 'IN_MED', 'IN_EJA']
-        for col in colunas_para_zerar:
-            if col in df_censo.columns:
-                df_censo[col] = pd.to_numeric(df_censo[col], errors='coerce').fillna(0)
+        # Leitura em blocos: só as colunas usadas, com tipos compactos, agregando incrementalmente
+        with etapa('leitura do censo') as medicao:
+            censo = agregar_censo(caminho_censo, tamanho_bloco, usar_staging)
+            medicao.linhas_saida = censo.linhas_lidas
+            medicao.detalhes.update(arquivo=os.path.basename(caminho_censo), blocos=censo.blocos_lidos)
+        print(f"✅ Censo lido em {censo.blocos_lidos} blocos ({censo.linhas_lidas} linhas).")
     except FileNotFoundError as e:
-        print(f"❌ Erro fatal: Arquivo 'microdados_ed_basica_2023.csv' não encontrado. Detalhes: {e}")
+        print(f"❌ Erro fatal: Arquivo '{os.path.basename(caminho_censo)}' não encontrado. Detalhes: {e}")
+        return
+    except ValueError as e:
+        print(f"❌ Erro fatal ao ler o censo: {e}")
         return
 
     # Processar indicadores
-    frequencia_por_uf, anos_estudo_por_uf, instrucao_por_municipio = processar_indicadores()
+    with etapa('indicadores') as medicao:
+        frequencia_por_uf, anos_estudo_por_uf, instrucao_por_municipio = carregar_indicadores(
+            usar_cache, limpar_cache, usar_staging, instrumentos.verbosidade, arquivos_indicadores)
+        if instrucao_por_municipio is not None:
+            medicao.linhas_saida = len(instrucao_por_municipio)
 
     if instrucao_por_municipio is None:
         print("❌ Erro fatal: Não foi possível processar os indicadores.")
         return
 
-    # Debug temporário - verificar correspondência de nomes
-    print("\n🔍 TESTE: Primeiros 5 municípios do arquivo de instrução:")
-    for i, municipio in enumerate(list(instrucao_por_municipio.keys())[:5]):
-        print(f"  {i+1}. {municipio} -> {len(instrucao_por_municipio[municipio])} registros")
-
     # --- Migração de Municípios ---
     print("\n🏛️  Migrando Municípios...")
-    db.Municipios.drop()
-    municipios_agrupados = df_censo.groupby('CO_MUNICIPIO').agg(
-        nome_municipio=('NO_MUNICIPIO', 'first'),
-        uf_sigla=('SG_UF', 'first'),
-        regiao_nome=('NO_REGIAO', 'first'),
-        populacao_total=('QT_MAT_BAS', 'sum'),
-        populacao_indigena=('QT_MAT_BAS_INDIGENA', 'sum')
-    ).reset_index()
-
-    print(f"\n🔍 TESTE: Primeiros 5 municípios do censo:")
-    for i, municipio in enumerate(municipios_agrupados['nome_municipio'].head()):
-        normalizado = normalize_string(municipio)
-        tem_dados = "SIM" if normalizado in instrucao_por_municipio else "NÃO"
-        print(f"  {i+1}. {municipio} -> {normalizado} -> Tem dados: {tem_dados}")
+    estado_municipios = destino.estado('Municipios')
+    with etapa('agregação dos municípios', censo.linhas_lidas) as medicao:
+        municipios_agrupados = censo.municipios()
+        medicao.linhas_saida = len(municipios_agrupados)
+
+    # Uma única junção por (nome normalizado, UF): homônimos de UFs diferentes não se misturam
+    with etapa('junção da instrução', len(municipios_agrupados)) as medicao:
+        instrucao_alinhada, relatorio_juncao = juntar_por_nome_uf(municipios_agrupados, instrucao_por_municipio)
+        medicao.linhas_saida = len(instrucao_alinhada)
+        medicao.detalhes['juncao'] = relatorio_juncao
+    imprimir_relatorio_juncao(relatorio_juncao, "Nível de instrução")
 
     municipios_docs, municipio_map = [], {}
-    municipios_com_instrucao = 0
-
-    for _, row in municipios_agrupados.iterrows():
-        nome_normalizado = normalize_string(row['nome_municipio'])
-
-        # Buscar dados de instrução para este município
-        dados_instrucao = instrucao_por_municipio.get(nome_normalizado, [])
-
-        if dados_instrucao:
-            municipios_com_instrucao += 1
-            if municipios_com_instrucao <= 5:  # Debug apenas dos primeiros 5
-                print(f"✅ Município {row['nome_municipio']} ({nome_normalizado}) tem {len(dados_instrucao)} registros de instrução")
-
-        doc = {
-            "nome_municipio": row['nome_municipio'],
-            "uf_sigla": row['uf_sigla'],
-            "regiao_nome": row['regiao_nome'],
-            "populacao_total": int(row['populacao_total']),
-            "populacao_indigena": int(row['populacao_indigena']),
-            "indicadores_educacionais": {
-                "frequencia_escolar": frequencia_por_uf.get(row['uf_sigla'], []),
-                "anos_estudo": anos_estudo_por_uf.get(row['uf_sigla'], []),
-                "nivel_instrucao": dados_instrucao
+    contagens = {}
+
+    with etapa('transformação dos municípios', len(municipios_agrupados)) as medicao:
+        for (_, row), dados_instrucao in zip(municipios_agrupados.iterrows(), instrucao_alinhada):
+            # _id gerado no cliente (ou reaproveitado na migração incremental): as Escolas
+            # podem referenciar o município sem esperar o insert
+            co_municipio = int(row['CO_MUNICIPIO'])
+            id_municipio = (estado_municipios and estado_municipios.id_existente((co_municipio,))) or ObjectId()
+            municipio_map[co_municipio] = id_municipio
+            if instrucao_compacta:
+                instrucao = {CAMPO_MATRIZ: codificar(dados_instrucao)}
+            else:
+                instrucao = {"nivel_instrucao": dados_instrucao}
+
+            doc = {
+                "_id": id_municipio,
+                "co_municipio": co_municipio,
+                "nome_municipio": row['nome_municipio'],
+                "uf_sigla": row['uf_sigla'],
+                "regiao_nome": row['regiao_nome'],
+                "populacao_total": int(row['populacao_total']),
+                "populacao_indigena": int(row['populacao_indigena']),
+                "indicadores_educacionais": instrucao if ufs_separadas else {
+                    "frequencia_escolar": frequencia_por_uf.get(row['uf_sigla'], []),
+                    "anos_estudo": anos_estudo_por_uf.get(row['uf_sigla'], []),
+                    **instrucao
+                }
             }
-        }
-        municipios_docs.append(doc)
-
-    print(f"🔍 Debug: {municipios_com_instrucao} municípios têm dados de instrução de um total de {len(municipios_agrupados)}")
-
-    if municipios_docs:
-        result = db.Municipios.insert_many(municipios_docs)
-        for i, row in municipios_agrupados.iterrows():
-            municipio_map[int(row['CO_MUNICIPIO'])] = result.inserted_ids[i]
-
-    print(f"✅ {len(municipio_map)} municípios migrados.")
+            municipios_docs.append(doc)
+
+        ufs_docs = list(documentos_ufs(municipios_agrupados, frequencia_por_uf, anos_estudo_por_uf))
+        medicao.linhas_saida = len(municipios_docs)
+    imprimir_economia_ufs(municipios_agrupados, ufs_docs, ufs_separadas)
+
+    with etapa('escrita: Municipios', len(municipios_docs)) as medicao:
+        total = contagens['Municipios'] = destino.gravar('Municipios', municipios_docs, estado_municipios, medicao)
+        if instrucao_compacta:
+            # Rótulos das linhas e colunas da matriz, uma única vez para todos os municípios
+            destino.gravar_metadados(documento_dimensoes())
+    print(f"✅ {total} municípios migrados.")
+
+    # --- Indicadores estaduais (modelo com UFs separadas) ---
+    if ufs_separadas:
+        print("\n🗺️  Migrando UFs...")
+        with etapa('escrita: UFs', len(ufs_docs)) as medicao:
+            total = contagens['UFs'] = destino.gravar('UFs', ufs_docs, etapa=medicao)
+        print(f"✅ {total} UFs migradas.")
+    else:
+        destino.remover('UFs')
 
     # --- Migração de Escolas ---
     print("\n🏫 Migrando Escolas...")
-    db.Escolas.drop()
-    escolas_df = df_censo.drop_duplicates(subset='CO_ENTIDADE')
-    escolas_docs = []
-    dep_map = {1: 'Federal', 2: 'Estadual', 3: 'Municipal', 4: 'Privada'}
-    loc_map = {1: 'Urbana', 2: 'Rural'}
-    sit_map = {1: 'Ativa', 2: 'Inativa', 3: 'Paralisada'}
-
-    for _, row in escolas_df.iterrows():
-        id_municipio_mongo = municipio_map.get(int(row['CO_MUNICIPIO']))
-        if not id_municipio_mongo:
-            continue
-
-        turmas = [
-            {"nivel_ensino": "Infantil", "qt_turmas": int(row['QT_TUR_INF'])},
-            {"nivel_ensino": "Fundamental", "qt_turmas": int(row['QT_TUR_FUND'])},
-            {"nivel_ensino": "Médio", "qt_turmas": int(row['QT_TUR_MED'])}
-        ]
-        turmas = [t for t in turmas if t['qt_turmas'] > 0]
-
-        niveis_ofertados = [n for f, n in [(row['IN_INF'], "Infantil"), (row['IN_FUND_AI'] or row['IN_FUND_AF'], "Fundamental"), (row['IN_MED'], "Médio")] if f]
-
-        matriculas = [{
-            "ano_referencia": int(row['NU_ANO_CENSO']),
-            "niveis_ofertados": niveis_ofertados,
-            "qt_matriculas_total": int(row['QT_MAT_BAS']),
-            "qt_matriculas_indigenas": int(row['QT_MAT_BAS_INDIGENA'])
-        }] if niveis_ofertados else []
-
-        doc = {
-            "nome_escola": row['NO_ENTIDADE'],
-            "municipio_id": id_municipio_mongo,
-            "uf_sigla": row['SG_UF'],
-            "regiao_nome": row['NO_REGIAO'],
-            "tipo_dependencia": dep_map.get(row['TP_DEPENDENCIA'], 'NI'),
-            "tipo_localizacao": loc_map.get(row['TP_LOCALIZACAO'], 'NI'),
-            "situacao_funcionamento": sit_map.get(row['TP_SITUACAO_FUNCIONAMENTO'], 'NI'),
-            "indigena": bool(row['IN_EDUCACAO_INDIGENA']),
-            "turmas": turmas,
-            "matriculas": matriculas
-        }
-        escolas_docs.append(doc)
-
-    if escolas_docs:
-        db.Escolas.insert_many(escolas_docs)
-    print(f"✅ {len(escolas_docs)} escolas migradas.")
+    with etapa('filtragem das escolas', censo.linhas_lidas) as medicao:
+        escolas_df = censo.escolas()
+        medicao.linhas_saida = len(escolas_df)
+
+    escolas_anteriores = None
+    if anos_anteriores and destino.incremental:
+        # Na migração incremental a mesclagem vem antes: as escolas que só existem nos anos anteriores
+        # não estão no ano mais recente, e a sincronização precisa conhecê-las para não removê-las
+        escolas_anteriores = mesclar_anos_anteriores(destino, anos_anteriores, etapa, processos, tamanho_bloco,
+                                                     usar_staging)
+
+    # Documentos gerados de forma colunar e consumidos sob demanda pelo carregador: a etapa de
+    # escrita separa em `segundos_transformacao` o tempo gasto gerando os documentos
+    with etapa('escrita: Escolas', len(escolas_df)) as medicao:
+        total = contagens['Escolas'] = destino.gravar('Escolas', gerar_documentos_escolas(escolas_df, municipio_map),
+                                                      etapa=medicao, preservar=escolas_anteriores)
+    print(f"✅ {total} escolas migradas.")
+
+    if anos_anteriores:
+        if not destino.incremental:
+            mesclar_anos_anteriores(destino, anos_anteriores, etapa, processos, tamanho_bloco, usar_staging)
+        contagens['Escolas'] = destino.db.Escolas.estimated_document_count()
+        print(f"✅ {contagens['Escolas']} escolas após a mesclagem dos anos.")
+
+    # --- Resumo por município (pré-agregado para as consultas 2, 4 e 5) ---
+    print("\n📊 Gerando resumo por município...")
+    with etapa('escrita: ResumoMunicipios', len(municipios_agrupados)) as medicao:
+        # Agregado sobre o que Escolas de fato contém (anos mesclados e, na migração incremental,
+        # o que já estava no banco), para dar os mesmos totais das consultas 2, 4 e 5
+        if destino.db is not None:
+            resumo = resumir_escolas_gravadas(destino.db.Escolas, municipio_map)
+        else:
+            resumo = resumir_escolas_por_municipio(escolas_df)
+        resumo_docs = gerar_documentos_resumo(municipios_agrupados, resumo, municipio_map)
+        total = contagens['ResumoMunicipios'] = destino.gravar('ResumoMunicipios', resumo_docs, etapa=medicao)
+    print(f"✅ {total} resumos de municípios gravados.")
 
     # --- Migração de Territórios Indígenas ---
     print("\n🏞️  Migrando Territórios Indígenas...")
-    db.TerritoriosIndigenas.drop()
-    df_territorios = df_censo[df_censo['TP_LOCALIZACAO_DIFERENCIADA'] == 1].copy().drop_duplicates(subset=['NO_MUNICIPIO', 'SG_UF'])
-    territorios_docs = [{
-        "nome_territorio": f"Território Indígena em {row['NO_MUNICIPIO']}",
-        "uf_sigla": row['SG_UF'],
-        "regiao_nome": row['NO_REGIAO']
-    } for _, row in df_territorios.iterrows()]
-
-    if territorios_docs:
-        db.TerritoriosIndigenas.insert_many(territorios_docs)
-    print(f"✅ {len(territorios_docs)} territórios indígenas migrados.")
+    with etapa('escrita: TerritoriosIndigenas') as medicao:
+        df_territorios = censo.territorios()
+        medicao.linhas_entrada = len(df_territorios)
+        territorios_docs = ({
+            "nome_territorio": f"Território Indígena em {row['NO_MUNICIPIO']}",
+            "uf_sigla": row['SG_UF'],
+            "regiao_nome": row['NO_REGIAO']
+        } for _, row in df_territorios.iterrows())
+
+        total = contagens['TerritoriosIndigenas'] = destino.gravar('TerritoriosIndigenas', territorios_docs,
+                                                                   etapa=medicao)
+    print(f"✅ {total} territórios indígenas migrados.")
+
+    if destino.db is None:
+        # Exportação: índices, geração e verificação ficam para a restauração (exportacao.py restaurar)
+        with etapa('manifesto'):
+            destino.finalizar(contagens, instrumentos.parametros)
+        return
+
+    db = destino.db
+
+    # --- Índices (depois da carga em massa, para não pesar em cada insert) ---
+    print("\n🗂️  Criando índices secundários...")
+    with etapa('criação dos índices'):
+        criar_indices(db)
+
+    # --- Geração dos dados: invalida os resultados de consultas guardados em cache ---
+    geracao = registrar_geracao(db, contagens)
+    instrumentos.parametros['geracao'] = geracao
+    print(f"🏷️  Geração dos dados: {geracao}")
 
     # --- Verificação final ---
     print("\n🔍 Verificação final dos dados inseridos:")
 
-    # Contar municípios com dados de instrução no MongoDB
-    municipios_com_dados = db.Municipios.count_documents({
-        "indicadores_educacionais.nivel_instrucao": {"$ne": []}
-    })
+    with etapa('verificação') as medicao:
+        # Contar municípios com dados de instrução no MongoDB
+        campo_instrucao = f"indicadores_educacionais.{CAMPO_MATRIZ if instrucao_compacta else 'nivel_instrucao'}"
+        municipios_com_dados = db.Municipios.count_documents({campo_instrucao: {"$ne": []}})
+        medicao.linhas_saida = municipios_com_dados
 
-    print(f"📊 Municípios no MongoDB com dados de instrução: {municipios_com_dados}")
+        print(f"📊 Municípios no MongoDB com dados de instrução: {municipios_com_dados}")
 
-    # Mostrar exemplo de município com dados
-    exemplo = db.Municipios.find_one({
-        "indicadores_educacionais.nivel_instrucao": {"$ne": []}
-    })
+        # Mostrar exemplo de município com dados
+        exemplo = db.Municipios.find_one({campo_instrucao: {"$ne": []}})
 
-    if exemplo:
-        print(f"📋 Exemplo - {exemplo['nome_municipio']} tem {len(exemplo['indicadores_educacionais']['nivel_instrucao'])} registros de instrução")
-    else:
-        print("❌ Nenhum município encontrado com dados de instrução!")
+        if exemplo:
+            expandir_documento(exemplo)
+            print(f"📋 Exemplo - {exemplo['nome_municipio']} tem {len(exemplo['indicadores_educacionais']['nivel_instrucao'])} registros de instrução")
+        else:
+            print("❌ Nenhum município encontrado com dados de instrução!")
 
 # --- 4. EXECUÇÃO ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migração dos arquivos de origem para o MongoDB.")
+    parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PADRAO,
+                        help="Número de linhas do CSV do censo lidas por bloco.")
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE_PADRAO,
+                        help="Número de documentos por insert_many.")
+    parser.add_argument('--workers', type=int, default=WORKERS_PADRAO,
+                        help="Threads de escrita compartilhando o pool de conexões.")
+    parser.add_argument('-v', '--verboso', action='count', default=0,
+                        help="-v mostra a latência de cada lote gravado; -vv também as amostras de depuração dos dados.")
+    parser.add_argument('--relatorio',
+                        help="Arquivo JSON com o relatório da execução (tempo, CPU, linhas, docs/s e memória por etapa).")
+    parser.add_argument('--perfilar', nargs='+', metavar='ETAPA',
+                        help=f"Roda as etapas indicadas (ex.: 'leitura do censo', 'escrita: Escolas') ou '{TODAS_AS_ETAPAS}' "
+                             "sob cProfile; as funções mais caras vão para o relatório.")
+    parser.add_argument('--diretorio-perfis',
+                        help="Grava o .prof de cada etapa perfilada neste diretório (para snakeviz/pstats).")
+    parser.add_argument('--rastrear-memoria', action='store_true',
+                        help="Mede com tracemalloc o pico de memória alocada em cada etapa (mais lento).")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Não apaga as coleções: grava só o que mudou (comparando hashes de conteúdo).")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help="Ignora o cache das planilhas de indicadores e as processa novamente.")
+    parser.add_argument('--limpar-cache', action='store_true',
+                        help="Apaga o cache das planilhas de indicadores antes de rodar.")
+    parser.add_argument('--instrucao-compacta', action='store_true',
+                        help="Grava o nível de instrução como matriz 4 x 19 de inteiros em vez de até 76 subdocumentos.")
+    parser.add_argument('--sem-staging', action='store_true',
+                        help="Lê sempre o CSV e as planilhas originais, sem os arquivos Arrow/Parquet de datasets/staging.")
+    parser.add_argument('--diretorio-censo',
+                        help="Diretório com vários anos (microdados_ed_basica_AAAA.csv): o mais recente é migrado e os anteriores mesclados.")
+    parser.add_argument('--diretorio-indicadores',
+                        help="Diretório com as planilhas frequencia_escolar, media_anos e nivel_instrucao (padrão: ./datasets).")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Processos para mesclar os anos anteriores (padrão: número de CPUs).")
+    parser.add_argument('--ufs-separadas', action='store_true',
+                        help="Grava frequência escolar e anos de estudo uma vez por UF (coleção UFs), sem copiá-los em cada município.")
+    parser.add_argument('--uri', default=URI_MONGO)
+    parser.add_argument('--banco', default=NOME_BANCO)
+    parser.add_argument('--exportar', metavar='DIRETORIO',
+                        help="Modo offline: não conecta ao MongoDB e grava cada coleção em arquivos comprimidos "
+                             "neste diretório (carregue-os depois com `exportacao.py restaurar`).")
+    parser.add_argument('--formato-exportacao', choices=FORMATOS_ARQUIVO, default='jsonl',
+                        help="JSONL (Extended JSON, legível e fácil de comparar) ou BSON (mais rápido de ler e gravar).")
+    parser.add_argument('--documentos-por-arquivo', type=int, default=DOCUMENTOS_POR_ARQUIVO_PADRAO,
+                        help="Documentos por arquivo exportado; cada arquivo é restaurado por um processo.")
+    args = parser.parse_args()
+    if args.exportar and args.incremental:
+        parser.error("--incremental compara com o banco e não se aplica a --exportar")
+    instrumentos = Instrumentacao(perfilar=args.perfilar, rastrear_memoria=args.rastrear_memoria,
+                                  diretorio_perfis=args.diretorio_perfis, verbosidade=args.verboso)
+    instrumentos.parametros = dict(vars(args))
     try:
-        run_migration()
-        print("\n\n🎉 Migração DIRETA DOS ARQUIVOS concluída com sucesso!")
+        caminho_censo, anos_anteriores = CAMINHO_CENSO, []
+        if args.diretorio_censo:
+            anos = descobrir_anos(args.diretorio_censo)
+            if not anos:
+                raise SystemExit(f"❌ Nenhum arquivo microdados_ed_basica_AAAA.csv em {args.diretorio_censo}")
+            (ano_recente, caminho_censo), anos_anteriores = anos[-1], anos[:-1]
+            print(f"📅 Censos encontrados: {', '.join(str(ano) for ano, _ in anos)} (mais recente: {ano_recente})")
+            if anos_anteriores and args.exportar:
+                raise SystemExit("❌ --exportar grava um ano só: a mesclagem dos anos anteriores precisa do banco.")
+        if args.exportar:
+            print(f"🚀 Exportando a migração para {args.exportar} (sem MongoDB)...")
+            destino = DestinoArquivos(args.exportar, args.formato_exportacao, args.documentos_por_arquivo)
+        else:
+            print("🚀 Iniciando migração direta dos arquivos para MongoDB...")
+            try:
+                client = conectar(args.uri)
+                print("✅ Conexão com MongoDB estabelecida com sucesso.")
+            except Exception as e:
+                raise SystemExit(f"❌ Erro de conexão com MongoDB: {e}")
+            carregador = CarregadorEmLotes(tamanho_lote=args.tamanho_lote, workers=args.workers, verboso=args.verboso >= 1)
+            destino = DestinoMongo(client, args.banco, args.uri, carregador, args.incremental)
+        run_migration(destino, tamanho_bloco=args.tamanho_bloco,
+                      usar_cache=not args.sem_cache, limpar_cache=args.limpar_cache, ufs_separadas=args.ufs_separadas,
+                      instrucao_compacta=args.instrucao_compacta, caminho_censo=caminho_censo,
+                      anos_anteriores=anos_anteriores, processos=args.processos, usar_staging=not args.sem_staging,
+                      instrumentos=instrumentos,
+                      arquivos_indicadores=arquivos_indicadores(args.diretorio_indicadores) if args.diretorio_indicadores else None)
+        if args.exportar:
+            print(f"\n\n🎉 Exportação concluída em {args.exportar}!")
+        else:
+            print("\n\n🎉 Migração DIRETA DOS ARQUIVOS concluída com sucesso!")
     except Exception as e:
         print(f"\n❌ Ocorreu um erro geral durante a migração: {e}")
         import traceback
         traceback.print_exc()
     finally:
+        # Também em caso de erro: a etapa que falhou fica no relatório com o erro
+        instrumentos.imprimir_resumo()
+        if args.relatorio:
+            instrumentos.salvar_relatorio(args.relatorio)
         if 'client' in locals() and client:
             client.close()
             print("\n🔌 Conexão com MongoDB fechada.")
\ No newline at end of file
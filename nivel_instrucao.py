@@ -0,0 +1,78 @@
+"""Codificação compacta de `indicadores_educacionais.nivel_instrucao`.
+
+No formato detalhado cada município guarda até 76 subdocumentos {faixa_etaria, nivel, qt_pessoas}.
+No compacto (`migracao.py --instrucao-compacta`) guarda uma matriz 4 x 19 de inteiros em
+`nivel_instrucao_matriz`, uma linha por nível e uma coluna por faixa etária, com null nas
+células sem dado. Os rótulos das dimensões ficam uma única vez em Metadados.
+"""
+
+# Dimensões da matriz, na ordem das colunas da planilha do IBGE
+NIVEIS = ['Sem instrução', 'Fundamental completo', 'Médio completo', 'Superior completo']
+FAIXAS_ETARIAS = [
+    'Total', '18 a 24 anos', '18 a 19 anos', '20 a 24 anos',
+    '25 anos ou mais', '25 a 64 anos', '25 a 29 anos', '30 a 34 anos',
+    '35 a 39 anos', '40 a 44 anos', '45 a 49 anos', '50 a 54 anos',
+    '55 a 59 anos', '60 a 64 anos', '65 anos ou mais', '65 a 69 anos',
+    '70 a 74 anos', '75 a 79 anos', '80 anos ou mais'
+]
+INDICE_NIVEL = {nivel: i for i, nivel in enumerate(NIVEIS)}
+INDICE_FAIXA = {faixa: j for j, faixa in enumerate(FAIXAS_ETARIAS)}
+
+CAMPO_MATRIZ = 'nivel_instrucao_matriz'
+ID_DIMENSOES = 'dimensoes_nivel_instrucao'
+
+
+def codificar(registros):
+    """Lista detalhada -> matriz 4 x 19 (lista vazia quando não há registros).
+
+    Células repetidas (mesmo nível e faixa) são somadas.
+    """
+    if not registros:
+        return []
+    matriz = [[None] * len(FAIXAS_ETARIAS) for _ in NIVEIS]
+    for r in registros:
+        i, j = INDICE_NIVEL[r['nivel']], INDICE_FAIXA[r['faixa_etaria']]
+        matriz[i][j] = r['qt_pessoas'] if matriz[i][j] is None else matriz[i][j] + r['qt_pessoas']
+    return matriz
+
+
+def decodificar(matriz):
+    """Matriz 4 x 19 -> lista detalhada, na mesma ordem gerada pela migração (nível a nível, faixa a faixa)."""
+    return [
+        {"faixa_etaria": FAIXAS_ETARIAS[j], "nivel": NIVEIS[i], "qt_pessoas": qt}
+        for i, linha in enumerate(matriz or [])
+        for j, qt in enumerate(linha) if qt is not None
+    ]
+
+
+def qt_pessoas(matriz, nivel, faixa_etaria):
+    """Valor de uma célula (None sem dado) a partir da matriz de um documento."""
+    if not matriz:
+        return None
+    return matriz[INDICE_NIVEL[nivel]][INDICE_FAIXA[faixa_etaria]]
+
+
+def caminho_celula(nivel, faixa_etaria, prefixo='indicadores_educacionais'):
+    """Caminho com índices posicionais para filtros e índices: `...nivel_instrucao_matriz.3.4`."""
+    return f"{prefixo}.{CAMPO_MATRIZ}.{INDICE_NIVEL[nivel]}.{INDICE_FAIXA[faixa_etaria]}"
+
+
+def expr_qt_pessoas(nivel, faixa_etaria, prefixo='indicadores_educacionais'):
+    """Expressão de agregação que lê uma célula da matriz (null sem dado)."""
+    return {"$arrayElemAt": [
+        {"$arrayElemAt": [f"${prefixo}.{CAMPO_MATRIZ}", INDICE_NIVEL[nivel]]},
+        INDICE_FAIXA[faixa_etaria],
+    ]}
+
+
+def expandir_documento(municipio):
+    """Troca, em um documento de Municipios, a matriz compacta pelo formato detalhado (no lugar)."""
+    indicadores = municipio.get('indicadores_educacionais')
+    if indicadores and CAMPO_MATRIZ in indicadores:
+        indicadores['nivel_instrucao'] = decodificar(indicadores.pop(CAMPO_MATRIZ))
+    return municipio
+
+
+def documento_dimensoes():
+    """Dicionário de dimensões compartilhado, gravado em Metadados pela migração."""
+    return {'_id': ID_DIMENSOES, 'niveis': NIVEIS, 'faixas_etarias': FAIXAS_ETARIAS}
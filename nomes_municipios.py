@@ -0,0 +1,80 @@
+import unicodedata
+
+import pandas as pd
+
+# --- RESOLUÇÃO DE NOMES DE MUNICÍPIOS (PLANILHAS DO IBGE x CENSO ESCOLAR) ---
+
+# Rótulos das planilhas do IBGE: "Vila Propício (GO)"
+PADRAO_NOME_UF = r'^(?P<nome>.*?)\s*\((?P<uf>[A-Z]{2})\)$'
+
+
+def normalize_string(s):
+    """Converte para maiúsculas, remove espaços e acentos."""
+    if not isinstance(s, str):
+        return ""
+    s = s.strip().upper()
+    return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
+
+
+def normalizar_nomes(nomes):
+    """Normaliza uma Series de nomes calculando cada nome distinto uma única vez."""
+    normalizados = {nome: normalize_string(nome) for nome in pd.unique(nomes)}
+    return nomes.map(normalizados)
+
+
+def separar_nome_uf(rotulos):
+    """DataFrame (nome, uf) normalizado a partir de rótulos "Nome (UF)".
+
+    Rótulos sem o sufixo de UF (Brasil, estados, notas de rodapé) ficam de fora: o estado
+    "Goiás" e o município "Goiás (GO)", por exemplo, não se confundem mais.
+    """
+    partes = rotulos.astype(str).str.strip().str.extract(PADRAO_NOME_UF).dropna()
+    partes['nome'] = normalizar_nomes(partes['nome'])
+    return partes[partes['nome'] != '']
+
+
+def chaves_censo(municipios_df):
+    """Chaves (nome normalizado, UF) dos municípios agregados do censo, na ordem do dataframe."""
+    return pd.MultiIndex.from_arrays([
+        normalizar_nomes(municipios_df['nome_municipio']).to_numpy(),
+        municipios_df['uf_sigla'].astype(str).to_numpy(),
+    ], names=['nome', 'uf'])
+
+
+def juntar_por_nome_uf(municipios_df, dados_por_chave):
+    """Junção por hash entre os municípios do censo e um dicionário {(nome, uf): dados}.
+
+    Devolve (lista de dados alinhada a `municipios_df`, com [] para os sem correspondência, relatório).
+    """
+    chaves = chaves_censo(municipios_df)
+    nomes, ufs = zip(*dados_por_chave) if dados_por_chave else ((), ())
+    indice = pd.MultiIndex.from_arrays([list(nomes), list(ufs)], names=['nome', 'uf'])
+    valores = list(dados_por_chave.values())
+
+    posicoes = indice.get_indexer(chaves)
+    dados = [valores[p] if p >= 0 else [] for p in posicoes.tolist()]
+
+    # Nomes que existem em mais de uma UF: colidiriam numa junção só pelo nome
+    nomes_indice = pd.Series(indice.get_level_values('nome'))
+    homonimos = nomes_indice[nomes_indice.duplicated(keep=False)].nunique()
+    casados = posicoes >= 0
+    usados = set(posicoes[casados].tolist())
+    relatorio = {
+        "municipios": len(chaves),
+        "casados": int(casados.sum()),
+        "sem_correspondencia": int((~casados).sum()),
+        "chaves_duplicadas_censo": int(chaves.duplicated().sum()),
+        "homonimos_entre_ufs": int(homonimos),
+        "chaves_nao_usadas": len(indice) - len(usados),
+        "exemplos_sem_correspondencia": [f"{n} ({uf})" for n, uf in chaves[~casados][:5]],
+    }
+    return dados, relatorio
+
+
+def imprimir_relatorio_juncao(relatorio, descricao):
+    print(f"🔗 {descricao}: {relatorio['casados']} de {relatorio['municipios']} municípios casados por (nome, UF), "
+          f"{relatorio['sem_correspondencia']} sem correspondência, {relatorio['chaves_nao_usadas']} chaves da planilha não usadas")
+    print(f"   Colisões evitadas: {relatorio['homonimos_entre_ufs']} nomes presentes em mais de uma UF | "
+          f"chaves duplicadas no censo: {relatorio['chaves_duplicadas_censo']}")
+    if relatorio["exemplos_sem_correspondencia"]:
+        print(f"   Sem correspondência (exemplos): {', '.join(relatorio['exemplos_sem_correspondencia'])}")
@@ -0,0 +1,151 @@
+import hashlib
+import time
+
+from bson import BSON, ObjectId
+from pymongo import DeleteMany, ReplaceOne, UpdateMany, UpdateOne
+
+# --- RE-MIGRAÇÃO INCREMENTAL POR HASH DE CONTEÚDO ---
+
+CAMPO_HASH = 'hash_conteudo'
+
+# Chaves naturais (estáveis entre execuções) de cada coleção
+CHAVES_NATURAIS = {
+    'Municipios': ('co_municipio',),
+    'Escolas': ('co_entidade',),
+    'ResumoMunicipios': ('co_municipio',),
+    'TerritoriosIndigenas': ('nome_territorio', 'uf_sigla'),
+    'UFs': ('uf_sigla',),
+}
+
+# Listas com uma entrada por ano (campo, chave do ano), nas quais censo_anual.mesclar_ano acrescenta
+# os anos anteriores. A sincronização só reescreve as entradas dos anos presentes na origem.
+CAMPOS_POR_ANO = {
+    'Escolas': ('matriculas', 'ano_referencia'),
+}
+
+
+def calcular_hash(doc):
+    """Hash do conteúdo do documento, ignorando `_id` e o próprio campo de hash.
+
+    Calculado sobre o documento como a migração o gera: nas coleções de CAMPOS_POR_ANO, as
+    entradas dos anos mesclados depois ficam de fora, e o hash continua comparável entre execuções.
+    """
+    conteudo = {k: v for k, v in doc.items() if k not in ('_id', CAMPO_HASH)}
+    return hashlib.blake2b(BSON.encode(conteudo), digest_size=16).hexdigest()
+
+
+def com_hash(documentos):
+    """Anota cada documento com o hash do seu conteúdo (usado também na carga completa)."""
+    for doc in documentos:
+        doc[CAMPO_HASH] = calcular_hash(doc)
+        yield doc
+
+
+class EstadoColecao:
+    """Chave natural -> (_id, hash) dos documentos já gravados em uma coleção."""
+
+    def __init__(self, colecao):
+        self.campos_chave = CHAVES_NATURAIS[colecao.name]
+        projecao = {campo: 1 for campo in self.campos_chave}
+        projecao[CAMPO_HASH] = 1
+        self._docs = {}
+        for doc in colecao.find({}, projecao):
+            self._docs[self.chave(doc)] = (doc['_id'], doc.get(CAMPO_HASH))
+
+    def chave(self, doc):
+        return tuple(doc.get(campo) for campo in self.campos_chave)
+
+    def get(self, chave):
+        """(_id, hash) gravados para esta chave natural, ou None."""
+        return self._docs.get(chave)
+
+    def id_existente(self, chave):
+        """_id já usado por esta chave natural, ou None para documentos novos."""
+        atual = self._docs.get(chave)
+        return atual[0] if atual else None
+
+    def chaves_ausentes(self, vistas):
+        """_ids dos documentos gravados cuja chave não apareceu em `vistas`."""
+        return [id_ for chave, (id_, _) in self._docs.items() if chave not in vistas]
+
+    def __len__(self):
+        return len(self._docs)
+
+
+def sincronizar_colecao(colecao, documentos, carregador, estado=None, preservar=None):
+    """Aplica em `colecao` apenas as diferenças em relação a `documentos`.
+
+    Documentos com hash igual ao gravado são ignorados, os novos ou alterados são
+    substituídos (upsert) pelo `_id` existente e as chaves que sumiram da origem são removidas,
+    exceto as de `preservar` (chaves naturais gravadas por outra fonte, ex.: os anos anteriores do censo).
+
+    Nas coleções de CAMPOS_POR_ANO, um documento alterado não é substituído: os demais campos
+    recebem `$set` e, da lista por ano, só as entradas dos anos da origem são trocadas (como em
+    censo_anual.mesclar_ano, `$pull` e depois `$push`), preservando os anos mesclados.
+    """
+    estado = estado or EstadoColecao(colecao)
+    contagem = {"inseridos": 0, "atualizados": 0, "inalterados": 0, "removidos": 0}
+    vistas = set()
+    por_ano = CAMPOS_POR_ANO.get(colecao.name)
+    anos = set()
+    pendentes = []  # (_id, entradas da origem) dos alterados, reescritas depois do $pull
+
+    def operacoes():
+        for doc in documentos:
+            chave = estado.chave(doc)
+            vistas.add(chave)
+            doc[CAMPO_HASH] = calcular_hash(doc)
+            if por_ano:
+                anos.update(entrada[por_ano[1]] for entrada in doc.get(por_ano[0], []))
+            atual = estado.get(chave)
+            if atual is None:
+                doc.setdefault('_id', ObjectId())
+                contagem["inseridos"] += 1
+            elif atual[1] == doc[CAMPO_HASH]:
+                contagem["inalterados"] += 1
+                continue
+            else:
+                doc['_id'] = atual[0]
+                contagem["atualizados"] += 1
+                if por_ano:
+                    pendentes.append((doc['_id'], doc.pop(por_ano[0], [])))
+                    yield UpdateOne({'_id': doc['_id']}, {'$set': {k: v for k, v in doc.items() if k != '_id'}})
+                    continue
+            yield ReplaceOne({'_id': doc['_id']}, doc, upsert=True)
+
+        vistas.update(preservar or ())
+        removidos = estado.chaves_ausentes(vistas)
+        contagem["removidos"] = len(removidos)
+        for inicio in range(0, len(removidos), carregador.tamanho_lote):
+            yield DeleteMany({'_id': {'$in': removidos[inicio:inicio + carregador.tamanho_lote]}})
+
+    def retiradas():
+        campo, chave_ano = por_ano
+        ids = [id_ for id_, _ in pendentes]
+        for inicio in range(0, len(ids), carregador.tamanho_lote):
+            yield UpdateMany({'_id': {'$in': ids[inicio:inicio + carregador.tamanho_lote]}},
+                             {'$pull': {campo: {chave_ano: {'$in': sorted(anos)}}}})
+
+    def acrescimos():
+        campo, chave_ano = por_ano
+        for id_, entradas in pendentes:
+            if entradas:
+                yield UpdateOne({'_id': id_}, {'$push': {campo: {'$each': entradas, '$sort': {chave_ano: 1}}}})
+
+    inicio = time.perf_counter()
+    relatorio = carregador.executar_operacoes(colecao, operacoes())
+    if pendentes and anos:
+        # Cada passo termina antes do seguinte: o $push não pode chegar antes do $pull do mesmo ano
+        for passo in (retiradas(), acrescimos()):
+            extra = carregador.executar_operacoes(colecao, passo)
+            relatorio["documentos"] += extra["documentos"]
+            relatorio["lotes"] += extra["lotes"]
+    relatorio.update(contagem)
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 3)
+    return relatorio
+
+
+def imprimir_relatorio_sincronizacao(relatorio):
+    print(f"🔁 {relatorio['colecao']}: {relatorio['inseridos']} inseridos, {relatorio['atualizados']} atualizados, "
+          f"{relatorio['removidos']} removidos, {relatorio['inalterados']} inalterados "
+          f"({relatorio['documentos']} operações em {relatorio['segundos']} s)")
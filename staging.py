@@ -0,0 +1,183 @@
+"""Preparação (staging) colunar das fontes: o CSV do censo e as planilhas viram arquivos Arrow/Parquet tipados.
+
+O CSV do censo é convertido para Arrow IPC sem compressão, só com as colunas usadas e os tipos compactos
+de censo.py. A leitura é feita por memory map e fatias sem cópia. Cada planilha de indicadores vira
+um Parquet com o rótulo da linha e as células já convertidas em float. Os arquivos guardam
+a impressão digital da fonte nos metadados e são refeitos sozinhos quando a fonte muda.
+Sem o pyarrow instalado, tudo continua funcionando a partir das fontes originais.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from censo import (COLUNAS_CENSO, COLUNAS_CODIGO, COLUNAS_ZERADAS, DTYPES_LEITURA, TAMANHO_BLOCO_PADRAO,
+                   ler_censo_em_blocos)
+
+DIRETORIO_STAGING = './datasets/staging'
+# Incrementar quando o formato dos arquivos preparados mudar
+VERSAO_STAGING = 1
+
+
+def pyarrow_disponivel():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _caminho_preparado(caminho_fonte, extensao):
+    """Arquivo preparado da fonte: nome da fonte + hash curto do caminho absoluto.
+
+    Fontes homônimas em pastas diferentes (os dados reais e os sintéticos, por exemplo) não
+    sobrescrevem o arquivo preparado uma da outra.
+    """
+    nome = os.path.splitext(os.path.basename(caminho_fonte))[0]
+    origem = hashlib.blake2b(os.path.abspath(caminho_fonte).encode('utf-8'), digest_size=4).hexdigest()
+    return os.path.join(DIRETORIO_STAGING, f"{nome}-{origem}.{extensao}")
+
+
+def _impressao_rapida(caminho):
+    """Tamanho e mtime da fonte. Não calcula hash: ler vários GB a cada execução anularia o ganho do staging."""
+    info = os.stat(caminho)
+    return {"tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+def _impressao_completa(caminho):
+    """Tamanho, mtime e hash do conteúdo (para as planilhas, que são pequenas)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return {**_impressao_rapida(caminho), "hash": h.hexdigest()}
+
+
+def _metadados_esperados(impressao, formato):
+    return {"versao": VERSAO_STAGING, "formato": formato, "fonte": impressao}
+
+
+def _metadados_gravados(esquema):
+    bruto = (esquema.metadata or {}).get(b'staging')
+    return json.loads(bruto) if bruto else None
+
+
+def _gravar_atomico(caminho, gravar):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    try:
+        gravar(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+# --- Censo: Arrow IPC com memory map ---
+
+def esquema_censo():
+    import pyarrow as pa
+    tipos = {
+        'NO_REGIAO': pa.dictionary(pa.int8(), pa.string()),
+        'SG_UF': pa.dictionary(pa.int8(), pa.string()),
+        'NO_MUNICIPIO': pa.string(), 'NO_ENTIDADE': pa.string(),
+        'CO_MUNICIPIO': pa.int32(), 'CO_ENTIDADE': pa.int32(),
+        **{col: pa.from_numpy_dtype(dtype) for col, dtype in COLUNAS_ZERADAS.items()},
+        **{col: pa.float32() for col in COLUNAS_CODIGO},
+    }
+    return pa.schema([(col, tipos[col]) for col in COLUNAS_CENSO])
+
+
+def _censo_atualizado(caminho_arrow, impressao):
+    import pyarrow as pa
+    if not os.path.exists(caminho_arrow):
+        return False
+    try:
+        with pa.memory_map(caminho_arrow) as fonte:
+            gravados = _metadados_gravados(pa.ipc.open_file(fonte).schema)
+    except (OSError, pa.ArrowInvalid, ValueError):
+        return False
+    return gravados == _metadados_esperados(impressao, 'censo')
+
+
+def _blocos_gravando(caminho_csv, caminho_arrow, impressao, tamanho_bloco):
+    """Lê o CSV em blocos, repassando cada bloco e gravando-o no Arrow (uma única passada pelo texto)."""
+    import pyarrow as pa
+    esquema = esquema_censo().with_metadata(
+        {'staging': json.dumps(_metadados_esperados(impressao, 'censo'))})
+    os.makedirs(os.path.dirname(caminho_arrow), exist_ok=True)
+    temporario = caminho_arrow + '.tmp'
+    try:
+        with pa.OSFile(temporario, 'wb') as destino, pa.ipc.new_file(destino, esquema) as escritor:
+            for bloco in ler_censo_em_blocos(caminho_csv, tamanho_bloco):
+                escritor.write_batch(pa.RecordBatch.from_pandas(bloco, schema=esquema, preserve_index=False))
+                yield bloco
+        os.replace(temporario, caminho_arrow)
+        print(f"📦 Censo preparado em {caminho_arrow} ({os.path.getsize(caminho_arrow) / 1024 ** 2:.0f} MB)")
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def ler_censo_preparado(caminho_arrow, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    """Blocos do censo a partir do arquivo Arrow, por memory map e fatias sem cópia da tabela."""
+    import pyarrow as pa
+    with pa.memory_map(caminho_arrow) as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+        for inicio in range(0, tabela.num_rows, tamanho_bloco):
+            bloco = tabela.slice(inicio, tamanho_bloco).to_pandas()
+            yield bloco.astype(DTYPES_LEITURA)
+
+
+def blocos_censo(caminho_csv, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    """Blocos do censo: do Arrow preparado se estiver em dia; senão do CSV, preparando o Arrow no caminho."""
+    if not pyarrow_disponivel():
+        print("⚠️  pyarrow não instalado: lendo o CSV do censo diretamente.")
+        return ler_censo_em_blocos(caminho_csv, tamanho_bloco)
+    caminho_arrow = _caminho_preparado(caminho_csv, 'arrow')
+    impressao = _impressao_rapida(caminho_csv)
+    if _censo_atualizado(caminho_arrow, impressao):
+        print(f"⚡ Censo lido do staging {caminho_arrow} (memory map).")
+        return ler_censo_preparado(caminho_arrow, tamanho_bloco)
+    print(f"... Preparando {caminho_arrow} a partir do CSV (só na primeira leitura ou quando o CSV muda).")
+    return _blocos_gravando(caminho_csv, caminho_arrow, impressao, tamanho_bloco)
+
+
+# --- Planilhas de indicadores: Parquet com as células já convertidas ---
+
+def ler_planilha(caminho_xlsx, limpar, decimal_virgula=False):
+    """Planilha de indicadores como DataFrame (coluna 0 = rótulo, demais = float).
+
+    `limpar(bloco, decimal_virgula)` converte as células; o resultado fica em Parquet e é reaproveitado
+    enquanto a planilha não mudar. Sem pyarrow, lê e converte o .xlsx a cada chamada.
+    """
+    def do_excel():
+        bruto = pd.read_excel(caminho_xlsx, header=None, skiprows=5)
+        rotulos = bruto[0].map(lambda v: v if isinstance(v, str) else None)
+        valores = limpar(bruto.loc[:, 1:], decimal_virgula)
+        return pd.concat([rotulos.rename(0), valores], axis=1)
+
+    if not pyarrow_disponivel():
+        return do_excel()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    caminho_parquet = _caminho_preparado(caminho_xlsx, 'parquet')
+    esperados = _metadados_esperados(_impressao_completa(caminho_xlsx), f'planilha:{int(decimal_virgula)}')
+    if os.path.exists(caminho_parquet):
+        try:
+            if _metadados_gravados(pq.read_schema(caminho_parquet)) == esperados:
+                tabela = pq.read_table(caminho_parquet, memory_map=True)
+                df = tabela.to_pandas()
+                df.columns = [int(c) for c in df.columns]
+                return df
+        except (OSError, pa.ArrowInvalid, ValueError):
+            pass
+
+    df = do_excel()
+    tabela = pa.Table.from_pandas(df.rename(columns=str), preserve_index=False)
+    tabela = tabela.replace_schema_metadata({'staging': json.dumps(esperados)})
+    _gravar_atomico(caminho_parquet, lambda destino: pq.write_table(tabela, destino))
+    print(f"📦 Planilha preparada em {caminho_parquet}")
+    return df
@@ -0,0 +1,39 @@
+import pytest
+
+from cache_consultas import CacheMongo, COLECAO_CACHE, INDICE_TTL
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().db
+    comandos = []
+
+    def command(nome, colecao, index):
+        # O mongomock não implementa collMod: aplica a nova validade no índice recriando-o
+        comandos.append((nome, colecao, index))
+        db[colecao].drop_index(index['name'])
+        db[colecao].create_index([('criado_em', 1)], name=index['name'], expireAfterSeconds=index['expireAfterSeconds'])
+
+    monkeypatch.setattr(db, 'command', command)
+    db.comandos = comandos
+    return db
+
+
+def _ttl(db):
+    return db[COLECAO_CACHE].index_information()[INDICE_TTL]['expireAfterSeconds']
+
+
+def test_abrir_duas_vezes_com_ttls_diferentes_altera_o_indice(db):
+    CacheMongo(db, ttl_segundos=3600)
+    CacheMongo(db, ttl_segundos=60)
+    assert db.comandos == [('collMod', COLECAO_CACHE, {'name': INDICE_TTL, 'expireAfterSeconds': 60})]
+    assert _ttl(db) == 60
+
+
+def test_abrir_de_novo_com_o_mesmo_ttl_nao_altera_o_indice(db):
+    CacheMongo(db, ttl_segundos=3600)
+    CacheMongo(db, ttl_segundos=3600)
+    assert db.comandos == []
+    assert _ttl(db) == 3600
@@ -0,0 +1,49 @@
+import pytest
+
+from cache_consultas import CacheConsultas, CacheLRU, registrar_geracao
+from consultas import Consulta
+from executor_consultas import _executar_em_fluxo
+
+mongomock = pytest.importorskip('mongomock')
+
+CONSULTA = Consulta("teste", "[Teste]", "Escolas", [{"$match": {}}])
+
+
+class _SaidaNula:
+    def abrir(self, consulta):
+        return self
+
+    def escrever(self, doc):
+        pass
+
+    def fechar(self):
+        pass
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    db.Escolas.insert_many([{"co_entidade": i, "nome": "x" * 100} for i in range(50)])
+    registrar_geracao(db)
+    return db
+
+
+def _executar(db, limite_bytes_entrada):
+    cache = CacheConsultas(db, CacheLRU(), limite_bytes_entrada=limite_bytes_entrada)
+    relatorio = _executar_em_fluxo(db, CONSULTA, _SaidaNula(), {}, cache)
+    return cache, relatorio
+
+
+def test_resultado_dentro_do_limite_e_guardado(db):
+    cache, relatorio = _executar(db, 1024 * 1024)
+    assert relatorio["cache"] == "falha"
+    assert len(cache.armazenamento._entradas) == 1
+    assert cache.estatisticas["nao_armazenados"] == 0
+
+
+def test_resultado_acima_do_limite_segue_em_fluxo_sem_ser_guardado(db):
+    cache, relatorio = _executar(db, 1024)
+    assert relatorio["documentos"] == 50
+    assert relatorio["cache"] == "falha (grande demais para guardar)"
+    assert not cache.armazenamento._entradas
+    assert cache.estatisticas["nao_armazenados"] == 1
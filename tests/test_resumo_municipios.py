@@ -0,0 +1,54 @@
+import pytest
+from bson import ObjectId
+
+from benchmark_escolas import escolas_sinteticas
+from carregador import CarregadorEmLotes
+from censo import AgregadorCenso, gerar_documentos_escolas, gerar_documentos_resumo, resumir_escolas_gravadas
+from censo_anual import operacoes_mesclagem
+from consultas import REGISTRO
+
+mongomock = pytest.importorskip('mongomock')
+
+# Cada par diverge só a partir deste estágio, idêntico nas duas versões (e que o mongomock não implementa)
+PARES = [("consulta2", "consulta2_resumo", "$setWindowFields", "proporcao_indigena"),
+         ("consulta4", "consulta4_resumo", "$bucketAuto", "proporcao_escolas_indigenas"),
+         ("consulta5", "consulta5_resumo", "$sort", "score")]
+
+
+@pytest.fixture(scope='module')
+def db():
+    """Dois anos carregados como na migração: o mais recente gravado, o anterior mesclado em Escolas."""
+    db = mongomock.MongoClient().db
+    agregador = AgregadorCenso()
+    agregador.adicionar(escolas_sinteticas(300, n_municipios=20))
+    municipios, escolas = agregador.municipios(), agregador.escolas()
+    municipio_map = {int(co): ObjectId() for co in municipios['CO_MUNICIPIO']}
+    db.Municipios.insert_many([{"_id": municipio_map[int(r['CO_MUNICIPIO'])], "nome_municipio": r['nome_municipio'],
+                                "uf_sigla": r['uf_sigla'], "populacao_total": int(r['populacao_total']),
+                                "populacao_indigena": int(r['populacao_indigena'])}
+                               for r in municipios.to_dict('records')])
+    db.Escolas.insert_many(list(gerar_documentos_escolas(escolas, municipio_map)))
+
+    # O ano anterior tem 50 escolas que não existem no mais recente
+    anterior = escolas_sinteticas(350, n_municipios=20, semente=7)
+    anterior['NU_ANO_CENSO'] = 2022
+    CarregadorEmLotes(workers=1).executar_operacoes(
+        db.Escolas, operacoes_mesclagem(gerar_documentos_escolas(anterior, municipio_map), {}))
+
+    resumo = resumir_escolas_gravadas(db.Escolas, municipio_map)
+    db.ResumoMunicipios.insert_many(list(gerar_documentos_resumo(municipios, resumo, municipio_map)))
+    return db
+
+
+def _ate(db, nome, estagio, campo):
+    consulta = REGISTRO[nome]
+    corte = next(i for i, e in enumerate(consulta.pipeline) if estagio in e)
+    pipeline = consulta.pipeline[:corte] + [{"$project": {campo: 1}}]
+    return {doc['_id']: doc[campo] for doc in db[consulta.colecao].aggregate(pipeline)}
+
+
+@pytest.mark.parametrize("nome, nome_resumo, estagio, campo", PARES)
+def test_resumo_da_o_mesmo_resultado_com_dois_anos(db, nome, nome_resumo, estagio, campo):
+    escolas = _ate(db, nome, estagio, campo)
+    assert escolas
+    assert _ate(db, nome_resumo, estagio, campo) == pytest.approx(escolas)
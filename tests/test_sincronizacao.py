@@ -0,0 +1,65 @@
+import pytest
+
+from carregador import CarregadorEmLotes
+from censo_anual import operacoes_mesclagem
+from sincronizacao import CAMPO_HASH, calcular_hash, com_hash, sincronizar_colecao
+
+mongomock = pytest.importorskip('mongomock')
+
+
+def _escola(co_entidade, nome, ano, matriculas):
+    return {"co_entidade": co_entidade, "nome_escola": nome, "uf_sigla": "AM", "municipio_id": 1,
+            "matriculas": [{"ano_referencia": ano, "qt_matriculas_total": matriculas}]}
+
+
+@pytest.fixture
+def escolas():
+    colecao = mongomock.MongoClient().db.Escolas
+    carregador = CarregadorEmLotes(tamanho_lote=10, workers=1)
+    carregador.carregar(colecao, com_hash([_escola(1, "A", 2020, 10), _escola(2, "B", 2020, 20)]))
+    # Ano anterior mesclado como em censo_anual.mesclar_ano
+    carregador.executar_operacoes(colecao, operacoes_mesclagem([_escola(1, "A", 2019, 5), _escola(2, "B", 2019, 6)], {}))
+    return colecao, carregador
+
+
+def test_atualizacao_preserva_os_anos_mesclados(escolas):
+    colecao, carregador = escolas
+    relatorio = sincronizar_colecao(colecao, [_escola(1, "A", 2020, 11), _escola(2, "B", 2020, 20)], carregador)
+    assert (relatorio["atualizados"], relatorio["inalterados"]) == (1, 1)
+
+    doc = colecao.find_one({"co_entidade": 1})
+    assert [(m["ano_referencia"], m["qt_matriculas_total"]) for m in doc["matriculas"]] == [(2019, 5), (2020, 11)]
+    assert doc["nome_escola"] == "A"
+    assert doc[CAMPO_HASH] == calcular_hash(_escola(1, "A", 2020, 11))
+    assert len(colecao.find_one({"co_entidade": 2})["matriculas"]) == 2
+
+
+def test_segunda_sincronizacao_nao_altera_nada(escolas):
+    colecao, carregador = escolas
+    origem = [_escola(1, "A", 2020, 11), _escola(2, "B", 2020, 20)]
+    sincronizar_colecao(colecao, [dict(d, matriculas=list(d["matriculas"])) for d in origem], carregador)
+    relatorio = sincronizar_colecao(colecao, origem, carregador)
+    assert (relatorio["atualizados"], relatorio["inalterados"]) == (0, 2)
+
+
+def test_reexecucao_incremental_com_dois_anos_nao_altera_nada():
+    """Como em migracao.py --incremental --diretorio-censo: mescla o ano anterior e depois sincroniza o mais recente."""
+    colecao = mongomock.MongoClient().db.Escolas
+    carregador = CarregadorEmLotes(tamanho_lote=10, workers=1)
+    anterior = [_escola(1, "A", 2019, 5), _escola(3, "C", 2019, 7)]  # a escola 3 só existe em 2019
+    recente = [_escola(1, "A", 2020, 10), _escola(2, "B", 2020, 20)]
+
+    def executar():
+        colecao.update_many({'matriculas.ano_referencia': 2019}, {'$pull': {'matriculas': {'ano_referencia': 2019}}})
+        carregador.executar_operacoes(colecao, operacoes_mesclagem([dict(d) for d in anterior], {}))
+        return sincronizar_colecao(colecao, [dict(d) for d in recente], carregador,
+                                   preservar={(d["co_entidade"],) for d in anterior})
+
+    executar()
+    ids = {doc["co_entidade"]: doc["_id"] for doc in colecao.find()}
+    relatorio = executar()
+
+    assert (relatorio["inseridos"], relatorio["atualizados"], relatorio["removidos"]) == (0, 0, 0)
+    assert relatorio["inalterados"] == 2
+    assert {doc["co_entidade"]: doc["_id"] for doc in colecao.find()} == ids
+    assert [m["ano_referencia"] for m in colecao.find_one({"co_entidade": 1})["matriculas"]] == [2019, 2020]